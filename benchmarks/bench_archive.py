@@ -0,0 +1,66 @@
+"""Payload archive write and replay throughput.
+
+    python -m benchmarks.bench_archive [--records 100000] [--page 100]
+
+Archives ``--records`` synthetic Strava activities in pages of ``--page`` (as a
+backfill's list calls do) and waits for the writer to catch up, re-stores them
+unchanged (which must add nothing), then
+streams the archive back with iter_payloads. Reports records/s for each phase and
+the archive's size against the raw JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from benchmarks.common import seed_tokens, synthetic_strava_activity
+
+from src.config import settings
+from src.services import payload_archive
+
+
+async def _store_all(records: int, page: int):
+    for start in range(1, records + 1, page):
+        activities = [
+            synthetic_strava_activity(i) for i in range(start, min(start + page, records + 1))
+        ]
+        await payload_archive.store("strava", "activity", activities)
+    await payload_archive.flush()
+
+
+def _report(label: str, records: int, seconds: float):
+    print(f"{label:<18} {records:>8} records  {seconds:7.2f}s  {records / seconds:>10,.0f}/s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--page", type=int, default=100)
+    args = parser.parse_args()
+    await seed_tokens()
+
+    started = time.perf_counter()
+    await _store_all(args.records, args.page)
+    _report("store", args.records, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await _store_all(args.records, args.page)
+    _report("store unchanged", args.records, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    raw = 0
+    async for payload in payload_archive.iter_payloads("strava", "activity"):
+        raw += len(json.dumps(payload.data))
+    streamed = time.perf_counter() - started
+    _report("stream", args.records, streamed)
+
+    size = sum(p.stat().st_size for p in Path(settings.payload_archive_dir).glob("*.gz"))
+    print(f"archive {size / 1e6:.1f} MB for {raw / 1e6:.1f} MB of JSON "
+          f"({size / raw:.0%}); replay {raw / 1e6 / streamed:.1f} MB/s of JSON")
+    await payload_archive.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
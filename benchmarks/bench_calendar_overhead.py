@@ -0,0 +1,65 @@
+"""Per-event client overhead for Calendar writes.
+
+    python -m benchmarks.bench_calendar_overhead [--events 1000]
+
+Sends synthetic events through ``create_event``/``update_event`` against an httpx
+mock transport that answers instantly, so the timing is the client-side work per
+call: building headers, URLs and the request itself. ``cold`` drops the cached
+per-token session before every call, ``cached`` reuses it.
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import synthetic_strava_activity
+
+import httpx
+
+from src.formatters.strava_formatter import format_activity
+from src.services import google_calendar, http_clients
+
+CALENDAR_ID = "abc123@group.calendar.google.com"
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"id": "evt1"})
+
+
+async def run(mode: str, bodies: list[dict]) -> float:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+    http_clients.set_client("google", client)
+    google_calendar.invalidate_session()
+    started = time.perf_counter()
+    for i, body in enumerate(bodies):
+        if mode == "cold":
+            google_calendar.invalidate_session()
+            google_calendar._calendar_events_path.cache_clear()
+        if i % 2:
+            await google_calendar.update_event("token", CALENDAR_ID, f"evt{i}", body)
+        else:
+            await google_calendar.create_event("token", CALENDAR_ID, body)
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000)
+    args = parser.parse_args()
+
+    bodies = [format_activity(synthetic_strava_activity(i)) for i in range(args.events)]
+    await run("cached", bodies[:50])  # warm-up
+
+    for mode in ("cold", "cached"):
+        elapsed = await run(mode, bodies)
+        per_event_us = elapsed / len(bodies) * 1e6
+        print(
+            f"{mode:<7} {len(bodies)} events in {elapsed * 1000:7.1f}ms  "
+            f"({per_event_us:6.1f}us/event)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,309 @@
+"""End-to-end sync throughput against fake Strava, Whoop and Google servers.
+
+    python -m benchmarks.bench_e2e [--sizes 10,1000,100000]
+        [--scenarios backfill,whoop,webhook] [--latency 0.0] [--error-rate 0.0]
+        [--strava-short-limit N] [--strava-daily-limit N]
+        [--output PATH] [--compare PATH] [--tolerance 10]
+
+Runs the real ``backfill_strava``, ``poll_whoop`` and ``/webhook/strava`` (drained
+by the job queue workers) at each size against the in-process fakes from
+tests/fakes.py, which add the configured latency, transient 503s and Strava rate
+limits. For each run it reports throughput, p50/p99 per traced stage and per
+upstream request, upstream call counts and sync outcomes. Results are written to
+benchmarks/results/ as JSON. ``--compare`` diffs this run against an earlier
+file and exits non-zero if throughput or a p99 regressed by more than
+``--tolerance`` percent.
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.common import percentile, seed_tokens, synthetic_strava_activity
+
+import httpx
+from sqlalchemy import delete, update
+
+from src import metrics, tracing
+from src.config import settings
+from src.database import async_session
+from src.main import app
+from src.models import OAuthToken, SyncJob, SyncRecord, SyncState
+from src.services import (
+    google_calendar,
+    http_clients,
+    job_queue,
+    payload_archive,
+    strava_backfill,
+    strava_rate_limit,
+    whoop_poller,
+)
+from src.services.strava_rate_limit import StravaRateLimiter
+from tests.fakes import FakeGoogleCalendar, FakeStrava, FakeWhoop
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SCENARIOS = ("backfill", "whoop", "webhook")
+
+# The stage whose latency each scenario is judged by
+PRIMARY = {"backfill": "strava.get_activity", "whoop": "sync_chunk", "webhook": "strava.create"}
+
+
+class DurationExporter:
+    """Keeps span durations by name rather than the spans, so 100k-item runs fit in memory."""
+
+    def __init__(self):
+        self.durations: dict[str, list[float]] = defaultdict(list)
+
+    def export(self, span):
+        self.durations[span.name].append(span.duration)
+
+    def close(self):
+        pass
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _whoop_records(n: int, now: datetime) -> dict[str, list[dict]]:
+    """Two workouts per scored sleep (with its recovery), one record a minute back from now."""
+    records = {"workout": [], "sleep": [], "recovery": []}
+    for i in range(n):
+        start = now - timedelta(minutes=i + 1)
+        if i % 3:
+            records["workout"].append({
+                "id": f"w{i}", "sport_name": "Running", "start": _iso(start),
+                "end": _iso(start + timedelta(seconds=50)), "updated_at": _iso(now),
+                "score_state": "SCORED",
+                "score": {"strain": 10.0, "average_heart_rate": 140, "max_heart_rate": 170},
+            })
+        else:
+            records["sleep"].append({
+                "id": f"s{i}", "start": _iso(start), "end": _iso(start + timedelta(seconds=50)),
+                "updated_at": _iso(now), "score_state": "SCORED",
+                "score": {"stage_summary": {"total_light_sleep_time_milli": 14_400_000}},
+            })
+            records["recovery"].append({
+                "sleep_id": f"s{i}", "cycle_id": i, "created_at": _iso(start),
+                "updated_at": _iso(now), "score_state": "SCORED",
+                "score": {"recovery_score": 64, "hrv_rmssd_milli": 50.0, "resting_heart_rate": 55},
+            })
+    return records
+
+
+async def _reset():
+    """Forget everything synced, so each run starts from an empty calendar."""
+    async with async_session() as db:
+        for model in (SyncRecord, SyncState, SyncJob):
+            await db.execute(delete(model))
+        await db.execute(update(OAuthToken).values(calendar_id=None))
+        await db.commit()
+    google_calendar._calendar_id = None
+
+
+def _connect(fakes: dict):
+    """Route every upstream to its fake, keeping the pooled clients' hooks."""
+    for upstream, fake in fakes.items():
+        http_clients.set_client(upstream, httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=fake.app),
+            event_hooks=http_clients._event_hooks(upstream),
+        ))
+
+
+async def _webhooks(n: int, concurrency: int) -> list[float]:
+    """POST n create events through the real endpoint; returns each ack latency."""
+    latencies: list[float] = []
+    ids = iter(range(1, n + 1))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def sender():
+            for object_id in ids:
+                started = time.perf_counter()
+                resp = await client.post("/webhook/strava", json={
+                    "object_type": "activity", "aspect_type": "create", "object_id": object_id,
+                })
+                resp.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(sender() for _ in range(concurrency)))
+    return latencies
+
+
+async def _drain():
+    """Wait until the workers have nothing pending or running (failed jobs stay)."""
+    while True:
+        async with async_session() as db:
+            depth = await job_queue.depth(db)
+        if not depth.get("pending") and not depth.get("running"):
+            return
+        await asyncio.sleep(0.05)
+
+
+def _summary(samples: list[float]) -> dict:
+    ms = [s * 1000 for s in samples]
+    return {"n": len(ms), "p50": round(percentile(ms, 50), 3), "p99": round(percentile(ms, 99), 3)}
+
+
+async def run(scenario: str, n: int, args) -> dict:
+    await _reset()
+    now = datetime.utcnow().replace(microsecond=0)
+    google = FakeGoogleCalendar(latency=args.latency, error_rate=args.error_rate)
+    strava = FakeStrava(
+        short_limit=args.strava_short_limit, daily_limit=args.strava_daily_limit,
+        latency=args.latency, error_rate=args.error_rate,
+    )
+    whoop = FakeWhoop(latency=args.latency, error_rate=args.error_rate)
+    strava_rate_limit.limiter = StravaRateLimiter(
+        args.strava_short_limit, args.strava_daily_limit, settings.strava_backfill_reserve
+    )
+    _connect({"google": google, "strava": strava, "whoop": whoop})
+
+    for i in range(1, n + 1):
+        strava.activities[i] = synthetic_strava_activity(i, now - timedelta(minutes=i))
+    whoop.records = _whoop_records(n, now)
+    days = n // 1440 + 2
+    settings.whoop_initial_lookback_hours = days * 24
+
+    exporter = DurationExporter()
+    tracing.set_exporter(exporter)
+    before = dict(metrics.SYNCED._values)
+    acks: list[float] = []
+    started = time.perf_counter()
+    if scenario == "backfill":
+        await strava_backfill.backfill_strava(days=days)
+    elif scenario == "whoop":
+        await whoop_poller.poll_whoop()
+    else:
+        acks = await _webhooks(n, args.concurrency)
+        await _drain()
+    seconds = time.perf_counter() - started
+    tracing.set_exporter(None)
+
+    outcomes = Counter()
+    for (source, outcome), value in metrics.SYNCED._values.items():
+        outcomes[f"{source}.{outcome}"] += int(value - before.get((source, outcome), 0))
+    latency = {name: _summary(samples) for name, samples in sorted(exporter.durations.items())}
+    if acks:
+        latency["webhook.ack"] = _summary(acks)
+    return {
+        "scenario": scenario,
+        "n": n,
+        "seconds": round(seconds, 3),
+        "throughput": round(n / seconds, 1),
+        "latency_ms": latency,
+        "upstream_calls": {
+            name: dict(fake.calls)
+            for name, fake in (("strava", strava), ("whoop", whoop), ("google", google))
+            if fake.calls
+        },
+        "outcomes": dict(+outcomes),
+    }
+
+
+def _print(result: dict):
+    primary = result["latency_ms"].get(PRIMARY[result["scenario"]], {"p50": 0, "p99": 0})
+    calls = sum(sum(c.values()) for c in result["upstream_calls"].values())
+    print(
+        f"{result['scenario']:<9} n={result['n']:<7} {result['seconds']:9.2f}s "
+        f"{result['throughput']:9.1f}/s  {PRIMARY[result['scenario']]} "
+        f"p50={primary['p50']:.1f}ms p99={primary['p99']:.1f}ms  upstream calls={calls}"
+    )
+    if result["scenario"] == "webhook":
+        ack = result["latency_ms"]["webhook.ack"]
+        print(f"{'':<19} ack p50={ack['p50']:.1f}ms p99={ack['p99']:.1f}ms")
+    print(f"{'':<19} {result['outcomes']}")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: list[dict], baseline_path: Path, tolerance: float) -> bool:
+    """Print the change against a saved run; False if anything regressed past tolerance."""
+    baseline = {
+        (r["scenario"], r["n"]): r for r in json.loads(baseline_path.read_text())["results"]
+    }
+    ok = True
+    print(f"\nvs {baseline_path}:")
+    for result in current:
+        old = baseline.get((result["scenario"], result["n"]))
+        if old is None:
+            continue
+        stage = PRIMARY[result["scenario"]]
+        checks = [("throughput", old["throughput"], result["throughput"], True)]
+        if stage in old["latency_ms"] and stage in result["latency_ms"]:
+            checks.append(
+                (f"{stage} p99", old["latency_ms"][stage]["p99"],
+                 result["latency_ms"][stage]["p99"], False)
+            )
+        for label, was, now, higher_is_better in checks:
+            change = (now - was) / was * 100 if was else 0.0
+            regressed = (-change if higher_is_better else change) > tolerance
+            ok = ok and not regressed
+            print(
+                f"  {result['scenario']:<9} n={result['n']:<7} {label:<28} "
+                f"{was:10.1f} -> {now:10.1f} ({change:+6.1f}%)"
+                + ("  REGRESSION" if regressed else "")
+            )
+    return ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,100000")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.0, help="Per upstream request (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 503s per fake")
+    parser.add_argument("--strava-short-limit", type=int, default=10**9)
+    parser.add_argument("--strava-daily-limit", type=int, default=10**9)
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent webhook senders")
+    parser.add_argument("--output", type=Path, help="Results file (default: benchmarks/results/)")
+    parser.add_argument("--compare", type=Path, help="Earlier results file to diff against")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="Regression threshold (%%)")
+    args = parser.parse_args()
+
+    await seed_tokens()
+    settings.queue_retry_backoff_seconds = 0
+    job_queue.start_workers()
+    results = []
+    try:
+        for scenario in args.scenarios.split(","):
+            for n in (int(size) for size in args.sizes.split(",")):
+                result = await run(scenario, n, args)
+                _print(result)
+                results.append(result)
+    finally:
+        await job_queue.stop_workers()
+        await payload_archive.close()
+        await http_clients.close_clients()
+
+    commit = _git_commit()
+    output = args.output or RESULTS_DIR / (
+        f"e2e-{datetime.now():%Y%m%d-%H%M%S}-{commit}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    params = {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()}
+    output.write_text(json.dumps(
+        {"commit": commit, "created": datetime.now().isoformat(), "args": params,
+         "results": results},
+        indent=2,
+    ))
+    print(f"\nSaved {output}")
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""Formatter throughput over a large synthetic history.
+
+    python -m benchmarks.bench_formatters [--records 1000000] [--pool 10000]
+
+Formats ``--records`` Strava activities, Whoop workouts and Whoop sleeps (with
+recoveries) through the batch API (format_activities, format_workouts, format_sleeps),
+which is what re-rendering a full history does. Records are cycled from a pool of
+``--pool`` distinct ones so a million of them need not sit in memory at once.
+"""
+
+import argparse
+import itertools
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from benchmarks.common import synthetic_strava_activity
+
+from src.formatters.strava_formatter import format_activities
+from src.formatters.whoop_formatter import format_sleeps, format_workouts
+
+SPORTS = ("Running", "Cycling", "Weightlifting", "Yoga", "Rowing")
+
+
+def _whoop_workout(i: int) -> dict:
+    start = datetime(2024, 1, 1) + timedelta(hours=i)
+    return {
+        "id": f"w{i}",
+        "sport_name": SPORTS[i % len(SPORTS)],
+        "start": start.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "end": (start + timedelta(minutes=40 + i % 50)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "score": {
+            "strain": 8.0 + i % 130 / 10,
+            "average_heart_rate": 130 + i % 30,
+            "max_heart_rate": 165 + i % 20,
+            "kilojoule": 1500.0 + i % 900,
+            "distance_meter": 6000.0 + i % 4000 if i % 2 else None,
+        },
+    }
+
+
+def _whoop_sleep(i: int) -> dict:
+    start = datetime(2024, 1, 1, 22) + timedelta(days=i)
+    return {
+        "id": f"s{i}",
+        "start": start.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "end": (start + timedelta(hours=7, minutes=i % 90)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "score": {
+            "stage_summary": {
+                "total_light_sleep_time_milli": 10_000_000 + i % 60 * 60_000,
+                "total_slow_wave_sleep_time_milli": 5_000_000 + i % 40 * 60_000,
+                "total_rem_sleep_time_milli": 6_000_000 + i % 50 * 60_000,
+                "disturbance_count": i % 12,
+            },
+            "sleep_performance_percentage": 70 + i % 30,
+            "sleep_efficiency_percentage": 85 + i % 15,
+            "respiratory_rate": 14.0 + i % 30 / 10,
+        },
+    }
+
+
+def _recovery(i: int) -> dict:
+    return {"score": {"recovery_score": 30 + i % 70, "hrv_rmssd_milli": 40.0 + i % 50,
+                      "resting_heart_rate": 48 + i % 15}}
+
+
+def _time(label: str, records: int, bodies):
+    started = time.perf_counter()
+    deque(bodies, maxlen=0)
+    seconds = time.perf_counter() - started
+    print(f"{label:<18} {records:>9} records  {seconds:7.2f}s  "
+          f"{records / seconds:>10,.0f}/s  {seconds / records * 1e6:6.2f}µs each")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--pool", type=int, default=10_000)
+    args = parser.parse_args()
+
+    def cycled(make):
+        return itertools.islice(itertools.cycle([make(i) for i in range(args.pool)]), args.records)
+
+    recoveries = {f"s{i}": _recovery(i) for i in range(args.pool)}
+    _time("strava activities", args.records, format_activities(cycled(synthetic_strava_activity)))
+    _time("whoop workouts", args.records, format_workouts(cycled(_whoop_workout)))
+    _time("whoop sleeps", args.records, format_sleeps(cycled(_whoop_sleep), recoveries))
+
+
+if __name__ == "__main__":
+    main()
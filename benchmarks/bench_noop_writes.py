@@ -0,0 +1,73 @@
+"""Google write volume for a steady-state resync.
+
+    python -m benchmarks.bench_noop_writes [--events 1000] [--changed 0.05]
+
+Syncs a set of events, changes the summary of a fraction of them, and resyncs
+everything — what a Whoop poll or startup backfill does. ``rewrite`` clears the
+stored hashes first, which is how every resync behaved before they were kept.
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+
+from benchmarks.common import reset_sync_records, seed_tokens, synthetic_strava_activity
+
+from sqlalchemy import update
+
+from src.database import async_session
+from src.formatters.strava_formatter import format_activity
+from src.models import SyncRecord
+from src.services import google_calendar, http_clients
+from src.services.sync_engine import SyncItem, sync_activities_batch
+from tests.fakes import FakeGoogleCalendar
+
+WRITES = ("events.insert", "events.update", "events.patch")
+
+
+def _items(events: int, changed: int) -> list[SyncItem]:
+    items = []
+    for i in range(1, events + 1):
+        activity = synthetic_strava_activity(i)
+        if i <= changed:
+            activity["name"] += " (edited)"
+        items.append(SyncItem("strava", str(i), "Run", format_activity(activity)))
+    return items
+
+
+async def run(mode: str, events: int, changed: int) -> tuple[int, Counter]:
+    await reset_sync_records()
+    google_calendar._calendar_id = None
+    fake = FakeGoogleCalendar()
+    http_clients.set_client("google", fake.client())
+
+    async with async_session() as db:
+        calendar_id = await google_calendar.get_calendar_id(db, "google-token")
+        await sync_activities_batch(db, _items(events, 0), "google-token", calendar_id)
+        if mode == "rewrite":
+            await db.execute(update(SyncRecord).values(content_hash=None, field_hashes=None))
+            await db.commit()
+        before = sum(fake.calls[name] for name in WRITES)
+        stats = await sync_activities_batch(db, _items(events, changed), "google-token", calendar_id)
+    return sum(fake.calls[name] for name in WRITES) - before, stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--changed", type=float, default=0.05, help="Share of events edited")
+    args = parser.parse_args()
+
+    await seed_tokens()
+    changed = int(args.events * args.changed)
+    results = {}
+    for mode in ("rewrite", "hashed"):
+        writes, stats = await run(mode, args.events, changed)
+        results[mode] = writes
+        print(f"{mode:<8} {writes:>6} Google writes  {dict(stats)}")
+    saved = 1 - results["hashed"] / results["rewrite"]
+    print(f"write volume cut by {saved:.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""Strava/Whoop overlap checks against a large sync_records table.
+
+    python -m benchmarks.bench_overlap [--activities 100000] [--workouts 1000]
+
+Stores N Strava activities, then checks a poll's worth of Whoop workouts for
+overlaps three ways: one SQL range query per workout without and with the
+(source, activity_start, activity_end) index, and one query loading the poll
+window into an IntervalIndex.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import reset_sync_records
+
+from sqlalchemy import insert, text
+
+from src.database import async_session, init_db, migrate_online
+from src.models import SyncRecord
+from src.services.sync_engine import has_strava_overlap, load_strava_intervals
+
+T0 = datetime(2015, 1, 1)
+INDEX = "ix_sync_records_source_start_end"
+CREATE_INDEX = f"CREATE INDEX {INDEX} ON sync_records (source, activity_start, activity_end)"
+
+
+async def seed(activities: int):
+    rng = random.Random(1)
+    rows = []
+    for i in range(activities):
+        start = T0 + timedelta(hours=i * 2, minutes=rng.randrange(0, 60))
+        rows.append({
+            "source": "strava",
+            "source_id": str(i),
+            "activity_type": "Run",
+            "google_event_id": f"evt{i}",
+            "activity_start": start,
+            "activity_end": start + timedelta(minutes=rng.randrange(20, 120)),
+        })
+    async with async_session() as db:
+        for offset in range(0, len(rows), 10_000):
+            await db.execute(insert(SyncRecord), rows[offset : offset + 10_000])
+        await db.commit()
+
+
+def workouts(activities: int, count: int) -> list[tuple[datetime, datetime]]:
+    # A poll window at the recent end of the history
+    rng = random.Random(2)
+    window_start = T0 + timedelta(hours=activities * 2 - count * 2)
+    out = []
+    for _ in range(count):
+        start = window_start + timedelta(minutes=rng.randrange(0, count * 120))
+        out.append((start, start + timedelta(minutes=45)))
+    return out
+
+
+async def per_item(checks) -> tuple[float, int]:
+    started = time.perf_counter()
+    async with async_session() as db:
+        hits = sum([await has_strava_overlap(db, s, e) for s, e in checks])
+    return time.perf_counter() - started, hits
+
+
+async def indexed(checks) -> tuple[float, int]:
+    started = time.perf_counter()
+    async with async_session() as db:
+        index = await load_strava_intervals(
+            db, min(s for s, _ in checks), max(e for _, e in checks)
+        )
+    hits = sum(index.overlapping(s, e) is not None for s, e in checks)
+    return time.perf_counter() - started, hits
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--activities", type=int, default=100_000)
+    parser.add_argument("--workouts", type=int, default=1000)
+    args = parser.parse_args()
+
+    if await init_db():
+        await migrate_online()
+    await reset_sync_records()
+    await seed(args.activities)
+    checks = workouts(args.activities, args.workouts)
+
+    async with async_session() as db:
+        await db.execute(text(f"DROP INDEX IF EXISTS {INDEX}"))
+        await db.commit()
+    elapsed, hits = await per_item(checks)
+    print(f"per-workout SQL, no composite index  {elapsed * 1000:9.1f}ms  ({hits} overlaps)")
+
+    async with async_session() as db:
+        await db.execute(text(CREATE_INDEX))
+        await db.commit()
+    elapsed, hits = await per_item(checks)
+    print(f"per-workout SQL, composite index     {elapsed * 1000:9.1f}ms  ({hits} overlaps)")
+
+    elapsed, hits = await indexed(checks)
+    print(f"one query + IntervalIndex            {elapsed * 1000:9.1f}ms  ({hits} overlaps)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""Re-rendering a synced history after a formatter change.
+
+    python -m benchmarks.bench_rerender [--events 10000] [--changed 0.05] [--concurrency 4]
+
+Archives and syncs ``--events`` Strava activities against the fake Google Calendar,
+then changes the rendered title of a ``--changed`` share of them (as a formatter
+change might) and times a dry run and a real re-render, counting the Calendar
+writes the real run makes. Only the changed events should be written.
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import reset_sync_records, seed_tokens, synthetic_strava_activity
+
+from src.database import async_session
+from src.formatters import strava_formatter
+from src.services import google_calendar, http_clients, payload_archive, rerender
+from src.services.sync_engine import SyncItem, sync_activities_batch
+from tests.fakes import FakeGoogleCalendar
+
+WRITES = ("events.insert", "events.update", "events.patch")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--changed", type=float, default=0.05, help="Share of events edited")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    await seed_tokens()
+    await reset_sync_records()
+    fake = FakeGoogleCalendar()
+    http_clients.set_client("google", fake.client())
+    activities = [synthetic_strava_activity(i) for i in range(1, args.events + 1)]
+    await payload_archive.store("strava", "activity", activities)
+    await payload_archive.flush()
+    async with async_session() as db:
+        calendar_id = await google_calendar.get_calendar_id(db, "google-token")
+        items = [
+            SyncItem("strava", str(a["id"]), "Run", strava_formatter.format_activity(a))
+            for a in activities
+        ]
+        await sync_activities_batch(db, items, "google-token", calendar_id)
+
+    every = max(1, round(1 / args.changed)) if args.changed else 0
+
+    def changed_formatter(batch):
+        for activity, body in zip(batch, strava_formatter.format_activities(batch)):
+            if every and activity["id"] % every == 0:
+                body["summary"] += " (v2)"
+            yield body
+
+    rerender.format_activities = changed_formatter
+    for dry_run in (True, False):
+        before = sum(fake.calls[name] for name in WRITES)
+        started = time.perf_counter()
+        stats = await rerender.rerender(
+            ["strava"], dry_run, args.concurrency, args.batch_size
+        )
+        seconds = time.perf_counter() - started
+        writes = sum(fake.calls[name] for name in WRITES) - before
+        print(
+            f"{'dry run' if dry_run else 'rerender':<9} {stats['read']:>7} read  "
+            f"{stats['changed']:>6} changed  {writes:>6} calendar writes  "
+            f"{seconds:6.2f}s  {stats['read'] / seconds:>9,.0f} events/s"
+        )
+    await payload_archive.close()
+    await http_clients.close_clients()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""SQLite write throughput: default connection settings vs the tuned pragmas.
+
+    python -m benchmarks.bench_sqlite_writes [--writes 2000] [--writers 2]
+
+Several concurrent writers (think webhook worker + poller) each insert sync
+records. ``per-item`` commits after every record, like sync_activity;
+``batched`` commits every 50, like sync_activities_batch or sync_activity with
+commit=False.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from benchmarks.common import percentile
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.database import tune_sqlite
+from src.models import Base, SyncRecord
+
+
+async def writer(session_factory, n: int, offset: int, batch: int, commit_times: list[float]):
+    async with session_factory() as db:
+        for i in range(n):
+            db.add(SyncRecord(
+                source="strava",
+                source_id=str(offset + i),
+                activity_type="Run",
+                google_event_id=f"evt{offset + i}",
+                content_hash="0" * 64,
+            ))
+            if (i + 1) % batch == 0 or i == n - 1:
+                started = time.perf_counter()
+                await db.commit()
+                commit_times.append(time.perf_counter() - started)
+
+
+async def run(tuned: bool, batch: int, writes: int, writers: int) -> tuple[float, list[float]]:
+    path = tempfile.mktemp(suffix=".db", prefix="bench-writes-")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    if tuned:
+        tune_sqlite(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    per_writer = writes // writers
+    commit_times: list[float] = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        writer(session_factory, per_writer, w * per_writer, batch, commit_times)
+        for w in range(writers)
+    ))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return elapsed, commit_times
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--writers", type=int, default=2)
+    args = parser.parse_args()
+
+    for tuned in (False, True):
+        for label, batch in (("per-item", 1), ("batched", 50)):
+            elapsed, commits = await run(tuned, batch, args.writes, args.writers)
+            ms = [c * 1000 for c in commits]
+            print(
+                f"{'tuned' if tuned else 'default':<8} {label:<9} "
+                f"{args.writes / elapsed:9.0f} writes/s  "
+                f"commit p50={percentile(ms, 50):6.2f}ms p99={percentile(ms, 99):6.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
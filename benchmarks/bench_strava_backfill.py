@@ -0,0 +1,56 @@
+"""Strava backfill throughput: detail fetches one at a time vs a bounded pool.
+
+    python -m benchmarks.bench_strava_backfill [--activities 500] [--latency 0.05]
+
+Backfills every activity from an in-process fake Strava (with generous rate limits)
+into a fake Google Calendar. ``--concurrency 1`` matches the old sequential loop.
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import reset_sync_records, seed_tokens, synthetic_strava_activity
+
+from src.config import settings
+from src.services import google_calendar, http_clients, payload_archive, strava_backfill
+from tests.fakes import FakeGoogleCalendar, FakeStrava
+
+
+async def run(concurrency: int, activities: int, latency: float) -> float:
+    await reset_sync_records()
+    google_calendar._calendar_id = None
+    strava = FakeStrava(short_limit=100_000, daily_limit=1_000_000, latency=latency)
+    start = datetime.utcnow() - timedelta(days=300)
+    for i in range(1, activities + 1):
+        strava.activities[i] = synthetic_strava_activity(i, start + timedelta(hours=i))
+    http_clients.set_client("strava", strava.client())
+    http_clients.set_client("google", FakeGoogleCalendar(latency=latency).client())
+    settings.strava_backfill_concurrency = concurrency
+
+    started = time.perf_counter()
+    await strava_backfill.backfill_strava(days=365)
+    elapsed = time.perf_counter() - started
+    # Archived in the background; don't let it overlap the next run
+    await payload_archive.flush()
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--activities", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="Upstream round trip (s)")
+    parser.add_argument("--concurrency", type=int, default=settings.strava_backfill_concurrency)
+    args = parser.parse_args()
+
+    await seed_tokens()
+    for concurrency in (1, args.concurrency):
+        elapsed = await run(concurrency, args.activities, args.latency)
+        rate = args.activities / elapsed
+        print(f"concurrency={concurrency:<3} {elapsed:7.2f}s  ({rate:6.1f} activities/s)")
+    await payload_archive.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
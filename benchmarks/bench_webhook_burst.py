@@ -0,0 +1,124 @@
+"""Webhook ack latency under a burst of Strava events.
+
+    python -m benchmarks.bench_webhook_burst [--events 500] [--latency 0.05] [--per-activity 1]
+
+Fires a burst of concurrent webhook POSTs and reports how long each one took to
+be acknowledged, in arrival order, then how long the workers took to drain the
+queue. ``inline`` handles each event inside the request the way the webhook used
+to; ``queued`` is the real endpoint, which only enqueues. With ``--per-activity``
+above 1 the burst is that many ``update`` events per activity, which the workers
+coalesce (the coalesce window is set to 0 so the drain isn't just waiting it out);
+only ``queued`` runs then, as concurrent inline writes for one activity hit SQLite's
+lock.
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import (
+    percentile,
+    reset_sync_records,
+    seed_tokens,
+    summarize,
+    synthetic_strava_activity,
+)
+
+import httpx
+from fastapi import FastAPI, Request
+from sqlalchemy import delete
+
+from src.config import settings
+from src.database import async_session
+from src.main import app
+from src.models import SyncJob
+from src.services import google_calendar, http_clients, job_queue, strava_events
+from tests.fakes import FakeGoogleCalendar
+
+inline_app = FastAPI()
+
+
+@inline_app.post("/webhook/strava")
+async def inline_webhook(request: Request):
+    body = await request.json()
+    async with async_session() as db:
+        await strava_events.process_event(db, body["aspect_type"], str(body["object_id"]))
+    return {"status": "ok"}
+
+
+async def _fake_get_activity(access_token: str, activity_id: int, priority: int = 0) -> dict:
+    await asyncio.sleep(0.02)
+    return synthetic_strava_activity(activity_id)
+
+
+async def _post(client: httpx.AsyncClient, object_id: int, aspect_type: str) -> float:
+    started = time.perf_counter()
+    resp = await client.post(
+        "/webhook/strava",
+        json={"object_type": "activity", "aspect_type": aspect_type, "object_id": object_id},
+    )
+    resp.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def _drain():
+    while True:
+        async with async_session() as db:
+            if not await job_queue.depth(db):
+                return
+        await asyncio.sleep(0.05)
+
+
+async def run(mode: str, events: int, latency: float, per_activity: int):
+    await reset_sync_records()
+    google_calendar._calendar_id = None
+    fake = FakeGoogleCalendar(latency=latency)
+    http_clients.set_client("google", fake.client())
+    strava_events.get_activity = _fake_get_activity
+
+    target = inline_app if mode == "inline" else app
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        aspect_type = "update" if per_activity > 1 else "create"
+        latencies = await asyncio.gather(*(
+            _post(client, i // per_activity + 1, aspect_type) for i in range(events)
+        ))
+        acked = time.perf_counter() - started
+        await _drain()
+        drained = time.perf_counter() - started
+
+    print(f"{mode:<7} ack latency: {summarize(latencies)}")
+    slice_size = max(events // 5, 1)
+    for i in range(0, events, slice_size):
+        chunk = [s * 1000 for s in latencies[i : i + slice_size]]
+        print(f"        events {i + 1:>4}-{i + len(chunk):<4} p99={percentile(chunk, 99):8.1f}ms")
+    written = sum(len(events) for events in fake.events.values())
+    print(
+        f"        all acked after {acked:.2f}s, "
+        f"{written} calendar events written after {drained:.2f}s"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="Calendar round trip (s)")
+    parser.add_argument("--per-activity", type=int, default=1, help="Events per activity")
+    args = parser.parse_args()
+    settings.strava_update_coalesce_seconds = 0
+
+    await seed_tokens()
+    async with async_session() as db:
+        await db.execute(delete(SyncJob))
+        await db.commit()
+
+    job_queue.start_workers()
+    for mode in ("inline", "queued") if args.per_activity == 1 else ("queued",):
+        await run(mode, args.events, args.latency, args.per_activity)
+    await job_queue.stop_workers()
+    print(f"coalesced {job_queue.stats['coalesced']} queued events")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
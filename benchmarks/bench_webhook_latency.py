@@ -0,0 +1,107 @@
+"""Webhook latency while a Strava backfill is running.
+
+    python -m benchmarks.bench_webhook_latency [--activities 200] [--latency 0.05]
+
+Runs the same workload twice against an in-process fake Google Calendar:
+
+- ``blocking``: every Calendar call blocks the event loop for the round trip, which
+  is what the old ``googleapiclient`` ``.execute()`` calls did.
+- ``async``: the httpx-based client, where the round trip is awaited.
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import reset_sync_records, seed_tokens, summarize, synthetic_strava_activity
+
+import httpx
+
+from src.main import app
+from src.services import (
+    google_calendar,
+    http_clients,
+    job_queue,
+    payload_archive,
+    strava_backfill,
+    strava_events,
+)
+from tests.fakes import FakeGoogleCalendar
+
+
+
+class BlockingTransport(httpx.ASGITransport):
+    """Holds the event loop for the whole round trip, like a synchronous client."""
+
+    def __init__(self, app, latency: float):
+        super().__init__(app=app)
+        self.latency = latency
+
+    async def handle_async_request(self, request):
+        time.sleep(self.latency)  # noqa: ASYNC251 — blocking on purpose
+        return await super().handle_async_request(request)
+
+
+async def _fake_get_activity(access_token: str, activity_id: int, priority: int = 0) -> dict:
+    await asyncio.sleep(0.005)
+    return synthetic_strava_activity(int(activity_id))
+
+
+async def run(mode: str, activities: int, latency: float, interval: float) -> list[float]:
+    await reset_sync_records()
+    google_calendar._calendar_id = None
+    if mode == "blocking":
+        fake = FakeGoogleCalendar()
+        google_client = httpx.AsyncClient(transport=BlockingTransport(fake.app, latency))
+    else:
+        fake = FakeGoogleCalendar(latency=latency)
+        google_client = fake.client()
+    http_clients.set_client("google", google_client)
+
+    async def fake_iter_activities(access_token, after=None, per_page=100, priority=0):
+        yield 1, [synthetic_strava_activity(i) for i in range(1, activities + 1)]
+
+    strava_backfill.iter_activities = fake_iter_activities
+    strava_backfill.get_activity = _fake_get_activity
+    strava_events.get_activity = _fake_get_activity
+
+    latencies: list[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        backfill = asyncio.create_task(strava_backfill.backfill_strava(days=7))
+        object_id = 1_000_000
+        while not backfill.done():
+            object_id += 1
+            started = time.perf_counter()
+            resp = await client.post(
+                "/webhook/strava",
+                json={"object_type": "activity", "aspect_type": "create", "object_id": object_id},
+            )
+            resp.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(interval)
+        await backfill
+
+    await google_client.aclose()
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--activities", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Calendar round trip (s)")
+    parser.add_argument("--interval", type=float, default=0.02, help="Gap between webhooks (s)")
+    args = parser.parse_args()
+
+    await seed_tokens()
+    job_queue.start_workers()
+
+    for mode in ("blocking", "async"):
+        latencies = await run(mode, args.activities, args.latency, args.interval)
+        print(f"{mode:<9} webhook latency during backfill: {summarize(latencies)}")
+    await job_queue.stop_workers()
+    await payload_archive.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
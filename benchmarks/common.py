@@ -0,0 +1,68 @@
+"""Shared setup for the benchmark scripts.
+
+Importing this module points the app at a throwaway SQLite database and payload archive,
+so it must be imported before anything under ``src``.
+"""
+
+import os
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix="sync-bench-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmpdir}/bench.db"
+os.environ["PAYLOAD_ARCHIVE_DIR"] = f"{_tmpdir}/archive"
+
+
+def synthetic_strava_activity(activity_id: int, start: datetime | None = None) -> dict:
+    start = start or datetime(2024, 1, 1) + timedelta(hours=activity_id)
+    return {
+        "id": activity_id,
+        "name": f"Run {activity_id}",
+        "type": "Run",
+        "distance": 8000.0 + activity_id % 5000,
+        "moving_time": 2400,
+        "elapsed_time": 2500,
+        "total_elevation_gain": 40.0,
+        "start_date": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "average_heartrate": 150.0,
+        "max_heartrate": 175.0,
+    }
+
+
+async def seed_tokens():
+    """Create tables and store non-expiring tokens for every service."""
+    from src.auth.oauth_manager import store_tokens
+    from src.database import async_session, init_db, migrate_online
+
+    if await init_db():
+        await migrate_online()
+    async with async_session() as db:
+        for service in ("strava", "whoop", "google"):
+            await store_tokens(db, service, f"{service}-token", None, None)
+
+
+async def reset_sync_records():
+    from sqlalchemy import delete, update
+
+    from src.database import async_session
+    from src.models import OAuthToken, SyncRecord
+
+    async with async_session() as db:
+        await db.execute(delete(SyncRecord))
+        await db.execute(update(OAuthToken).values(calendar_id=None))
+        await db.commit()
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(pct) - 1]
+
+
+def summarize(samples: list[float]) -> str:
+    ms = [s * 1000 for s in samples]
+    return (
+        f"n={len(ms):<5} p50={percentile(ms, 50):8.1f}ms  "
+        f"p99={percentile(ms, 99):8.1f}ms  max={max(ms):8.1f}ms"
+    )
@@ -1,14 +1,40 @@
+import asyncio
 import logging
+from collections import defaultdict
 from datetime import datetime, timedelta
 
-import httpx
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src import metrics
+from src.config import settings
+from src.database import async_session
 from src.models import OAuthToken
+from src.services import google_calendar
+from src.services.http_clients import get_client
 
 logger = logging.getLogger(__name__)
 
+TOKEN_URLS = {
+    "strava": "https://www.strava.com/oauth/token",
+    "whoop": "https://api.prod.whoop.com/oauth/oauth2/token",
+    "google": "https://oauth2.googleapis.com/token",
+}
+
+# service -> (access_token, expires_at), kept in step with the oauth_tokens table
+_token_cache: dict[str, tuple[str, datetime | None]] = {}
+
+# One refresh in flight per service; other callers wait and reuse its result
+_refresh_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+
+def _is_fresh(expires_at: datetime | None) -> bool:
+    """True if a token is not due for refresh (refreshes start ahead of expiry)."""
+    if expires_at is None:
+        return True
+    margin = timedelta(seconds=settings.token_refresh_margin_seconds)
+    return expires_at - margin > datetime.utcnow()
+
 
 async def store_tokens(
     db: AsyncSession,
@@ -24,6 +50,8 @@ async def store_tokens(
     expires_at = datetime.utcnow() + timedelta(seconds=expires_in) if expires_in else None
 
     if token:
+        if service == "google" and token.access_token != access_token:
+            google_calendar.invalidate_session(token.access_token)
         token.access_token = access_token
         token.refresh_token = refresh_token or token.refresh_token
         token.expires_at = expires_at
@@ -38,23 +66,40 @@ async def store_tokens(
         db.add(token)
 
     await db.commit()
+    _token_cache[service] = (access_token, expires_at)
     return token
 
 
 async def get_valid_token(db: AsyncSession, service: str, token_url: str, client_id: str, client_secret: str) -> str | None:
-    """Get a valid access token, refreshing if expired."""
-    result = await db.execute(select(OAuthToken).where(OAuthToken.service == service))
-    token = result.scalar_one_or_none()
-    if not token:
-        return None
+    """Get a valid access token, refreshing if expired or about to expire."""
+    cached = _token_cache.get(service)
+    if cached and _is_fresh(cached[1]):
+        return cached[0]
 
-    if token.expires_at and token.expires_at < datetime.utcnow():
+    async with _refresh_locks[service]:
+        # Whoever held the lock before us may have refreshed already
+        cached = _token_cache.get(service)
+        if cached and _is_fresh(cached[1]):
+            return cached[0]
+
+        result = await db.execute(select(OAuthToken).where(OAuthToken.service == service))
+        token = result.scalar_one_or_none()
+        if not token:
+            return None
+        if _is_fresh(token.expires_at):
+            _token_cache[service] = (token.access_token, token.expires_at)
+            return token.access_token
+
+        still_valid = token.expires_at > datetime.utcnow()
         if not token.refresh_token:
+            if still_valid:
+                return token.access_token
             logger.warning("Token expired for %s and no refresh token available", service)
             return None
+
         logger.info("Refreshing token for %s", service)
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
+        try:
+            resp = await get_client("oauth").post(
                 token_url,
                 data={
                     "grant_type": "refresh_token",
@@ -63,11 +108,35 @@ async def get_valid_token(db: AsyncSession, service: str, token_url: str, client
                     "client_secret": client_secret,
                 },
             )
-        resp.raise_for_status()
+            resp.raise_for_status()
+        except Exception:
+            metrics.TOKEN_REFRESHES.inc(service, "failed")
+            if not still_valid:
+                raise
+            # Refreshing early is best-effort — keep using the current token
+            logger.exception("Early token refresh failed for %s", service)
+            return token.access_token
+        metrics.TOKEN_REFRESHES.inc(service, "ok")
         data = resp.json()
         await store_tokens(
             db, service, data["access_token"], data.get("refresh_token"), data.get("expires_in")
         )
         return data["access_token"]
 
-    return token.access_token
+
+async def get_service_token(service: str) -> str | None:
+    """get_valid_token using the service's configured client, on its own DB session.
+
+    Separate sessions make it safe to resolve several services concurrently.
+    """
+    cached = _token_cache.get(service)
+    if cached and _is_fresh(cached[1]):
+        return cached[0]
+    async with async_session() as db:
+        return await get_valid_token(
+            db,
+            service,
+            TOKEN_URLS[service],
+            getattr(settings, f"{service}_client_id"),
+            getattr(settings, f"{service}_client_secret"),
+        )
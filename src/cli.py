@@ -0,0 +1,106 @@
+"""Command-line tools: `uv run python -m src.cli --help`."""
+
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime
+
+import typer
+
+from src import tracing
+
+app = typer.Typer(help="Strava + Whoop → Google Calendar sync tools.", no_args_is_help=True)
+
+
+@app.callback()
+def main():
+    """Strava + Whoop → Google Calendar sync tools."""
+
+
+@app.command()
+def waterfall(
+    path: str = typer.Argument(..., help="JSON-lines trace export (TRACE_EXPORT_PATH)"),
+    trace: str | None = typer.Option(None, help="Show this trace ID"),
+    name: str | None = typer.Option(None, help="Only traces whose root span has this name"),
+    slowest: int = typer.Option(1, help="Show the N slowest traces"),
+    width: int = typer.Option(40, help="Timeline bar width"),
+):
+    """Per-stage latency waterfall of recorded traces, slowest first."""
+    traces = tracing.load_traces(path)
+    if trace:
+        if trace not in traces:
+            typer.echo(f"No trace {trace} in {path}", err=True)
+            raise typer.Exit(1)
+        selected = [traces[trace]]
+    else:
+        candidates = [
+            spans for spans in traces.values()
+            if name is None or tracing.root(spans)["name"] == name
+        ]
+        candidates.sort(key=lambda spans: tracing.root(spans)["duration"] or 0, reverse=True)
+        selected = candidates[:slowest]
+
+    for spans in selected:
+        top = tracing.root(spans)
+        started = datetime.fromtimestamp(top["start"]).isoformat(sep=" ", timespec="seconds")
+        duration = (top["duration"] or 0) * 1000
+        typer.echo(f"trace {top['trace_id']}  {top['name']}  {duration:.1f}ms  at {started}")
+        for line in tracing.waterfall(spans, width):
+            typer.echo(line)
+        typer.echo()
+
+
+def _counts(stats: Counter) -> str:
+    return " ".join(f"{key}={value}" for key, value in sorted(stats.items()))
+
+
+async def _rerender(sources: list[str], dry_run: bool, concurrency: int, batch_size: int):
+    from src.database import init_db
+    from src.services import http_clients
+    from src.services.rerender import rerender
+
+    await init_db()
+    last = 0.0
+
+    def progress(stats: Counter):
+        nonlocal last
+        if time.monotonic() - last >= 1:
+            last = time.monotonic()
+            typer.echo(_counts(stats), err=True)
+
+    try:
+        return await rerender(sources, dry_run, concurrency, batch_size, progress)
+    finally:
+        await http_clients.close_clients()
+
+
+@app.command(name="rerender")
+def rerender_command(
+    source: list[str] = typer.Option(
+        ["strava", "whoop"], help="strava and/or whoop (repeat the option for both)"
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Only count the events that would change"
+    ),
+    concurrency: int = typer.Option(4, help="Calendar batches pushed at once"),
+    batch_size: int = typer.Option(200, help="Changed events per batch"),
+):
+    """Re-render synced events from the payload archive and push only the changed ones."""
+    unknown = set(source) - {"strava", "whoop"}
+    if unknown:
+        raise typer.BadParameter(f"unknown source {', '.join(sorted(unknown))}")
+    try:
+        stats = asyncio.run(_rerender(source, dry_run, concurrency, batch_size))
+    except RuntimeError as exc:
+        typer.echo(str(exc), err=True)
+        raise typer.Exit(1) from exc
+    verb = "would change" if dry_run else "changed"
+    typer.echo(f"{stats['changed']} of {stats['read']} archived events {verb}")
+    if stats:
+        typer.echo(_counts(stats))
+    if stats["failed"]:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    app()
@@ -26,7 +26,49 @@ class Settings(BaseSettings):
     database_url: str = "sqlite+aiosqlite:///./sync.db"
     sync_calendar_name: str = "Fitness Sync"
     whoop_poll_interval_minutes: int = 15
+    # How far back the first sync looks; later syncs start from the stored watermark
+    strava_initial_backfill_days: int = 7
+    whoop_initial_lookback_hours: int = 24
+    # Whoop records starting this long before the cursor are re-read for late scores/edits
+    whoop_recheck_hours: int = 24
     log_level: str = "INFO"
+    trace_export_path: str = ""  # JSON-lines file for tracing spans; empty disables tracing
+    # Raw Strava/Whoop payloads are kept here (see services/payload_archive); empty disables
+    payload_archive_dir: str = "./archive"
+    payload_archive_segment_bytes: int = 64 * 1024 * 1024  # start a new segment file after
+
+    # SQLite connection pragmas (see database.tune_sqlite)
+    sqlite_tuning: bool = True
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 20_000
+    sqlite_mmap_size_bytes: int = 256 * 1024 * 1024
+    token_refresh_margin_seconds: int = 300  # refresh OAuth tokens this long before expiry
+
+    # Webhook job queue
+    queue_workers: int = 4
+    queue_visibility_timeout_seconds: int = 120
+    queue_max_attempts: int = 5
+    queue_retry_backoff_seconds: int = 30
+    queue_poll_interval_seconds: float = 5.0
+    # Strava update events for one activity within this window collapse into one sync
+    strava_update_coalesce_seconds: float = 10.0
+
+    # Strava rate limits (updated from response headers once calls are made)
+    strava_rate_limit_short: int = 100  # requests per 15 minutes
+    strava_rate_limit_daily: int = 1000
+    strava_backfill_reserve: float = 0.3  # share of each window kept free for webhooks
+    strava_backfill_page_size: int = 100  # activities per list page (Strava max 200)
+    strava_backfill_concurrency: int = 8  # activity detail fetches in flight
+
+    # HTTP clients (one pooled client per upstream)
+    http2_enabled: bool = True
+    http_max_connections: int = 20
+    http_max_keepalive_connections: int = 10
+    http_keepalive_expiry_seconds: float = 60.0
+    http_timeout_seconds: float = 30.0
+    http_connect_timeout_seconds: float = 10.0
 
 
 settings = Settings()
@@ -1,8 +1,45 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
 from src.config import settings
 
+logger = logging.getLogger(__name__)
+
+
+def tune_sqlite(engine: AsyncEngine):
+    """Apply the sqlite_* pragmas to every connection the engine opens.
+
+    WAL lets readers and the one writer proceed together, and with
+    synchronous=NORMAL a commit no longer waits for an fsync (WAL checkpoints still
+    do). busy_timeout makes a second writer wait for the lock instead of failing.
+    """
+    pragmas = [
+        f"PRAGMA busy_timeout = {settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA journal_mode = {settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous = {settings.sqlite_synchronous}",
+        f"PRAGMA cache_size = -{settings.sqlite_cache_size_kib}",  # negative = KiB
+        f"PRAGMA mmap_size = {settings.sqlite_mmap_size_bytes}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
 engine = create_async_engine(settings.database_url, echo=False)
+if engine.dialect.name == "sqlite" and settings.sqlite_tuning:
+    tune_sqlite(engine)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
@@ -11,18 +48,18 @@ async def get_db() -> AsyncSession:
         yield session
 
 
-async def init_db():
-    from src.models import Base
-    import sqlite3
+async def init_db() -> bool:
+    """Apply pending schema migrations; True if online ones are left for migrate_online()."""
+    from src.migrations import migrate
+
+    return await migrate(engine)
+
 
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+async def migrate_online():
+    """Build indexes deferred from startup (see src/migrations.py)."""
+    from src.migrations import migrate_online
 
-        # Add missing columns to existing tables (poor man's migration)
-        from sqlalchemy import text
-        result = await conn.execute(text("PRAGMA table_info(sync_records)"))
-        columns = {row[1] for row in result.fetchall()}
-        if "activity_start" not in columns:
-            await conn.execute(text("ALTER TABLE sync_records ADD COLUMN activity_start DATETIME"))
-        if "activity_end" not in columns:
-            await conn.execute(text("ALTER TABLE sync_records ADD COLUMN activity_end DATETIME"))
+    try:
+        await migrate_online(engine)
+    except Exception:
+        logger.exception("Online schema migration failed (will retry on next start)")
@@ -1,4 +1,7 @@
-from datetime import datetime, timedelta
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+
+from src.formatters.timestamps import event_time
 
 KM_TO_MI = 0.621371
 M_TO_FT = 3.28084
@@ -14,24 +17,30 @@ SPORT_EMOJI = {
     "VirtualRide": "\U0001f6b4",
     "VirtualRun": "\U0001f3c3",
 }
+DEFAULT_EMOJI = "\U0001f4aa"
+
+
+@lru_cache(maxsize=256)
+def _sport_labels(sport: str) -> tuple[str, str]:
+    """Title emoji prefix and description line for a sport type."""
+    return f"{SPORT_EMOJI.get(sport, DEFAULT_EMOJI)} ", f"Sport: {sport}"
 
 
 def format_activity(activity: dict) -> dict:
     """Convert a Strava activity to a Google Calendar event body."""
     sport = activity.get("type", "Workout")
-    emoji = SPORT_EMOJI.get(sport, "\U0001f4aa")
+    prefix, sport_line = _sport_labels(sport)
     distance_mi = activity.get("distance", 0) / 1000 * KM_TO_MI
     name = activity.get("name", sport)
 
-    title = f"{emoji} {name}"
+    title = f"{prefix}{name}"
     if distance_mi > 0.1:
         title += f" \u2014 {distance_mi:.1f} mi"
 
-    start_dt = datetime.fromisoformat(activity["start_date"].replace("Z", "+00:00"))
+    start_date = activity["start_date"]
     elapsed = activity.get("elapsed_time", 0)
-    end_dt = start_dt + timedelta(seconds=elapsed)
 
-    description_parts = [f"Sport: {sport}"]
+    description_parts = [sport_line]
     if distance_mi > 0.1:
         description_parts.append(f"Distance: {distance_mi:.2f} mi")
         moving_time = activity.get("moving_time", 0)
@@ -53,8 +62,8 @@ def format_activity(activity: dict) -> dict:
 
     event = {
         "summary": title,
-        "start": {"dateTime": start_dt.isoformat(), "timeZone": "UTC"},
-        "end": {"dateTime": end_dt.isoformat(), "timeZone": "UTC"},
+        "start": {"dateTime": event_time(start_date), "timeZone": "UTC"},
+        "end": {"dateTime": event_time(start_date, elapsed), "timeZone": "UTC"},
         "description": "\n".join(description_parts),
     }
 
@@ -63,3 +72,8 @@ def format_activity(activity: dict) -> dict:
         event["location"] = f"{lat},{lng}"
 
     return event
+
+
+def format_activities(activities: Iterable[dict]) -> Iterator[dict]:
+    """format_activity mapped over activities, lazily; not a batch API, just a convenience."""
+    return map(format_activity, activities)
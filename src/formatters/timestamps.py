@@ -0,0 +1,42 @@
+"""Timestamp handling shared by the formatters.
+
+Strava and Whoop send UTC stamps like "2024-01-15T07:30:00Z" or "...07:30:00.000Z".
+For those the Calendar string can be sliced out of the input once fromisoformat() has
+validated it, instead of building an aware datetime and calling isoformat(), which is
+most of a formatter's cost. Anything else takes the original replace/fromisoformat path.
+"""
+
+from datetime import datetime, timedelta
+
+UTC_SUFFIX = "+00:00"
+
+
+def _canonical_utc(ts: str) -> bool:
+    """The shape of "YYYY-MM-DDTHH:MM:SSZ" or "...SS.fffZ"; fromisoformat checks the digits."""
+    n = len(ts)
+    return (
+        (n == 20 or (n == 24 and ts[19] == "."))
+        and ts[-1] == "Z"
+        and ts[4] == ts[7] == "-"
+        and ts[10] == "T"
+        and ts[13] == ts[16] == ":"
+    )
+
+
+def event_time(ts: str, plus_seconds: float = 0) -> str:
+    """ISO 8601 string for a Calendar event boundary, optionally shifted by plus_seconds.
+
+    The same string as datetime.fromisoformat(ts.replace("Z", "+00:00")).isoformat().
+    """
+    if not _canonical_utc(ts):
+        dt = datetime.fromisoformat(ts.replace("Z", UTC_SUFFIX))
+        if plus_seconds:
+            dt += timedelta(seconds=plus_seconds)
+        return dt.isoformat()
+
+    dt = datetime.fromisoformat(ts[:-1])  # validates the fields
+    if plus_seconds:
+        return (dt + timedelta(seconds=plus_seconds)).isoformat() + UTC_SUFFIX
+    if dt.microsecond == 0:
+        return ts[:19] + UTC_SUFFIX
+    return f"{ts[:23]}000{UTC_SUFFIX}"
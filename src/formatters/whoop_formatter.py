@@ -1,4 +1,7 @@
-from datetime import datetime
+from collections.abc import Iterable, Iterator, Mapping
+from functools import lru_cache
+
+from src.formatters.timestamps import event_time
 
 SPORT_EMOJI = {
     "Running": "\U0001f3c3",
@@ -12,6 +15,12 @@ SPORT_EMOJI = {
     "CrossFit": "\U0001f4aa",
     "Functional Fitness": "\U0001f4aa",
 }
+DEFAULT_EMOJI = "\U0001f4aa"
+
+
+@lru_cache(maxsize=256)
+def _sport_prefix(sport_name: str) -> str:
+    return f"{SPORT_EMOJI.get(sport_name, DEFAULT_EMOJI)} {sport_name} \u2014 Strain "
 
 
 def _ms_to_hm(ms: int) -> str:
@@ -25,17 +34,13 @@ def _ms_to_hm(ms: int) -> str:
 def format_workout(workout: dict) -> dict:
     """Convert a Whoop workout to a Google Calendar event body."""
     sport_name = workout.get("sport_name", "Workout")
-    emoji = SPORT_EMOJI.get(sport_name, "\U0001f4aa")
     score = workout.get("score") or {}
-    strain = score.get("strain", 0)
+    strain = f"{score.get('strain', 0):.1f}"
 
-    title = f"{emoji} {sport_name} \u2014 Strain {strain:.1f}"
-
-    start_dt = datetime.fromisoformat(workout["start"].replace("Z", "+00:00"))
-    end_dt = datetime.fromisoformat(workout["end"].replace("Z", "+00:00"))
+    title = _sport_prefix(sport_name) + strain
 
     desc_parts = [
-        f"Strain: {strain:.1f}",
+        f"Strain: {strain}",
         f"Avg HR: {score.get('average_heart_rate', 0):.0f} bpm",
         f"Max HR: {score.get('max_heart_rate', 0):.0f} bpm",
         f"Calories: {(score.get('kilojoule', 0) or 0) / 4.184:.0f} kcal",
@@ -48,17 +53,14 @@ def format_workout(workout: dict) -> dict:
 
     return {
         "summary": title,
-        "start": {"dateTime": start_dt.isoformat(), "timeZone": "UTC"},
-        "end": {"dateTime": end_dt.isoformat(), "timeZone": "UTC"},
+        "start": {"dateTime": event_time(workout["start"]), "timeZone": "UTC"},
+        "end": {"dateTime": event_time(workout["end"]), "timeZone": "UTC"},
         "description": "\n".join(desc_parts),
     }
 
 
 def format_sleep(sleep: dict, recovery: dict | None = None) -> dict:
     """Convert Whoop sleep data to a Google Calendar event body."""
-    start_dt = datetime.fromisoformat(sleep["start"].replace("Z", "+00:00"))
-    end_dt = datetime.fromisoformat(sleep["end"].replace("Z", "+00:00"))
-
     score = sleep.get("score") or {}
     stages = score.get("stage_summary") or {}
 
@@ -100,7 +102,21 @@ def format_sleep(sleep: dict, recovery: dict | None = None) -> dict:
 
     return {
         "summary": title,
-        "start": {"dateTime": start_dt.isoformat(), "timeZone": "UTC"},
-        "end": {"dateTime": end_dt.isoformat(), "timeZone": "UTC"},
+        "start": {"dateTime": event_time(sleep["start"]), "timeZone": "UTC"},
+        "end": {"dateTime": event_time(sleep["end"]), "timeZone": "UTC"},
         "description": "\n".join(desc_parts),
     }
+
+
+def format_workouts(workouts: Iterable[dict]) -> Iterator[dict]:
+    """format_workout mapped over workouts, lazily; not a batch API, just a convenience."""
+    return map(format_workout, workouts)
+
+
+def format_sleeps(
+    sleeps: Iterable[dict], recovery_by_sleep: Mapping[str, dict] | None = None
+) -> Iterator[dict]:
+    """format_sleep over sleeps, lazily, each with its recovery (keyed by str(sleep id)) if any."""
+    recovery_by_sleep = recovery_by_sleep or {}
+    for sleep in sleeps:
+        yield format_sleep(sleep, recovery_by_sleep.get(str(sleep["id"])))
@@ -1,28 +1,47 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from fastapi import Depends, FastAPI
 
+from src import tracing
 from src.auth.basic_auth import verify_admin
 from src.config import settings
-from src.database import init_db
+from src.database import init_db, migrate_online
 from src.routers import google, health, home, strava, webhook, whoop
-from src.services.strava_backfill import backfill_strava
-from src.services.whoop_poller import poll_whoop
+from src.services import http_clients, job_queue, payload_archive
 
 logging.basicConfig(level=settings.log_level)
 logger = logging.getLogger(__name__)
 
-scheduler = AsyncIOScheduler()
+# AsyncIOScheduler, created once the app is serving
+scheduler = None
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    logger.info("Starting up — initializing database")
-    await init_db()
+def _load_deferred():
+    """Import what startup does not need: the scheduler and the sync stack (httpx etc.)."""
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+    from src.services import strava_backfill, strava_events, whoop_poller  # noqa: F401
+
+    return AsyncIOScheduler
+
+
+async def _start_background():
+    """Start polling and sync whatever arrived since the last run.
+
+    Runs after startup; the imports happen in a thread so the server is already
+    accepting requests while they load.
+    """
+    global scheduler
+    scheduler_class = await asyncio.to_thread(_load_deferred)
+    from src.services.strava_backfill import backfill_strava
+    from src.services.whoop_poller import poll_whoop
+
+    http_clients.open_clients()
 
     # Start Whoop polling — every hour
+    scheduler = scheduler_class()
     scheduler.add_job(
         poll_whoop,
         "interval",
@@ -32,20 +51,46 @@ async def lifespan(app: FastAPI):
     scheduler.start()
     logger.info("Whoop poller started — every hour")
 
-    # Run initial syncs on startup
     try:
         await poll_whoop()
     except Exception:
         logger.exception("Initial Whoop poll failed (will retry on schedule)")
 
     try:
-        await backfill_strava(days=7)
+        await backfill_strava()
     except Exception:
         logger.exception("Initial Strava backfill failed")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global scheduler
+    if settings.trace_export_path:
+        tracing.set_exporter(tracing.JsonLinesExporter(settings.trace_export_path))
+    logger.info("Starting up — initializing database")
+    online_migrations = await init_db()
+
+    # Drain queued webhook events, including any cut off by the last shutdown
+    await job_queue.recover_interrupted()
+    job_queue.start_workers()
+
+    # Scheduler, HTTP pools and catch-up from the stored watermarks, so we serve right away
+    background = [asyncio.create_task(_start_background(), name="startup-background")]
+    if online_migrations:
+        background.append(asyncio.create_task(migrate_online(), name="online-migrations"))
+
     yield
 
-    scheduler.shutdown()
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    if scheduler is not None:
+        scheduler.shutdown()
+        scheduler = None
+    await job_queue.stop_workers()
+    await payload_archive.close()
+    await http_clients.close_clients()
+    tracing.set_exporter(None)
     logger.info("Shutting down")
 
 
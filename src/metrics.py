@@ -0,0 +1,135 @@
+"""In-process metrics, served in the Prometheus text format at /metrics.
+
+Kept small rather than pulling in prometheus_client: everything runs on one event
+loop, so recording is an unlocked dict update (plus a bisect for histograms) and
+costs the webhook path next to nothing. Counters that other modules already keep
+(job queue, Strava limiter, HTTP pools) are read at scrape time, not duplicated.
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+
+# Seconds — upstream calls and syncs take from a few ms to a few seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: list = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    """A sample value without rounding: "%g" would turn 1234567 into 1.23457e+06."""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def samples(
+    name: str, documentation: str, kind: str, labelnames: tuple[str, ...], values: dict
+) -> list[str]:
+    """Exposition lines for one metric family; `values` maps label values to a number."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labelvalues, value in sorted(values.items()):
+        lines.append(f"{name}{_labels(labelnames, labelvalues)} {_number(value)}")
+    return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: defaultdict[tuple, float] = defaultdict(float)
+        _registry.append(self)
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        self._values[labelvalues] += amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def render(self) -> list[str]:
+        return samples(self.name, self.documentation, "counter", self.labelnames, self._values)
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (last is +Inf), sum]
+        self._series: dict[tuple, list] = {}
+        _registry.append(self)
+
+    def observe(self, value: float, *labelvalues: str):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        bounds = [_number(b) for b in self.buckets] + ["+Inf"]
+        for labelvalues, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _labels(self.labelnames + ("le",), labelvalues + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render(*extra: list[str]) -> str:
+    """Every registered metric plus scrape-time families, as one exposition document."""
+    lines = [line for metric in _registry for line in metric.render()]
+    for family in extra:
+        lines += family
+    return "\n".join(lines) + "\n"
+
+
+# Defined here rather than in the modules that record them, so every family is
+# exposed from startup, before the deferred sync modules are imported.
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Time to response headers from an upstream API, by upstream and HTTP status "
+    "(\"error\" for timeouts and connection errors).",
+    ("upstream", "status"),
+)
+SYNC_DURATION = Histogram(
+    "sync_activity_duration_seconds",
+    "Time to sync or delete one activity (webhook path), by source and outcome.",
+    ("source", "outcome"),
+)
+SYNCED = Counter(
+    "sync_activities_total",
+    "Activities processed, by source and outcome (created, updated, patched, "
+    "unchanged, skipped, deleted, conflicted, failed).",
+    ("source", "outcome"),
+)
+TOKEN_REFRESHES = Counter(
+    "oauth_token_refreshes_total",
+    "OAuth token refresh attempts, by service and result.",
+    ("service", "result"),
+)
@@ -0,0 +1,177 @@
+"""Versioned schema migrations.
+
+Each applied version is recorded in `schema_version`, so a boot with a current
+schema costs one query. Blocking migrations run before the app serves; `online`
+ones (indexes the app only needs for speed) run in a background task afterwards,
+so building them on a large sync_records never holds up startup. A blocking
+migration must not depend on an online one.
+"""
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from src.models import ArchivedPayload, Base
+
+logger = logging.getLogger(__name__)
+
+# Rows changed per transaction by data migrations, so each write lock is brief
+BATCH_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[AsyncEngine], Awaitable[None]]
+    online: bool = False  # the app works without it; applied after startup
+
+
+async def _table_exists(conn: AsyncConnection, name: str) -> bool:
+    result = await conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": name},
+    )
+    return result.first() is not None
+
+
+async def _columns(conn: AsyncConnection, table: str) -> set[str]:
+    result = await conn.execute(text(f"PRAGMA table_info({table})"))
+    return {row[1] for row in result.fetchall()}
+
+
+# Columns added before migrations were versioned; any of them may be missing
+_LEGACY_COLUMNS = {
+    "sync_records": [
+        ("activity_start", "DATETIME"),
+        ("activity_end", "DATETIME"),
+        ("content_hash", "VARCHAR(64)"),
+        ("field_hashes", "TEXT"),
+    ],
+    "oauth_tokens": [("calendar_id", "VARCHAR(255)")],
+}
+
+
+async def _baseline(engine: AsyncEngine):
+    """Bring an unversioned database up to the schema it would have had at v1."""
+    async with engine.begin() as conn:
+        # Creates tables added since (sync_jobs, sync_state); leaves existing ones alone
+        await conn.run_sync(Base.metadata.create_all)
+        for table, columns in _LEGACY_COLUMNS.items():
+            existing = await _columns(conn, table)
+            for name, type_ in columns:
+                if name not in existing:
+                    await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {type_}"))
+
+
+async def _unique_source_id(engine: AsyncEngine):
+    """One record per activity; older databases could hold several, keep the newest."""
+    async with engine.connect() as conn:
+        result = await conn.execute(text(
+            "SELECT id, google_event_id FROM sync_records WHERE id NOT IN "
+            "(SELECT MAX(id) FROM sync_records GROUP BY source, source_id)"
+        ))
+        rows = result.fetchall()
+    if rows:
+        # Their extra calendar events stay in Google
+        logger.warning(
+            "Removing %d duplicate sync records; orphaned calendar events: %s",
+            len(rows), ", ".join(row[1] for row in rows),
+        )
+    delete = text("DELETE FROM sync_records WHERE id IN :ids").bindparams(
+        bindparam("ids", expanding=True)
+    )
+    for i in range(0, len(rows), BATCH_SIZE):
+        async with engine.begin() as conn:
+            await conn.execute(delete, {"ids": [row[0] for row in rows[i:i + BATCH_SIZE]]})
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_sync_records_source_source_id "
+            "ON sync_records (source, source_id)"
+        ))
+
+
+async def _source_start_end_index(engine: AsyncEngine):
+    """Range lookups of one source's activities by time (Strava/Whoop overlap checks)."""
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_sync_records_source_start_end "
+            "ON sync_records (source, activity_start, activity_end)"
+        ))
+
+
+async def _archived_payloads(engine: AsyncEngine):
+    """Index of the raw payload archive (services/payload_archive)."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[ArchivedPayload.__table__])
+
+
+MIGRATIONS = [
+    Migration(1, "baseline", _baseline),
+    Migration(2, "unique sync_records (source, source_id)", _unique_source_id),
+    Migration(3, "index sync_records (source, activity_start, activity_end)",
+              _source_start_end_index, online=True),
+    Migration(4, "archived_payloads table", _archived_payloads),
+]
+
+
+async def _applied(conn: AsyncConnection) -> set[int]:
+    result = await conn.execute(text("SELECT version FROM schema_version"))
+    return {row[0] for row in result.fetchall()}
+
+
+async def _record(conn: AsyncConnection, migrations: list[Migration]):
+    await conn.execute(
+        text(
+            "INSERT INTO schema_version (version, name, applied_at) "
+            "VALUES (:version, :name, CURRENT_TIMESTAMP)"
+        ),
+        [{"version": m.version, "name": m.name} for m in migrations],
+    )
+
+
+async def _apply(engine: AsyncEngine, migration: Migration):
+    started = time.perf_counter()
+    await migration.apply(engine)
+    async with engine.begin() as conn:
+        await _record(conn, [migration])
+    logger.info(
+        "Applied schema migration %d (%s) in %.2fs",
+        migration.version, migration.name, time.perf_counter() - started,
+    )
+
+
+async def pending(engine: AsyncEngine) -> list[Migration]:
+    """Migrations not yet applied, in version order."""
+    async with engine.begin() as conn:
+        if not await _table_exists(conn, "schema_version"):
+            await conn.execute(text(
+                "CREATE TABLE schema_version ("
+                "version INTEGER PRIMARY KEY, name VARCHAR(255), applied_at DATETIME)"
+            ))
+            if not await _table_exists(conn, "sync_records"):
+                # New database: create_all builds the current schema outright
+                await conn.run_sync(Base.metadata.create_all)
+                await _record(conn, MIGRATIONS)
+                return []
+        applied = await _applied(conn)
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+async def migrate(engine: AsyncEngine) -> bool:
+    """Apply pending blocking migrations; True if online ones are left to run."""
+    remaining = await pending(engine)
+    for migration in remaining:
+        if not migration.online:
+            await _apply(engine, migration)
+    return any(m.online for m in remaining)
+
+
+async def migrate_online(engine: AsyncEngine):
+    """Apply pending online migrations, meant to run once the app is serving."""
+    for migration in await pending(engine):
+        if migration.online:
+            await _apply(engine, migration)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, String, Text
+from sqlalchemy import DateTime, Index, Integer, String, Text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -16,6 +16,7 @@ class OAuthToken(Base):
     access_token: Mapped[str] = mapped_column(Text)
     refresh_token: Mapped[str] = mapped_column(Text, nullable=True)
     expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    calendar_id: Mapped[str | None] = mapped_column(String(255), nullable=True)  # google only
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
@@ -24,6 +25,12 @@ class OAuthToken(Base):
 
 class SyncRecord(Base):
     __tablename__ = "sync_records"
+    __table_args__ = (
+        # One record (and so one calendar event) per activity
+        Index("uq_sync_records_source_source_id", "source", "source_id", unique=True),
+        # Range lookups of one source's activities by time (Strava/Whoop overlap checks)
+        Index("ix_sync_records_source_start_end", "source", "activity_start", "activity_end"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     source: Mapped[str] = mapped_column(String(50), index=True)  # strava, whoop
@@ -32,4 +39,59 @@ class SyncRecord(Base):
     google_event_id: Mapped[str] = mapped_column(String(255))
     activity_start: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     activity_end: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Hash of the event body last written, and per top-level field (JSON), to skip no-op writes
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    field_hashes: Mapped[str | None] = mapped_column(Text, nullable=True)
     synced_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class SyncJob(Base):
+    """A queued webhook event, drained by the job_queue workers."""
+
+    __tablename__ = "sync_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    source: Mapped[str] = mapped_column(String(50))  # strava
+    object_id: Mapped[str] = mapped_column(String(255), index=True)
+    aspect_type: Mapped[str] = mapped_column(String(20))  # create, update, delete
+    payload: Mapped[str | None] = mapped_column(Text, nullable=True)  # raw webhook body (JSON)
+    # pending -> running -> (deleted on success) | pending again to retry | failed
+    status: Mapped[str] = mapped_column(String(20), default="pending", index=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    available_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class SyncState(Base):
+    """Small JSON key/value store for sync progress (checkpoints, cursors)."""
+
+    __tablename__ = "sync_state"
+
+    key: Mapped[str] = mapped_column(String(100), primary_key=True)
+    value: Mapped[str] = mapped_column(Text)  # JSON
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+
+class ArchivedPayload(Base):
+    """Where one version of a raw Strava/Whoop payload sits in the payload archive."""
+
+    __tablename__ = "archived_payloads"
+    __table_args__ = (
+        Index("uq_archived_payloads_key", "source", "kind", "source_id", "version", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    source: Mapped[str] = mapped_column(String(50))  # strava, whoop
+    kind: Mapped[str] = mapped_column(String(50))  # activity, summary, workout, sleep, recovery
+    source_id: Mapped[str] = mapped_column(String(255))
+    version: Mapped[int] = mapped_column(Integer)  # 1, 2, ... one per changed payload
+    content_hash: Mapped[str] = mapped_column(String(64))
+    # A gzip member of `length` bytes at `offset` in segment file payloads-<segment>.jsonl.gz
+    segment: Mapped[int] = mapped_column(Integer)
+    offset: Mapped[int] = mapped_column(Integer)
+    length: Mapped[int] = mapped_column(Integer)
+    fetched_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -1,4 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import metrics
+from src.database import get_db
+from src.services import http_clients, job_queue, strava_rate_limit
 
 router = APIRouter()
 
@@ -6,3 +12,46 @@ router = APIRouter()
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@router.get("/health/connections")
+async def connection_stats():
+    """Per-upstream request and connection counts, to confirm keep-alive reuse."""
+    return http_clients.connection_stats()
+
+
+@router.get("/health/queue")
+async def queue_stats(db: AsyncSession = Depends(get_db)):
+    """Webhook queue depth plus enqueue/coalesce/cancel counters since startup."""
+    return {"depth": await job_queue.depth(db), "counters": dict(job_queue.stats)}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics(db: AsyncSession = Depends(get_db)):
+    """Prometheus scrape endpoint (text exposition format)."""
+    depth = await job_queue.depth(db)
+    connections = http_clients.connection_stats()
+    body = metrics.render(
+        metrics.samples(
+            "sync_queue_jobs", "Queued webhook jobs, by status.", "gauge",
+            ("status",),
+            {(s,): depth.get(s, 0) for s in {"pending", "running", "failed", *depth}},
+        ),
+        metrics.samples(
+            "sync_queue_events_total",
+            "Webhook queue events (enqueued, coalesced, cancelled, completed, ...).",
+            "counter", ("event",), {(k,): v for k, v in job_queue.stats.items()},
+        ),
+        metrics.samples(
+            "strava_rate_limiter_total",
+            "Strava limiter decisions (webhook, backfill, throttled, rejected).",
+            "counter", ("event",),
+            {(k,): v for k, v in strava_rate_limit.limiter.stats.items()},
+        ),
+        metrics.samples(
+            "upstream_connections_opened_total", "New TCP connections, by upstream.",
+            "counter", ("upstream",),
+            {(u,): s["connections_opened"] for u, s in connections.items()},
+        ),
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,6 +1,5 @@
 import logging
 
-import httpx
 from fastapi import APIRouter, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.auth.oauth_manager import store_tokens
 from src.config import settings
 from src.database import get_db
+from src.services.http_clients import get_client
 
 logger = logging.getLogger(__name__)
 
@@ -33,18 +33,17 @@ async def strava_auth_redirect():
 @router.get("/callback")
 async def strava_callback(code: str, db: AsyncSession = Depends(get_db)):
     """Handle Strava OAuth callback — exchange code for tokens."""
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            STRAVA_TOKEN_URL,
-            data={
-                "client_id": settings.strava_client_id,
-                "client_secret": settings.strava_client_secret,
-                "code": code,
-                "grant_type": "authorization_code",
-            },
-        )
-        resp.raise_for_status()
-        data = resp.json()
+    resp = await get_client("oauth").post(
+        STRAVA_TOKEN_URL,
+        data={
+            "client_id": settings.strava_client_id,
+            "client_secret": settings.strava_client_secret,
+            "code": code,
+            "grant_type": "authorization_code",
+        },
+    )
+    resp.raise_for_status()
+    data = resp.json()
 
     await store_tokens(
         db,
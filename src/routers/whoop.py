@@ -1,7 +1,6 @@
 import logging
 import secrets
 
-import httpx
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -9,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.auth.oauth_manager import store_tokens
 from src.config import settings
 from src.database import get_db
+from src.services.http_clients import get_client
 
 logger = logging.getLogger(__name__)
 
@@ -47,19 +47,18 @@ async def whoop_callback(code: str | None = None, state: str | None = None, erro
         return HTMLResponse("<h2>Whoop auth failed</h2><p>No authorization code received.</p><p><a href='/'>← Back</a></p>")
     if state:
         _pending_states.discard(state)
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            WHOOP_TOKEN_URL,
-            data={
-                "client_id": settings.whoop_client_id,
-                "client_secret": settings.whoop_client_secret,
-                "code": code,
-                "grant_type": "authorization_code",
-                "redirect_uri": f"{settings.app_base_url}/auth/whoop/callback",
-            },
-        )
-        resp.raise_for_status()
-        data = resp.json()
+    resp = await get_client("oauth").post(
+        WHOOP_TOKEN_URL,
+        data={
+            "client_id": settings.whoop_client_id,
+            "client_secret": settings.whoop_client_secret,
+            "code": code,
+            "grant_type": "authorization_code",
+            "redirect_uri": f"{settings.app_base_url}/auth/whoop/callback",
+        },
+    )
+    resp.raise_for_status()
+    data = resp.json()
 
     logger.info("Whoop token response keys: %s, has refresh: %s, expires_in: %s",
                 list(data.keys()), "refresh_token" in data, data.get("expires_in"))
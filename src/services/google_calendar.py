@@ -1,53 +1,261 @@
+import asyncio
+import json
 import logging
+import re
+import uuid
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from urllib.parse import quote
 
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config import settings
+from src.models import OAuthToken
+from src.services.http_clients import get_client
+
+if TYPE_CHECKING:
+    import httpx
 
 logger = logging.getLogger(__name__)
 
+GOOGLE_API_HOST = "https://www.googleapis.com"
+GOOGLE_CALENDAR_API_BASE = f"{GOOGLE_API_HOST}/calendar/v3"
+GOOGLE_CALENDAR_BATCH_URL = f"{GOOGLE_API_HOST}/batch/calendar/v3"
+
+# Google's limit for calls per Calendar batch request
+MAX_BATCH_SIZE = 50
+
+# Resolved sync calendar ID, mirrored in oauth_tokens.calendar_id for the google row
+_calendar_id: str | None = None
+# Concurrent first syncs must not each create their own calendar
+_calendar_lock = asyncio.Lock()
+
+# Request headers per access token, built once instead of on every event write.
+# Cleared via invalidate_session() when oauth_manager stores a rotated token.
+_sessions: dict[str, "httpx.Headers"] = {}
+
+
+def invalidate_session(access_token: str | None = None):
+    """Drop cached request state for one token, or for all tokens."""
+    if access_token is None:
+        _sessions.clear()
+    else:
+        _sessions.pop(access_token, None)
+
+
+def _headers(access_token: str) -> "httpx.Headers":
+    headers = _sessions.get(access_token)
+    if headers is None:
+        import httpx  # loaded with the HTTP clients, not at startup
+
+        headers = _sessions[access_token] = httpx.Headers(
+            {"Authorization": f"Bearer {access_token}"}
+        )
+    return headers
+
+
+@lru_cache(maxsize=16)
+def _calendar_events_path(calendar_id: str) -> str:
+    return f"/calendar/v3/calendars/{quote(calendar_id, safe='')}/events"
 
-def _get_service(access_token: str, refresh_token: str | None = None):
-    """Build a Google Calendar API service object."""
-    creds = Credentials(
-        token=access_token,
-        refresh_token=refresh_token,
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=settings.google_client_id,
-        client_secret=settings.google_client_secret,
-    )
-    return build("calendar", "v3", credentials=creds)
 
+def _events_path(calendar_id: str, event_id: str | None = None) -> str:
+    path = _calendar_events_path(calendar_id)
+    if event_id:
+        path += f"/{quote(event_id, safe='')}"
+    return path
 
-def find_or_create_calendar(access_token: str, refresh_token: str | None = None) -> str:
+
+def _events_url(calendar_id: str, event_id: str | None = None) -> str:
+    return GOOGLE_API_HOST + _events_path(calendar_id, event_id)
+
+
+async def find_or_create_calendar(access_token: str) -> str:
     """Find the sync calendar by name, or create it. Returns calendar ID."""
-    service = _get_service(access_token, refresh_token)
-    calendars = service.calendarList().list().execute()
-    for cal in calendars.get("items", []):
-        if cal["summary"] == settings.sync_calendar_name:
-            return cal["id"]
+    client = get_client("google")
+    params: dict = {}
+    while True:
+        resp = await client.get(
+            f"{GOOGLE_CALENDAR_API_BASE}/users/me/calendarList",
+            headers=_headers(access_token),
+            params=params,
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        for cal in data.get("items", []):
+            if cal["summary"] == settings.sync_calendar_name:
+                return cal["id"]
+        if not data.get("nextPageToken"):
+            break
+        params["pageToken"] = data["nextPageToken"]
 
-    new_cal = service.calendars().insert(body={"summary": settings.sync_calendar_name}).execute()
+    resp = await client.post(
+        f"{GOOGLE_CALENDAR_API_BASE}/calendars",
+        headers=_headers(access_token),
+        json={"summary": settings.sync_calendar_name},
+    )
+    resp.raise_for_status()
+    new_cal = resp.json()
     logger.info("Created calendar: %s", new_cal["id"])
     return new_cal["id"]
 
 
-def create_event(access_token: str, calendar_id: str, event_body: dict) -> dict:
+async def get_calendar_id(
+    db: AsyncSession, access_token: str, stale: str | None = None
+) -> str:
+    """Return the sync calendar ID from the in-process cache or the database.
+
+    Google is only asked (via find_or_create_calendar) when nothing is stored yet,
+    or when the caller reports `stale` — an ID that just failed a write with 404/410.
+    """
+    global _calendar_id
+    if _calendar_id and _calendar_id != stale:
+        return _calendar_id
+
+    async with _calendar_lock:
+        # Another caller may have resolved it while we waited
+        if _calendar_id and _calendar_id != stale:
+            return _calendar_id
+
+        result = await db.execute(select(OAuthToken).where(OAuthToken.service == "google"))
+        token = result.scalar_one_or_none()
+        if token and token.calendar_id and token.calendar_id != stale:
+            _calendar_id = token.calendar_id
+            return _calendar_id
+
+        calendar_id = await find_or_create_calendar(access_token)
+        if stale:
+            logger.warning("Calendar %s failed a write — re-resolved to %s", stale, calendar_id)
+        if token:
+            token.calendar_id = calendar_id
+            await db.commit()
+        _calendar_id = calendar_id
+        return calendar_id
+
+
+def is_gone(exc: Exception) -> bool:
+    """True if a Calendar call failed because the calendar or event no longer exists."""
+    import httpx
+
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in (404, 410)
+
+
+async def create_event(access_token: str, calendar_id: str, event_body: dict) -> dict:
     """Insert a new event into Google Calendar."""
-    service = _get_service(access_token)
-    return service.events().insert(calendarId=calendar_id, body=event_body).execute()
+    resp = await get_client("google").post(
+        _events_url(calendar_id), headers=_headers(access_token), json=event_body
+    )
+    resp.raise_for_status()
+    return resp.json()
 
 
-def update_event(access_token: str, calendar_id: str, event_id: str, event_body: dict) -> dict:
+async def update_event(
+    access_token: str, calendar_id: str, event_id: str, event_body: dict
+) -> dict:
     """Update an existing Google Calendar event."""
-    service = _get_service(access_token)
-    return (
-        service.events().update(calendarId=calendar_id, eventId=event_id, body=event_body).execute()
+    resp = await get_client("google").put(
+        _events_url(calendar_id, event_id), headers=_headers(access_token), json=event_body
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def patch_event(access_token: str, calendar_id: str, event_id: str, fields: dict) -> dict:
+    """Update only the given top-level fields of an event."""
+    resp = await get_client("google").patch(
+        _events_url(calendar_id, event_id), headers=_headers(access_token), json=fields
     )
+    resp.raise_for_status()
+    return resp.json()
 
 
-def delete_event(access_token: str, calendar_id: str, event_id: str):
+async def delete_event(access_token: str, calendar_id: str, event_id: str):
     """Delete a Google Calendar event."""
-    service = _get_service(access_token)
-    service.events().delete(calendarId=calendar_id, eventId=event_id).execute()
+    resp = await get_client("google").delete(
+        _events_url(calendar_id, event_id), headers=_headers(access_token)
+    )
+    resp.raise_for_status()
+
+
+# A batch call is (HTTP method, API path, JSON body or None)
+BatchCall = tuple[str, str, dict | None]
+
+
+def insert_call(calendar_id: str, event_body: dict) -> BatchCall:
+    return ("POST", _events_path(calendar_id), event_body)
+
+
+def update_call(calendar_id: str, event_id: str, event_body: dict) -> BatchCall:
+    return ("PUT", _events_path(calendar_id, event_id), event_body)
+
+
+def patch_call(calendar_id: str, event_id: str, fields: dict) -> BatchCall:
+    return ("PATCH", _events_path(calendar_id, event_id), fields)
+
+
+def delete_call(calendar_id: str, event_id: str) -> BatchCall:
+    return ("DELETE", _events_path(calendar_id, event_id), None)
+
+
+def _encode_batch(calls: list[BatchCall], boundary: str) -> bytes:
+    parts = []
+    for i, (method, path, body) in enumerate(calls):
+        lines = [
+            f"--{boundary}",
+            "Content-Type: application/http",
+            f"Content-ID: <item{i}>",
+            "",
+            f"{method} {path} HTTP/1.1",
+        ]
+        if body is not None:
+            lines += ["Content-Type: application/json", "", json.dumps(body)]
+        else:
+            lines.append("")
+        parts.append("\r\n".join(lines))
+    parts.append(f"--{boundary}--\r\n")
+    return "\r\n".join(parts).encode()
+
+
+def _decode_batch(resp: "httpx.Response", count: int) -> list[tuple[int, dict | None]]:
+    match = re.search(r'boundary="?([^";]+)"?', resp.headers.get("content-type", ""))
+    if not match:
+        raise ValueError("Calendar batch response is not multipart")
+    results: list[tuple[int, dict | None]] = [(500, None)] * count
+    content = resp.content.replace(b"\r\n", b"\n")
+    for part in content.split(f"--{match.group(1)}".encode())[1:]:
+        if part.startswith(b"--"):
+            break
+        part_headers, _, http = part.strip().partition(b"\n\n")
+        content_id = re.search(rb"content-id:\s*<response-item(\d+)>", part_headers, re.IGNORECASE)
+        if not content_id:
+            continue
+        status_line, _, rest = http.partition(b"\n")
+        # Leading newline so a part with no headers still splits on the blank line
+        _, _, body = (b"\n" + rest).partition(b"\n\n")
+        body = body.strip()
+        results[int(content_id.group(1))] = (
+            int(status_line.split()[1]),
+            json.loads(body) if body else None,
+        )
+    return results
+
+
+async def batch(access_token: str, calls: list[BatchCall]) -> list[tuple[int, dict | None]]:
+    """Send up to MAX_BATCH_SIZE Calendar calls in one HTTP request.
+
+    Returns (status code, JSON body) per call, in the order given. A failed call
+    does not fail the batch — callers check each status.
+    """
+    if len(calls) > MAX_BATCH_SIZE:
+        raise ValueError(f"Calendar batches are limited to {MAX_BATCH_SIZE} calls")
+    if not calls:
+        return []
+    boundary = f"batch_{uuid.uuid4().hex}"
+    headers = _headers(access_token).copy()
+    headers["Content-Type"] = f"multipart/mixed; boundary={boundary}"
+    resp = await get_client("google").post(
+        GOOGLE_CALENDAR_BATCH_URL, headers=headers, content=_encode_batch(calls, boundary)
+    )
+    resp.raise_for_status()
+    return _decode_batch(resp, len(calls))
@@ -0,0 +1,153 @@
+"""Shared, pooled HTTP clients — one per upstream.
+
+Opened once the app is serving and closed on shutdown, so every Strava/Whoop/Google/OAuth
+call reuses keep-alive connections instead of paying a new TCP+TLS handshake. httpx
+itself is imported with the first client, keeping it off the startup path.
+"""
+
+import logging
+import time
+from collections import Counter
+from typing import TYPE_CHECKING
+
+from src import metrics, tracing
+from src.config import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# "oauth" covers the token endpoints of all three providers
+UPSTREAMS = ("strava", "whoop", "google", "oauth")
+
+_clients: dict[str, "httpx.AsyncClient"] = {}
+_stats: dict[str, Counter] = {upstream: Counter() for upstream in UPSTREAMS}
+
+
+def _event_hooks(upstream: str) -> dict:
+    stats = _stats[upstream]
+
+    async def trace(event_name: str, info: dict):
+        # httpcore only connects when no pooled connection is available
+        if event_name == "connection.connect_tcp.complete":
+            stats["connections_opened"] += 1
+
+    async def on_request(request: "httpx.Request"):
+        stats["requests"] += 1
+        request.extensions["trace"] = trace
+        request.extensions["started"] = time.perf_counter()
+        request.extensions["span"] = tracing.start_span(
+            f"{upstream} {request.method}", upstream=upstream, path=request.url.path
+        )
+
+    async def on_response(response: "httpx.Response"):
+        extensions = response.request.extensions
+        started = extensions.get("started")
+        if started is not None:
+            metrics.UPSTREAM_LATENCY.observe(
+                time.perf_counter() - started, upstream, str(response.status_code)
+            )
+        span = extensions.get("span")
+        if span is not None:
+            span.set(status=response.status_code)
+            span.end()
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+class _ObservedTransport:
+    """Wraps the pooled transport to record requests that fail without a response.
+
+    Timeouts and connection errors never reach the response hook, so their latency is
+    observed and their span ended here.
+    """
+
+    def __init__(self, transport: "httpx.AsyncBaseTransport", upstream: str):
+        self._transport = transport
+        self._upstream = upstream
+
+    async def handle_async_request(self, request: "httpx.Request") -> "httpx.Response":
+        try:
+            return await self._transport.handle_async_request(request)
+        except Exception as exc:
+            started = request.extensions.get("started")
+            if started is not None:
+                metrics.UPSTREAM_LATENCY.observe(
+                    time.perf_counter() - started, self._upstream, "error"
+                )
+            span = request.extensions.get("span")
+            if span is not None:
+                span.end(error=exc)
+            raise
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+    async def __aenter__(self):
+        await self._transport.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._transport.__aexit__(*exc_info)
+
+
+def _build_client(upstream: str) -> "httpx.AsyncClient":
+    import httpx
+
+    transport = httpx.AsyncHTTPTransport(
+        # Negotiated via ALPN; upstreams without HTTP/2 fall back to HTTP/1.1
+        http2=settings.http2_enabled,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        ),
+    )
+    return httpx.AsyncClient(
+        transport=_ObservedTransport(transport, upstream),
+        timeout=httpx.Timeout(
+            settings.http_timeout_seconds, connect=settings.http_connect_timeout_seconds
+        ),
+        event_hooks=_event_hooks(upstream),
+    )
+
+
+def open_clients():
+    """Create the pooled client for every upstream (called on app startup)."""
+    for upstream in UPSTREAMS:
+        if upstream not in _clients:
+            _clients[upstream] = _build_client(upstream)
+    logger.info("HTTP clients ready for %s", ", ".join(UPSTREAMS))
+
+
+async def close_clients():
+    """Close every pooled client (called on app shutdown)."""
+    while _clients:
+        _, client = _clients.popitem()
+        await client.aclose()
+
+
+def get_client(upstream: str) -> "httpx.AsyncClient":
+    """Return the shared client for an upstream, creating it on first use outside the app."""
+    client = _clients.get(upstream)
+    if client is None:
+        client = _clients[upstream] = _build_client(upstream)
+    return client
+
+
+def set_client(upstream: str, client: "httpx.AsyncClient"):
+    """Swap in a client for an upstream, e.g. one routed to an in-process fake."""
+    _clients[upstream] = client
+
+
+def connection_stats() -> dict[str, dict[str, int]]:
+    """Requests sent vs connections opened per upstream — reuse is the difference."""
+    return {
+        upstream: {
+            "requests": stats["requests"],
+            "connections_opened": stats["connections_opened"],
+            "connections_reused": max(stats["requests"] - stats["connections_opened"], 0),
+        }
+        for upstream, stats in _stats.items()
+    }
@@ -0,0 +1,44 @@
+"""Sorted, immutable index of time intervals for fast overlap checks.
+
+Intervals are sorted by start, with a running maximum of their ends. Every interval
+that starts before a query's end is a prefix of that order, so one bisect plus a
+look at the prefix maximum answers "does anything overlap?" in O(log n).
+"""
+
+from bisect import bisect_left
+from datetime import UTC, datetime
+
+
+def to_naive_utc(dt: datetime) -> datetime:
+    """Compare everything as naive UTC, the way sync_records stores it."""
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(UTC).replace(tzinfo=None)
+
+
+class IntervalIndex:
+    def __init__(self, intervals: list[tuple[datetime, datetime, str]]):
+        """intervals: (start, end, key) triples, in any order."""
+        rows = sorted((to_naive_utc(s), to_naive_utc(e), key) for s, e, key in intervals)
+        self._starts = [start for start, _, _ in rows]
+        self._keys = [key for _, _, key in rows]
+        # _max_end[i] / _max_at[i]: the latest end among rows[:i + 1], and where it is
+        self._max_end: list[datetime] = []
+        self._max_at: list[int] = []
+        for i, (_, end, _) in enumerate(rows):
+            if i and self._max_end[-1] >= end:
+                self._max_end.append(self._max_end[-1])
+                self._max_at.append(self._max_at[-1])
+            else:
+                self._max_end.append(end)
+                self._max_at.append(i)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def overlapping(self, start: datetime, end: datetime) -> str | None:
+        """Key of an interval overlapping [start, end), or None."""
+        n = bisect_left(self._starts, to_naive_utc(end))
+        if n and self._max_end[n - 1] > to_naive_utc(start):
+            return self._keys[self._max_at[n - 1]]
+        return None
@@ -0,0 +1,306 @@
+"""SQLite-backed queue for webhook events.
+
+The webhook handler only enqueues, so Strava gets its 200 immediately; a pool of
+async workers drains the `sync_jobs` table in the background. A claimed job is
+leased for `queue_visibility_timeout_seconds` — if its worker dies or hangs, the
+lease expires and another worker picks the job up. Jobs left running by a
+previous process are reset on startup, so nothing is lost across restarts.
+
+Jobs also coalesce: Strava often sends several `update` events for one activity
+within seconds, so updates wait `strava_update_coalesce_seconds`, and when a worker
+claims a job it folds in every later create/update still pending for the same
+activity. A later `delete` cancels them all instead. This happens on the worker
+side, so the webhook request only inserts its event (see enqueue).
+"""
+
+import asyncio
+import importlib
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, exists, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from src import tracing
+from src.config import settings
+from src.database import async_session
+from src.models import SyncJob
+
+logger = logging.getLogger(__name__)
+
+# source -> coroutine(db, aspect_type, object_id) that applies the event. Given as
+# "module:function" and imported by the first job, so the sync stack (httpx, the
+# formatters) stays out of the app's startup imports.
+_HANDLERS = {
+    "strava": "src.services.strava_events:process_event",
+}
+
+# Each coalesced or cancelled event skips one activity fetch and one Calendar write
+UPSTREAM_CALLS_PER_EVENT = 2
+
+stats: Counter = Counter()
+
+# Jobs waiting for the next group commit in enqueue(), and the commit in flight
+_uncommitted: list[tuple[SyncJob, asyncio.Future]] = []
+_commit_lock = asyncio.Lock()
+
+_workers: list[asyncio.Task] = []
+_wakeup: asyncio.Event | None = None  # created with the worker pool, on the app's loop
+
+
+async def enqueue(
+    db: AsyncSession, source: str, object_id: str, aspect_type: str, payload: dict | None = None
+) -> SyncJob:
+    """Persist an event for the workers and wake them up.
+
+    Group-committed: events arriving while a commit is in flight are inserted together
+    by the next one, so a burst of webhooks costs a few commits rather than one each,
+    in turn. Folding events for the same object happens when a worker claims a job
+    (_coalesce), not here.
+    """
+    available_at = datetime.utcnow()
+    if aspect_type == "update":
+        available_at += timedelta(seconds=settings.strava_update_coalesce_seconds)
+    job = SyncJob(
+        source=source,
+        object_id=object_id,
+        aspect_type=aspect_type,
+        payload=json.dumps(payload) if payload is not None else None,
+        available_at=available_at,
+    )
+    committed = asyncio.get_running_loop().create_future()
+    _uncommitted.append((job, committed))
+    async with _commit_lock:
+        if not committed.done():
+            # Nobody has committed this job yet: commit it with everything queued since
+            batch = _uncommitted[:]
+            _uncommitted.clear()
+            try:
+                db.add_all([queued for queued, _ in batch])
+                await db.commit()
+            except Exception as exc:
+                # The other requests in the batch fail with the same error
+                for _, done in batch:
+                    if done is not committed:
+                        done.set_exception(exc)
+                raise
+            except BaseException:
+                # Cancelled mid-commit: the next request in line commits the batch instead
+                _uncommitted[:0] = batch
+                raise
+            for _, done in batch:
+                done.set_result(None)
+    committed.result()
+
+    stats["enqueued"] += 1
+    if _wakeup is not None:
+        _wakeup.set()
+    return job
+
+
+async def _coalesce(db: AsyncSession, job: SyncJob):
+    """Fold the object's later pending jobs into the one just claimed.
+
+    One fetch picks up every create/update so far, so those are absorbed. A delete
+    cancels the create/updates before it, and the claimed job becomes that delete.
+    """
+    result = await db.execute(
+        select(SyncJob)
+        .where(
+            SyncJob.source == job.source,
+            SyncJob.object_id == job.object_id,
+            SyncJob.status == "pending",
+            SyncJob.id > job.id,
+        )
+        .order_by(SyncJob.id)
+    )
+    later = list(result.scalars())
+    deletes = [i for i, other in enumerate(later) if other.aspect_type == "delete"]
+    folded = later[: deletes[-1] + 1] if deletes else later
+    if not folded:
+        return
+
+    if deletes:
+        cancelled = [j for j in [job, *folded] if j.aspect_type != "delete"]
+        job.aspect_type = "delete"
+        stats["cancelled"] += len(cancelled)
+        stats["upstream_calls_saved"] += UPSTREAM_CALLS_PER_EVENT * len(cancelled)
+        logger.info(
+            "Delete for %s/%s cancelled %d queued events",
+            job.source, job.object_id, len(cancelled),
+        )
+    else:
+        stats["coalesced"] += len(folded)
+        stats["upstream_calls_saved"] += UPSTREAM_CALLS_PER_EVENT * len(folded)
+        logger.info(
+            "Coalesced %d events for %s/%s into job %d",
+            len(folded), job.source, job.object_id, job.id,
+        )
+    job.payload = folded[-1].payload
+    await db.execute(delete(SyncJob).where(SyncJob.id.in_([j.id for j in folded])))
+    await db.commit()
+
+
+async def claim(db: AsyncSession) -> SyncJob | None:
+    """Lease the oldest runnable job, or return None if there is nothing to do.
+
+    Runnable means pending and due, or running with an expired lease. Events for the
+    same object are applied in order: a job waits while an earlier one is unfinished.
+    """
+    now = datetime.utcnow()
+    earlier = aliased(SyncJob)
+    candidates = await db.execute(
+        select(SyncJob.id, SyncJob.status, SyncJob.attempts)
+        .where(
+            or_(
+                and_(SyncJob.status == "pending", SyncJob.available_at <= now),
+                and_(SyncJob.status == "running", SyncJob.locked_until < now),
+            ),
+            ~exists().where(
+                earlier.source == SyncJob.source,
+                earlier.object_id == SyncJob.object_id,
+                earlier.id < SyncJob.id,
+                earlier.status.in_(("pending", "running")),
+            ),
+        )
+        .order_by(SyncJob.id)
+        .limit(settings.queue_workers + 1)
+    )
+    lease = now + timedelta(seconds=settings.queue_visibility_timeout_seconds)
+    for job_id, status, attempts in candidates.all():
+        # Compare-and-set, so two workers can't lease the same job
+        result = await db.execute(
+            update(SyncJob)
+            .where(SyncJob.id == job_id, SyncJob.status == status, SyncJob.attempts == attempts)
+            .values(status="running", attempts=attempts + 1, locked_until=lease)
+        )
+        await db.commit()
+        if result.rowcount == 1:
+            job = await db.get(SyncJob, job_id, populate_existing=True)
+            await _coalesce(db, job)
+            return job
+    return None
+
+
+async def _fail(db: AsyncSession, job: SyncJob, exc: Exception):
+    job.last_error = f"{type(exc).__name__}: {exc}"[:2000]
+    job.locked_until = None
+    if job.attempts >= settings.queue_max_attempts:
+        job.status = "failed"
+        stats["failed"] += 1
+        logger.error(
+            "Giving up on %s %s/%s after %d attempts: %s",
+            job.aspect_type, job.source, job.object_id, job.attempts, job.last_error,
+        )
+    else:
+        delay = settings.queue_retry_backoff_seconds * 2 ** (job.attempts - 1)
+        job.status = "pending"
+        job.available_at = datetime.utcnow() + timedelta(seconds=delay)
+        stats["retried"] += 1
+        logger.warning(
+            "Retrying %s %s/%s in %ds (attempt %d): %s",
+            job.aspect_type, job.source, job.object_id, delay, job.attempts, job.last_error,
+        )
+    await db.commit()
+
+
+def _handler(source: str):
+    handler = _HANDLERS[source]
+    if isinstance(handler, str):
+        module, _, name = handler.partition(":")
+        handler = _HANDLERS[source] = getattr(importlib.import_module(module), name)
+    return handler
+
+
+async def process_next(db: AsyncSession) -> bool:
+    """Claim and run one job. Returns False if the queue had nothing runnable."""
+    job = await claim(db)
+    if job is None:
+        return False
+
+    handler = _handler(job.source)
+    # One trace per job run: queue wait, then the handler's stages as child spans
+    with tracing.span(
+        f"{job.source}.{job.aspect_type}", source_id=job.object_id, job_id=job.id,
+        attempt=job.attempts,
+        queued_ms=round((datetime.utcnow() - job.created_at).total_seconds() * 1000),
+    ) as job_span:
+        try:
+            await asyncio.wait_for(
+                handler(db, job.aspect_type, job.object_id),
+                timeout=settings.queue_visibility_timeout_seconds,
+            )
+        except Exception as exc:
+            job_span.set(error=repr(exc))
+            logger.exception(
+                "Job %d (%s %s/%s) failed", job.id, job.aspect_type, job.source, job.object_id
+            )
+            await db.rollback()
+            await db.refresh(job)
+            await _fail(db, job, exc)
+        else:
+            await db.delete(job)
+            await db.commit()
+            stats["completed"] += 1
+    return True
+
+
+async def recover_interrupted() -> int:
+    """Return jobs left running by a previous process to the queue (run on startup)."""
+    async with async_session() as db:
+        result = await db.execute(
+            update(SyncJob)
+            .where(SyncJob.status == "running")
+            .values(status="pending", locked_until=None, available_at=datetime.utcnow())
+        )
+        await db.commit()
+    if result.rowcount:
+        logger.info("Requeued %d jobs interrupted by the last shutdown", result.rowcount)
+    return result.rowcount
+
+
+async def depth(db: AsyncSession) -> dict[str, int]:
+    """Number of queued jobs per status."""
+    result = await db.execute(select(SyncJob.status, func.count()).group_by(SyncJob.status))
+    return dict(result.all())
+
+
+async def _wait_for_work():
+    try:
+        await asyncio.wait_for(_wakeup.wait(), timeout=settings.queue_poll_interval_seconds)
+    except TimeoutError:
+        pass
+    _wakeup.clear()
+
+
+async def _worker(n: int):
+    while True:
+        try:
+            async with async_session() as db:
+                processed = await process_next(db)
+        except Exception:
+            logger.exception("Queue worker %d hit an error — continuing", n)
+            processed = False
+        if not processed:
+            await _wait_for_work()
+
+
+def start_workers(count: int | None = None):
+    """Start the worker pool (called on app startup)."""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    count = count or settings.queue_workers
+    for n in range(count):
+        _workers.append(asyncio.create_task(_worker(n), name=f"sync-worker-{n}"))
+    logger.info("Started %d queue workers", count)
+
+
+async def stop_workers():
+    """Cancel the worker pool. Jobs cut off mid-run are requeued on next startup."""
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
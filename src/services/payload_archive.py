@@ -0,0 +1,269 @@
+"""Append-only, compressed archive of the raw Strava and Whoop payloads we fetch.
+
+Calendar events are derived data; keeping what the APIs returned lets history be
+re-rendered (say, after a formatter change) without spending Strava quota again.
+A payload is stored as a new version only when it differs from the latest one.
+
+Each record is its own gzip member holding one JSON line, appended to segment files
+payloads-00001.jsonl.gz, payloads-00002.jsonl.gz, ... under PAYLOAD_ARCHIVE_DIR. A
+segment is therefore a plain .jsonl.gz (zcat reads it), a torn write at the end
+loses only that record, and any record can be read on its own by seeking to it.
+Where each version lives is indexed in archived_payloads by (source, kind,
+source_id, version).
+
+store() only encodes the payloads and queues them; one background writer task compares
+them with the index, compresses and appends them in a thread, and indexes them, so a
+fetch never waits on the archive unless the queue is full. flush() waits for the queue
+to drain and close() also stops the writer (on app shutdown).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import zlib
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.orm import aliased
+
+from src.config import settings
+from src.database import async_session
+from src.models import ArchivedPayload
+
+logger = logging.getLogger(__name__)
+
+_GZIP = 16 + zlib.MAX_WBITS  # zlib wbits for a gzip wrapper
+# Index rows per query when looking up versions, and per decompressed batch when streaming
+_BATCH = 1000
+_COLUMNS = (
+    ArchivedPayload.source, ArchivedPayload.kind, ArchivedPayload.source_id,
+    ArchivedPayload.version, ArchivedPayload.fetched_at, ArchivedPayload.segment,
+    ArchivedPayload.offset, ArchivedPayload.length,
+)
+
+# Batches store() may queue before it waits for the writer
+_QUEUE_SIZE = 256
+
+# A single writer, so offsets and version numbers never collide
+_queue: asyncio.Queue | None = None
+_writer: asyncio.Task | None = None
+
+
+@dataclass(frozen=True)
+class Payload:
+    source: str
+    kind: str
+    source_id: str
+    version: int
+    fetched_at: datetime
+    data: dict
+
+
+def _segment_path(segment: int) -> Path:
+    return Path(settings.payload_archive_dir) / f"payloads-{segment:05d}.jsonl.gz"
+
+
+def _encode(payload: dict) -> bytes:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+
+
+async def _latest(db, source: str, kind: str, source_ids: list[str]) -> dict[str, tuple[int, str]]:
+    """(version, content_hash) of the newest stored version of each of source_ids."""
+    latest: dict[str, tuple[int, str]] = {}
+    for i in range(0, len(source_ids), _BATCH):
+        result = await db.execute(
+            select(ArchivedPayload.source_id, ArchivedPayload.version, ArchivedPayload.content_hash)
+            .where(
+                ArchivedPayload.source == source,
+                ArchivedPayload.kind == kind,
+                ArchivedPayload.source_id.in_(source_ids[i:i + _BATCH]),
+            )
+            .order_by(ArchivedPayload.version)
+        )
+        for source_id, version, content_hash in result:
+            latest[source_id] = (version, content_hash)
+    return latest
+
+
+def _append(segment: int, records: list[bytes]) -> tuple[int, list[tuple[int, int]]]:
+    """Append each record as its own gzip member to the segment, or the next one if it is full.
+
+    Returns the segment written and the (offset, length) of each member.
+    """
+    path = _segment_path(segment)
+    if path.exists() and path.stat().st_size >= settings.payload_archive_segment_bytes:
+        segment += 1
+        path = _segment_path(segment)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    spans = []
+    with path.open("ab") as f:
+        for data in records:
+            member = zlib.compress(data + b"\n", wbits=_GZIP)
+            spans.append((f.tell(), len(member)))
+            f.write(member)
+    return segment, spans
+
+
+async def _write(source: str, kind: str, encoded: dict[str, bytes]):
+    async with async_session() as db:
+        latest = await _latest(db, source, kind, list(encoded))
+        changed = {}
+        for source_id, data in encoded.items():
+            digest = hashlib.sha256(data).hexdigest()
+            if latest.get(source_id, (0, None))[1] != digest:
+                changed[source_id] = (data, digest)
+        if not changed:
+            return
+
+        segment = await db.scalar(select(func.max(ArchivedPayload.segment))) or 1
+        segment, spans = await asyncio.to_thread(
+            _append, segment, [data for data, _ in changed.values()]
+        )
+        rows = [
+            {
+                "source": source, "kind": kind, "source_id": source_id,
+                "version": latest.get(source_id, (0, None))[0] + 1, "content_hash": digest,
+                "segment": segment, "offset": offset, "length": length,
+            }
+            for (source_id, (_, digest)), (offset, length) in zip(changed.items(), spans)
+        ]
+        # Written before indexed: a failure here leaves an unindexed record, never a dangling row
+        await db.execute(insert(ArchivedPayload), rows)
+        await db.commit()
+
+
+async def _write_queued(queue: asyncio.Queue):
+    while True:
+        source, kind, encoded = await queue.get()
+        try:
+            await _write(source, kind, encoded)
+        except Exception:
+            logger.exception("Archiving %d %s %s payloads failed", len(encoded), source, kind)
+        finally:
+            queue.task_done()
+
+
+def _writer_running() -> bool:
+    return (
+        _writer is not None
+        and not _writer.done()
+        and _writer.get_loop() is asyncio.get_running_loop()
+    )
+
+
+def _writer_queue() -> asyncio.Queue:
+    """The writer's queue, starting the writer on first use (or in a new event loop)."""
+    global _queue, _writer
+    if not _writer_running():
+        _queue = asyncio.Queue(_QUEUE_SIZE)
+        _writer = asyncio.create_task(_write_queued(_queue), name="payload-archive-writer")
+    return _queue
+
+
+async def store(source: str, kind: str, payloads: Iterable[dict], key: str = "id"):
+    """Queue the payloads to be archived if they differ from their latest stored version.
+
+    `key` names the field holding each payload's ID. Archiving is best-effort: a
+    failure is logged and never fails the fetch that produced the payloads.
+    """
+    if not settings.payload_archive_dir:
+        return
+    encoded = {str(p[key]): _encode(p) for p in payloads if p.get(key) is not None}
+    if encoded:
+        await _writer_queue().put((source, kind, encoded))
+
+
+async def flush():
+    """Wait until everything queued by store() so far is archived."""
+    if _writer_running():
+        await _queue.join()
+
+
+async def close():
+    """Archive what is queued, then stop the writer (called on app shutdown)."""
+    global _queue, _writer
+    if _writer_running():
+        await _queue.join()
+        _writer.cancel()
+        await asyncio.gather(_writer, return_exceptions=True)
+    _queue = _writer = None
+
+
+def _read(rows: list) -> list[Payload]:
+    """Decompress a batch of index rows, in order, keeping one file open per segment."""
+    payloads = []
+    files = {}
+    try:
+        for row in rows:
+            f = files.get(row.segment)
+            if f is None:
+                f = files[row.segment] = _segment_path(row.segment).open("rb")
+            f.seek(row.offset)
+            data = json.loads(zlib.decompress(f.read(row.length), wbits=_GZIP))
+            payloads.append(Payload(
+                row.source, row.kind, row.source_id, row.version, row.fetched_at, data
+            ))
+    finally:
+        for f in files.values():
+            f.close()
+    return payloads
+
+
+async def iter_payloads(
+    source: str | None = None, kind: str | None = None, latest_only: bool = True
+) -> AsyncIterator[Payload]:
+    """Stream archived payloads in the order they were stored.
+
+    By default only the newest version of each record is yielded. The index is read
+    with one streaming query, and each batch of rows is decompressed in a thread while
+    the caller consumes the previous one.
+    """
+    query = select(*_COLUMNS).order_by(ArchivedPayload.id)
+    if source is not None:
+        query = query.where(ArchivedPayload.source == source)
+    if kind is not None:
+        query = query.where(ArchivedPayload.kind == kind)
+    if latest_only:
+        newer = aliased(ArchivedPayload)
+        query = query.where(~select(newer.id).where(and_(
+            newer.source == ArchivedPayload.source,
+            newer.kind == ArchivedPayload.kind,
+            newer.source_id == ArchivedPayload.source_id,
+            newer.version > ArchivedPayload.version,
+        )).exists())
+
+    async with async_session() as db:
+        result = await db.stream(query)
+        reading = None
+        async for rows in result.partitions(_BATCH):
+            previous, reading = reading, asyncio.create_task(asyncio.to_thread(_read, rows))
+            if previous is not None:
+                for payload in await previous:
+                    yield payload
+        if reading is not None:
+            for payload in await reading:
+                yield payload
+
+
+async def get_payload(
+    source: str, kind: str, source_id: str, version: int | None = None
+) -> Payload | None:
+    """One archived payload; the newest version unless `version` is given."""
+    query = select(*_COLUMNS).where(
+        ArchivedPayload.source == source,
+        ArchivedPayload.kind == kind,
+        ArchivedPayload.source_id == source_id,
+    )
+    if version is None:
+        query = query.order_by(ArchivedPayload.version.desc()).limit(1)
+    else:
+        query = query.where(ArchivedPayload.version == version)
+    async with async_session() as db:
+        row = (await db.execute(query)).first()
+    if row is None:
+        return None
+    return (await asyncio.to_thread(_read, [row]))[0]
@@ -0,0 +1,189 @@
+"""Re-render synced events from the payload archive, e.g. after a formatter change.
+
+Archived Strava and Whoop payloads are streamed through the current formatters and
+each event body's hash is compared with the one last written to Google
+(sync_records.content_hash). Only the events that changed are pushed, through
+sync_activities_batch, so unchanged fields are not even sent. Activities with no sync
+record (never synced, skipped, or deleted since) are left alone, and no Strava or
+Whoop API calls are made.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+
+from sqlalchemy import select
+
+from src.auth.oauth_manager import get_service_token
+from src.database import async_session
+from src.formatters.strava_formatter import format_activities, format_activity
+from src.formatters.whoop_formatter import (
+    format_sleep,
+    format_sleeps,
+    format_workout,
+    format_workouts,
+)
+from src.models import SyncRecord
+from src.services import payload_archive
+from src.services.google_calendar import get_calendar_id
+from src.services.payload_archive import Payload
+from src.services.sync_engine import SyncItem, event_hashes, sync_activities_batch
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ("strava", "whoop")
+# Payloads formatted per batch-formatter call
+_FORMAT_BATCH = 1000
+# What a formatter raises on a payload missing or mistyping a field
+_BAD_PAYLOAD = (AttributeError, KeyError, TypeError, ValueError)
+
+
+async def _batches(payloads: AsyncIterator[Payload]) -> AsyncIterator[list[dict]]:
+    batch = []
+    async for payload in payloads:
+        batch.append(payload.data)
+        if len(batch) == _FORMAT_BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _format(
+    records: list[dict], many: Callable[[list[dict]], Iterator[dict]], one: Callable, stats
+) -> list[tuple[dict, dict]]:
+    """(record, event body) pairs; a payload the formatter rejects is logged and counted."""
+    try:
+        return list(zip(records, many(records), strict=True))
+    except _BAD_PAYLOAD:
+        pairs = []
+        for record in records:
+            try:
+                pairs.append((record, one(record)))
+            except _BAD_PAYLOAD:
+                logger.exception("Cannot format archived payload %s", record.get("id"))
+                stats["invalid"] += 1
+        return pairs
+
+
+async def _strava_items(stats: Counter) -> AsyncIterator[SyncItem]:
+    async for batch in _batches(payload_archive.iter_payloads("strava", "activity")):
+        for activity, body in _format(batch, format_activities, format_activity, stats):
+            yield SyncItem("strava", str(activity["id"]), activity.get("type", "unknown"), body)
+
+
+async def _whoop_items(stats: Counter) -> AsyncIterator[SyncItem]:
+    """Workouts and sleeps as the poller renders them (scored only, sleeps with recovery)."""
+    workouts = payload_archive.iter_payloads("whoop", "workout")
+    async for batch in _batches(workouts):
+        scored = [w for w in batch if w.get("score_state") == "SCORED"]
+        for workout, body in _format(scored, format_workouts, format_workout, stats):
+            yield SyncItem("whoop", str(workout["id"]), "workout", body,
+                           skip_if_strava_overlap=True)
+
+    recovery_by_sleep = {
+        str(p.data["sleep_id"]): p.data
+        async for p in payload_archive.iter_payloads("whoop", "recovery")
+        if p.data.get("score_state") == "SCORED" and p.data.get("sleep_id")
+    }
+
+    def sleeps_with_recovery(sleeps):
+        return format_sleeps(sleeps, recovery_by_sleep)
+
+    def sleep_with_recovery(sleep):
+        return format_sleep(sleep, recovery_by_sleep.get(str(sleep["id"])))
+
+    async for batch in _batches(payload_archive.iter_payloads("whoop", "sleep")):
+        scored = [s for s in batch if s.get("score_state") == "SCORED"]
+        for sleep, body in _format(scored, sleeps_with_recovery, sleep_with_recovery, stats):
+            yield SyncItem("whoop", f"sleep-{sleep['id']}", "sleep", body)
+
+
+_ITEMS = {"strava": _strava_items, "whoop": _whoop_items}
+
+
+async def _written_hashes() -> dict[tuple[str, str], str | None]:
+    async with async_session() as db:
+        result = await db.execute(
+            select(SyncRecord.source, SyncRecord.source_id, SyncRecord.content_hash)
+        )
+        return {(source, source_id): content_hash for source, source_id, content_hash in result}
+
+
+async def rerender(
+    sources: Iterable[str] = SOURCES,
+    dry_run: bool = False,
+    concurrency: int = 4,
+    batch_size: int = 200,
+    progress: Callable[[Counter], None] | None = None,
+) -> Counter:
+    """Push re-rendered events whose body changed; returns the counts.
+
+    "read" archived records were rendered; of those with a sync record, "unchanged"
+    ones are skipped and "changed" ones are pushed (or only counted with dry_run) in
+    batches of `batch_size`, `concurrency` at a time. The sync outcomes (patched,
+    updated, failed, ...) are added to the counts. "untracked" records have no sync
+    record; "invalid" ones could not be formatted. `progress` gets the running counts
+    after every batch.
+    """
+    stats: Counter = Counter()
+    written = await _written_hashes()
+
+    google_token = calendar_id = None
+    if not dry_run:
+        google_token = await get_service_token("google")
+        if not google_token:
+            raise RuntimeError("Google Calendar is not connected")
+        async with async_session() as db:
+            calendar_id = await get_calendar_id(db, google_token)
+
+    slots = asyncio.Semaphore(concurrency)
+    pushes: set[asyncio.Task] = set()
+
+    async def push(items: list[SyncItem]):
+        try:
+            async with async_session() as db:
+                stats.update(await sync_activities_batch(db, items, google_token, calendar_id))
+        except Exception:
+            logger.exception("Re-render batch of %d events failed", len(items))
+            stats["failed"] += len(items)
+        finally:
+            slots.release()
+        if progress:
+            progress(stats)
+
+    async def flush(items: list[SyncItem]):
+        # Waits for a free slot, so at most `concurrency` batches are held in memory
+        await slots.acquire()
+        task = asyncio.create_task(push(items))
+        pushes.add(task)
+        task.add_done_callback(pushes.discard)
+
+    changed: list[SyncItem] = []
+    for source in sources:
+        async for item in _ITEMS[source](stats):
+            stats["read"] += 1
+            if progress and stats["read"] % _FORMAT_BATCH == 0:
+                progress(stats)
+            key = (item.source, item.source_id)
+            if key not in written:
+                stats["untracked"] += 1
+                continue
+            if event_hashes(item.event_body)[0] == written[key]:
+                stats["unchanged"] += 1
+                continue
+            stats["changed"] += 1
+            if dry_run:
+                continue
+            changed.append(item)
+            if len(changed) >= batch_size:
+                await flush(changed)
+                changed = []
+    if changed:
+        await flush(changed)
+    if pushes:
+        await asyncio.gather(*pushes)
+    if progress:
+        progress(stats)
+    return stats
@@ -1,55 +1,182 @@
+import asyncio
 import logging
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import UTC, datetime, timedelta
 
+from src import tracing
 from src.config import settings
 from src.database import async_session
-from src.auth.oauth_manager import get_valid_token
-from src.services.strava_service import list_activities, get_activity
-from src.services.google_calendar import find_or_create_calendar
-from src.services.sync_engine import sync_activity
+from src.auth.oauth_manager import get_service_token
+from src.services import sync_state
+from src.services.strava_rate_limit import PRIORITY_BACKFILL
+from src.services.strava_service import iter_activities, get_activity
+from src.services.google_calendar import get_calendar_id
+from src.services.sync_engine import SyncItem, sync_activities_batch
 from src.formatters.strava_formatter import format_activity
 
 logger = logging.getLogger(__name__)
 
-STRAVA_TOKEN_URL = "https://www.strava.com/oauth/token"
-GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
+# {"after": epoch the run started from, "page": last page written,
+#  "newest_start": start_date of the newest activity written}
+CHECKPOINT_KEY = "strava_backfill"
+# {"ids": activity IDs whose fetch, format or write failed}, retried at the next run's start
+RETRY_KEY = "strava_backfill_retry"
 
 
-async def backfill_strava(days: int = 7):
-    """Fetch recent Strava activities and sync them to Google Calendar."""
-    async with async_session() as db:
-        strava_token = await get_valid_token(
-            db, "strava", STRAVA_TOKEN_URL,
-            settings.strava_client_id, settings.strava_client_secret,
-        )
-        google_token = await get_valid_token(
-            db, "google", GOOGLE_TOKEN_URL,
-            settings.google_client_id, settings.google_client_secret,
-        )
-        if not strava_token or not google_token:
-            logger.warning("Skipping Strava backfill — missing tokens")
-            return
+def _parse_start(start_date: str) -> datetime:
+    """Strava start_date ("...Z") as naive UTC."""
+    return datetime.fromisoformat(start_date).replace(tzinfo=None)
+
+
+def _epoch(dt: datetime) -> int:
+    return int(dt.replace(tzinfo=UTC).timestamp())
+
+
+def _not_found(exc: Exception) -> bool:
+    import httpx
 
-        calendar_id = find_or_create_calendar(google_token)
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 404
 
-        after = int((datetime.utcnow() - timedelta(days=days)).timestamp())
-        activities = await list_activities(strava_token, after=after)
-        logger.info("Strava backfill: found %d activities in last %d days", len(activities), days)
 
-        for a in activities:
+async def _fetch_items(
+    strava_token: str, activities: list[dict]
+) -> tuple[list[SyncItem], list[str]]:
+    """Fetch activity details concurrently (bounded) and turn them into sync items.
+
+    Returns the items and the IDs of activities that failed to fetch or format, which
+    are logged and left out. An activity deleted since it was listed (404) is neither.
+    """
+    sem = asyncio.Semaphore(settings.strava_backfill_concurrency)
+    failed: list[str] = []
+
+    async def fetch(a: dict) -> SyncItem | None:
+        # Includes the wait for a slot and for the rate limiter
+        with tracing.span("strava.get_activity", source_id=str(a["id"])):
+            async with sem:
+                try:
+                    full = await get_activity(strava_token, a["id"], priority=PRIORITY_BACKFILL)
+                except Exception as exc:
+                    if _not_found(exc):
+                        logger.info("Strava activity %s no longer exists — skipping", a["id"])
+                    else:
+                        logger.exception("Error fetching Strava activity %s", a["id"])
+                        failed.append(str(a["id"]))
+                    return None
+        with tracing.span("format", source_id=str(a["id"])):
             try:
-                full = await get_activity(strava_token, a["id"])
                 event_body = format_activity(full)
-                await sync_activity(
-                    db,
-                    source="strava",
-                    source_id=str(a["id"]),
-                    activity_type=full.get("type", "unknown"),
-                    event_body=event_body,
-                    google_access_token=google_token,
-                    calendar_id=calendar_id,
-                )
             except Exception:
-                logger.exception("Error syncing Strava activity %s", a["id"])
+                logger.exception("Error formatting Strava activity %s", a["id"])
+                failed.append(str(a["id"]))
+                return None
+        return SyncItem(
+            source="strava",
+            source_id=str(a["id"]),
+            activity_type=full.get("type", "unknown"),
+            event_body=event_body,
+        )
+
+    items = await asyncio.gather(*(fetch(a) for a in activities))
+    return [item for item in items if item is not None], failed
+
+
+async def _sync(
+    db, strava_token: str, google_token: str, calendar_id: str, activities: list[dict],
+    stats: Counter,
+) -> list[str]:
+    """Fetch and write activities, adding to stats; returns the IDs that failed."""
+    with tracing.span("fetch_details", activities=len(activities)):
+        items, failed = await _fetch_items(strava_token, activities)
+    stats["fetch_failed"] += len(failed)
+    outcomes: dict = {}
+    stats.update(await sync_activities_batch(db, items, google_token, calendar_id, outcomes))
+    return failed + [
+        source_id for (_, source_id), outcome in outcomes.items() if outcome == "failed"
+    ]
+
+
+@tracing.traced("strava.backfill")
+async def backfill_strava(days: int | None = None):
+    """Sync Strava activities to Google Calendar.
+
+    Without `days`, picks up after the stored watermark (or the last
+    `strava_initial_backfill_days` on first run). Pages through the activity list
+    oldest first and writes each page before fetching the next, checkpointing as it
+    goes; an interrupted run resumes after the newest activity it had written.
+
+    Activities that fail to fetch, format or write don't hold the watermark back: their
+    IDs are stored and retried on their own at the start of the next run.
+    """
+    with tracing.span("tokens"):
+        strava_token, google_token = await asyncio.gather(
+            get_service_token("strava"), get_service_token("google")
+        )
+    if not strava_token or not google_token:
+        logger.warning("Skipping Strava backfill — missing tokens")
+        return
+
+    async with async_session() as db:
+        with tracing.span("calendar_id"):
+            calendar_id = await get_calendar_id(db, google_token)
+
+        watermark = await sync_state.get_watermark(db, "strava")
+        if days is not None:
+            since = datetime.utcnow() - timedelta(days=days)
+        else:
+            since = watermark or datetime.utcnow() - timedelta(
+                days=settings.strava_initial_backfill_days
+            )
+        after = _epoch(since)
+        list_after, pages_done = after, 0
+        checkpoint = await sync_state.get_state(db, CHECKPOINT_KEY)
+        if checkpoint and checkpoint["after"] <= after:
+            # Step back a second so activities sharing the newest start aren't skipped
+            newest = _epoch(_parse_start(checkpoint["newest_start"]))
+            list_after = max(after, newest - 1)
+            logger.info(
+                "Resuming Strava backfill after %s (page %d)",
+                checkpoint["newest_start"], checkpoint["page"],
+            )
+            after, pages_done = checkpoint["after"], checkpoint["page"]
+        logger.info("Strava backfill: syncing activities after %s", since.isoformat())
+
+        stats: Counter = Counter()
+        retry = (await sync_state.get_state(db, RETRY_KEY) or {}).get("ids", [])
+        if retry:
+            stats["retried"] = len(retry)
+            with tracing.span("retry_failed", activities=len(retry)):
+                retry = await _sync(
+                    db, strava_token, google_token, calendar_id,
+                    [{"id": int(i)} for i in retry], stats,
+                )
+            await sync_state.set_state(db, RETRY_KEY, {"ids": retry})
+
+        # The watermark only moves if this run leaves no gap behind it
+        advance = watermark is None or after <= _epoch(watermark)
+        async for page, activities in iter_activities(
+            strava_token,
+            after=list_after,
+            per_page=settings.strava_backfill_page_size,
+            priority=PRIORITY_BACKFILL,
+        ):
+            with tracing.span("page", page=pages_done + page):
+                failed = await _sync(
+                    db, strava_token, google_token, calendar_id, activities, stats
+                )
+
+            newest = max(activities, key=lambda a: _parse_start(a["start_date"]))["start_date"]
+            checkpoint = {"after": after, "page": pages_done + page, "newest_start": newest}
+            with tracing.span("checkpoint"):
+                if failed:
+                    # Saved before the checkpoint moves past them
+                    retry = sorted(set(retry) | set(failed))
+                    await sync_state.set_state(db, RETRY_KEY, {"ids": retry})
+                await sync_state.set_state(db, CHECKPOINT_KEY, checkpoint)
+                if advance:
+                    await sync_state.advance_watermark(db, "strava", _parse_start(newest))
+            logger.info(
+                "Strava backfill: page %d done (%d activities)", checkpoint["page"], len(activities)
+            )
 
-        logger.info("Strava backfill complete: synced %d activities", len(activities))
+        await sync_state.clear_state(db, CHECKPOINT_KEY)
+        logger.info("Strava backfill complete: %s", dict(+stats))
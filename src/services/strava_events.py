@@ -0,0 +1,48 @@
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import tracing
+from src.auth.oauth_manager import get_service_token
+from src.formatters.strava_formatter import format_activity
+from src.services.google_calendar import get_calendar_id
+from src.services.strava_service import get_activity
+from src.services.sync_engine import delete_activity, sync_activity
+
+logger = logging.getLogger(__name__)
+
+
+async def process_event(db: AsyncSession, aspect_type: str, object_id: str):
+    """Apply one Strava webhook event (create/update/delete) to Google Calendar."""
+    with tracing.span("tokens"):
+        strava_token, google_token = await asyncio.gather(
+            get_service_token("strava"), get_service_token("google")
+        )
+    if not strava_token or not google_token:
+        # Raised so the queue retries once the missing service is connected
+        raise RuntimeError(
+            f"Not fully connected — strava={bool(strava_token)} google={bool(google_token)}"
+        )
+
+    with tracing.span("calendar_id"):
+        calendar_id = await get_calendar_id(db, google_token)
+
+    if aspect_type in ("create", "update"):
+        with tracing.span("strava.get_activity", source_id=object_id):
+            activity = await get_activity(strava_token, int(object_id))
+        with tracing.span("format"):
+            event_body = format_activity(activity)
+        await sync_activity(
+            db,
+            source="strava",
+            source_id=object_id,
+            activity_type=activity.get("type", "unknown"),
+            event_body=event_body,
+            google_access_token=google_token,
+            calendar_id=calendar_id,
+        )
+        logger.info("Synced Strava activity %s (%s)", object_id, aspect_type)
+    elif aspect_type == "delete":
+        await delete_activity(db, "strava", object_id, google_token, calendar_id)
+        logger.info("Deleted Strava activity %s", object_id)
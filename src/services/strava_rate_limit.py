@@ -0,0 +1,131 @@
+"""Shared request budget for Strava's API rate limits.
+
+Strava allows a fixed number of requests per 15 minutes (windows start on the
+quarter hour, UTC) and per day (from midnight UTC), and reports both the limits
+and current usage on every response in `X-RateLimit-Limit` / `X-RateLimit-Usage`
+("short,daily"). Every Strava call goes through one limiter, which keeps its
+counts in step with those headers. Backfill traffic is held to a share of each
+window, leaving headroom for webhook-driven fetches, and yields to any webhook
+fetch that is waiting.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_WEBHOOK = 0
+PRIORITY_BACKFILL = 1
+
+SHORT_WINDOW_SECONDS = 15 * 60
+DAILY_WINDOW_SECONDS = 24 * 60 * 60
+
+# Longest single sleep while waiting, so header updates are picked up promptly
+_MAX_WAIT_SECONDS = 60.0
+_YIELD_SECONDS = 0.05
+
+
+class StravaRateLimiter:
+    def __init__(
+        self,
+        short_limit: int,
+        daily_limit: int,
+        backfill_reserve: float,
+        short_window: float = SHORT_WINDOW_SECONDS,
+        daily_window: float = DAILY_WINDOW_SECONDS,
+    ):
+        self.short_limit = short_limit
+        self.daily_limit = daily_limit
+        self.backfill_reserve = backfill_reserve
+        self.short_window = short_window
+        self.daily_window = daily_window
+        self.short_used = 0
+        self.daily_used = 0
+        self.stats: Counter = Counter()
+        self._short_index, self._daily_index = self._window_indexes()
+        self._waiting_webhooks = 0
+
+    def _window_indexes(self) -> tuple[int, int]:
+        now = time.time()
+        return int(now // self.short_window), int(now // self.daily_window)
+
+    def _roll(self):
+        short_index, daily_index = self._window_indexes()
+        if short_index != self._short_index:
+            self._short_index, self.short_used = short_index, 0
+        if daily_index != self._daily_index:
+            self._daily_index, self.daily_used = daily_index, 0
+
+    def _caps(self, priority: int) -> tuple[float, float]:
+        share = 1.0 if priority == PRIORITY_WEBHOOK else 1.0 - self.backfill_reserve
+        return self.short_limit * share, self.daily_limit * share
+
+    def _try_take(self, priority: int) -> bool:
+        self._roll()
+        if priority != PRIORITY_WEBHOOK and self._waiting_webhooks:
+            return False
+        short_cap, daily_cap = self._caps(priority)
+        if self.short_used + 1 > short_cap or self.daily_used + 1 > daily_cap:
+            return False
+        self.short_used += 1
+        self.daily_used += 1
+        return True
+
+    def _wait_time(self, priority: int) -> float:
+        if priority != PRIORITY_WEBHOOK and self._waiting_webhooks:
+            return _YIELD_SECONDS
+        now = time.time()
+        _, daily_cap = self._caps(priority)
+        window = self.daily_window if self.daily_used + 1 > daily_cap else self.short_window
+        until_reset = window - now % window
+        return min(until_reset + 0.01, _MAX_WAIT_SECONDS)
+
+    async def acquire(self, priority: int = PRIORITY_WEBHOOK):
+        """Wait until a request at this priority fits in both windows, then count it."""
+        if priority == PRIORITY_WEBHOOK:
+            self._waiting_webhooks += 1
+        try:
+            waited = False
+            while not self._try_take(priority):
+                if not waited:
+                    waited = True
+                    self.stats["throttled"] += 1
+                    logger.info(
+                        "Strava budget: waiting (priority=%d, short=%d/%d, daily=%d/%d)",
+                        priority, self.short_used, self.short_limit,
+                        self.daily_used, self.daily_limit,
+                    )
+                await asyncio.sleep(self._wait_time(priority))
+        finally:
+            if priority == PRIORITY_WEBHOOK:
+                self._waiting_webhooks -= 1
+        self.stats["webhook" if priority == PRIORITY_WEBHOOK else "backfill"] += 1
+
+    def record_response(self, headers, status_code: int):
+        """Sync counts with Strava's view of the budget after a response."""
+        self._roll()
+        try:
+            short_limit, daily_limit = (int(v) for v in headers["X-RateLimit-Limit"].split(","))
+            short_used, daily_used = (int(v) for v in headers["X-RateLimit-Usage"].split(","))
+        except (KeyError, ValueError):
+            short_limit, daily_limit = self.short_limit, self.daily_limit
+            short_used, daily_used = self.short_used, self.daily_used
+        self.short_limit, self.daily_limit = short_limit, daily_limit
+        # Other in-flight requests may not be reflected yet — never count down
+        self.short_used = max(self.short_used, short_used)
+        self.daily_used = max(self.daily_used, daily_used)
+        if status_code == 429:
+            self.stats["rejected"] += 1
+            self.short_used = max(self.short_used, self.short_limit)
+            logger.warning("Strava rate limit hit (usage %d,%d)", short_used, daily_used)
+
+
+limiter = StravaRateLimiter(
+    short_limit=settings.strava_rate_limit_short,
+    daily_limit=settings.strava_rate_limit_daily,
+    backfill_reserve=settings.strava_backfill_reserve,
+)
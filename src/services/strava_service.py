@@ -1,35 +1,73 @@
 import logging
+from collections.abc import AsyncIterator
 
-import httpx
+from src.services import payload_archive, strava_rate_limit
+from src.services.http_clients import get_client
+from src.services.strava_rate_limit import PRIORITY_WEBHOOK
 
 logger = logging.getLogger(__name__)
 
 STRAVA_API_BASE = "https://www.strava.com/api/v3"
 
 
-async def get_activity(access_token: str, activity_id: int) -> dict:
-    """Fetch full activity details from Strava."""
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{STRAVA_API_BASE}/activities/{activity_id}",
+async def _get(path: str, access_token: str, priority: int, params: dict | None = None):
+    """GET from the Strava API within the shared rate-limit budget."""
+    limiter = strava_rate_limit.limiter
+    for attempt in range(2):
+        await limiter.acquire(priority)
+        resp = await get_client("strava").get(
+            f"{STRAVA_API_BASE}{path}",
             headers={"Authorization": f"Bearer {access_token}"},
+            params=params,
         )
-        resp.raise_for_status()
-        return resp.json()
+        limiter.record_response(resp.headers, resp.status_code)
+        # A 429 means another client shared our budget — wait for the window and retry once
+        if resp.status_code != 429 or attempt:
+            break
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def get_activity(
+    access_token: str, activity_id: int, priority: int = PRIORITY_WEBHOOK
+) -> dict:
+    """Fetch full activity details from Strava."""
+    activity = await _get(f"/activities/{activity_id}", access_token, priority)
+    await payload_archive.store("strava", "activity", [activity])
+    return activity
 
 
 async def list_activities(
-    access_token: str, after: int | None = None, per_page: int = 50
+    access_token: str,
+    after: int | None = None,
+    per_page: int = 50,
+    priority: int = PRIORITY_WEBHOOK,
+    page: int = 1,
 ) -> list[dict]:
-    """List athlete activities, optionally filtered by epoch timestamp."""
-    params: dict = {"per_page": per_page}
+    """List one page of athlete activities, optionally filtered by epoch timestamp.
+
+    With `after`, Strava returns activities oldest first.
+    """
+    params: dict = {"per_page": per_page, "page": page}
     if after:
         params["after"] = after
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{STRAVA_API_BASE}/athlete/activities",
-            headers={"Authorization": f"Bearer {access_token}"},
-            params=params,
-        )
-        resp.raise_for_status()
-        return resp.json()
+    activities = await _get("/athlete/activities", access_token, priority, params=params)
+    await payload_archive.store("strava", "summary", activities)
+    return activities
+
+
+async def iter_activities(
+    access_token: str,
+    after: int | None = None,
+    per_page: int = 100,
+    priority: int = PRIORITY_WEBHOOK,
+) -> AsyncIterator[tuple[int, list[dict]]]:
+    """Yield (page number, activities) for every page, stopping at the first short page."""
+    page = 1
+    while True:
+        activities = await list_activities(access_token, after, per_page, priority, page)
+        if activities:
+            yield page, activities
+        if len(activities) < per_page:
+            return
+        page += 1
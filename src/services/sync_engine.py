@@ -1,15 +1,35 @@
+import hashlib
+import json
 import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
 from datetime import datetime
 
+import httpx
 from sqlalchemy import select, and_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src import metrics, tracing
 from src.models import SyncRecord
 from src.services import google_calendar
+from src.services.interval_index import IntervalIndex, to_naive_utc
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class SyncItem:
+    """One pending calendar change for sync_activities_batch. No event body means delete."""
+
+    source: str
+    source_id: str
+    activity_type: str = "unknown"
+    event_body: dict | None = None
+    skip_if_strava_overlap: bool = False
+
+
 def _parse_event_time(event_body: dict) -> tuple[datetime | None, datetime | None]:
     """Extract start/end datetimes from a Google Calendar event body."""
     start = end = None
@@ -21,6 +41,38 @@ def _parse_event_time(event_body: dict) -> tuple[datetime | None, datetime | Non
     return start, end
 
 
+def _digest(value) -> str:
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def event_hashes(event_body: dict) -> tuple[str, dict[str, str]]:
+    """Stable hash of an event body, plus one per top-level field."""
+    fields = {key: _digest(value) for key, value in event_body.items()}
+    return _digest(fields), fields
+
+
+def _set_hashes(record: SyncRecord, event_body: dict):
+    record.content_hash, fields = event_hashes(event_body)
+    record.field_hashes = json.dumps(fields)
+
+
+def _plan_update(record: SyncRecord, event_body: dict) -> tuple[str, dict | None]:
+    """How to bring an existing event up to date: "unchanged", "patched" or "updated".
+
+    Returns the fields to send for a patch. Records written before hashes were kept,
+    and bodies that dropped a field, get a full update.
+    """
+    content_hash, fields = event_hashes(event_body)
+    if record.content_hash == content_hash:
+        return "unchanged", None
+    if record.field_hashes:
+        previous = json.loads(record.field_hashes)
+        if previous.keys() <= fields.keys():
+            return "patched", {k: event_body[k] for k, h in fields.items() if previous.get(k) != h}
+    return "updated", None
+
+
 async def has_strava_overlap(db: AsyncSession, start: datetime, end: datetime) -> bool:
     """Check if any Strava activity overlaps with the given time window."""
     result = await db.execute(
@@ -31,14 +83,127 @@ async def has_strava_overlap(db: AsyncSession, start: datetime, end: datetime) -
             SyncRecord.activity_start < end,
             SyncRecord.activity_end > start,
         )
+        # Walk the (source, activity_start, activity_end) index back from `end`: the
+        # latest-starting candidates are the likeliest to overlap
+        .order_by(SyncRecord.activity_start.desc())
+        .limit(1)
     )
-    overlap = result.scalar_one_or_none()
+    # A workout can span several Strava activities (e.g. a brick) — one is enough
+    overlap = result.scalars().first()
     if overlap:
         logger.info("Skipping Whoop workout — overlaps with Strava activity %s", overlap.source_id)
         return True
     return False
 
 
+async def load_strava_intervals(
+    db: AsyncSession, start: datetime, end: datetime
+) -> IntervalIndex:
+    """Index every synced Strava activity overlapping [start, end), in one query."""
+    result = await db.execute(
+        select(SyncRecord.activity_start, SyncRecord.activity_end, SyncRecord.source_id).where(
+            SyncRecord.source == "strava",
+            SyncRecord.activity_start.isnot(None),
+            SyncRecord.activity_end.isnot(None),
+            SyncRecord.activity_start < to_naive_utc(end),
+            SyncRecord.activity_end > to_naive_utc(start),
+        )
+    )
+    return IntervalIndex(result.all())
+
+
+async def _get_record(db: AsyncSession, source: str, source_id: str) -> SyncRecord | None:
+    result = await db.execute(
+        select(SyncRecord).where(SyncRecord.source == source, SyncRecord.source_id == source_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def _get_records(
+    db: AsyncSession, items: list[SyncItem]
+) -> dict[tuple[str, str], SyncRecord]:
+    """Existing records for many items, with one IN query per source."""
+    by_source: dict[str, list[str]] = {}
+    for item in items:
+        by_source.setdefault(item.source, []).append(item.source_id)
+    records = {}
+    for source, source_ids in by_source.items():
+        result = await db.execute(
+            select(SyncRecord).where(
+                SyncRecord.source == source, SyncRecord.source_id.in_(source_ids)
+            )
+        )
+        records.update({(r.source, r.source_id): r for r in result.scalars()})
+    return records
+
+
+async def _insert_record(
+    db: AsyncSession,
+    source: str,
+    source_id: str,
+    activity_type: str,
+    event_id: str,
+    start: datetime | None,
+    end: datetime | None,
+    event_body: dict,
+) -> int | None:
+    """Insert a SyncRecord unless (source, source_id) already has one.
+
+    Returns the new row's id, or None if another writer got there first.
+    """
+    content_hash, fields = event_hashes(event_body)
+    stmt = (
+        sqlite_insert(SyncRecord)
+        .values(
+            source=source,
+            source_id=source_id,
+            activity_type=activity_type,
+            google_event_id=event_id,
+            activity_start=start,
+            activity_end=end,
+            content_hash=content_hash,
+            field_hashes=json.dumps(fields),
+        )
+        .on_conflict_do_nothing(index_elements=["source", "source_id"])
+        .returning(SyncRecord.id)
+    )
+    return await db.scalar(stmt)
+
+
+async def _discard_duplicate(
+    db: AsyncSession, google_access_token: str, source: str, source_id: str, event_id: str
+):
+    """Delete an event created for an activity that another writer had already synced."""
+    logger.warning("%s/%s was synced concurrently — removing duplicate event", source, source_id)
+    calendar_id = await google_calendar.get_calendar_id(db, google_access_token)
+    try:
+        await google_calendar.delete_event(google_access_token, calendar_id, event_id)
+    except httpx.HTTPStatusError as exc:
+        if not google_calendar.is_gone(exc):
+            raise
+
+
+async def _finish(db: AsyncSession, commit: bool):
+    with tracing.span("db.commit" if commit else "db.flush"):
+        if commit:
+            await db.commit()
+        else:
+            await db.flush()
+
+
+async def _create_event(
+    db: AsyncSession, google_access_token: str, calendar_id: str, event_body: dict
+) -> dict:
+    """Insert an event, re-resolving the sync calendar once if Google reports it gone."""
+    try:
+        return await google_calendar.create_event(google_access_token, calendar_id, event_body)
+    except httpx.HTTPStatusError as exc:
+        if not google_calendar.is_gone(exc):
+            raise
+    calendar_id = await google_calendar.get_calendar_id(db, google_access_token, stale=calendar_id)
+    return await google_calendar.create_event(google_access_token, calendar_id, event_body)
+
+
 async def sync_activity(
     db: AsyncSession,
     source: str,
@@ -48,44 +213,101 @@ async def sync_activity(
     google_access_token: str,
     calendar_id: str,
     skip_if_strava_overlap: bool = False,
+    commit: bool = True,
 ) -> SyncRecord | None:
-    """Sync a single activity to Google Calendar with deduplication."""
+    """Sync a single activity to Google Calendar with deduplication.
+
+    With commit=False the changes are only flushed, so the caller can commit them
+    together with its own writes.
+    """
+    started = time.perf_counter()
+    outcome = "failed"
+    with tracing.span("sync_activity", source=source, source_id=source_id) as span:
+        try:
+            record, outcome = await _sync_activity(
+                db, source, source_id, activity_type, event_body, google_access_token,
+                calendar_id, skip_if_strava_overlap, commit,
+            )
+            return record
+        finally:
+            span.set(outcome=outcome)
+            _observe(source, outcome, started)
+
+
+def _observe(source: str, outcome: str, started: float):
+    metrics.SYNC_DURATION.observe(time.perf_counter() - started, source, outcome)
+    metrics.SYNCED.inc(source, outcome)
+
+
+async def _sync_activity(
+    db: AsyncSession,
+    source: str,
+    source_id: str,
+    activity_type: str,
+    event_body: dict,
+    google_access_token: str,
+    calendar_id: str,
+    skip_if_strava_overlap: bool,
+    commit: bool,
+) -> tuple[SyncRecord | None, str]:
+    """sync_activity, also returning what it did (created, updated, patched, ...)."""
     start, end = _parse_event_time(event_body)
 
     # Skip Whoop workouts that overlap with Strava activities
     if skip_if_strava_overlap and start and end:
-        if await has_strava_overlap(db, start, end):
-            return None
+        with tracing.span("strava_overlap"):
+            if await has_strava_overlap(db, start, end):
+                return None, "skipped"
 
-    # Check for existing sync record
-    existing = await db.execute(
-        select(SyncRecord).where(SyncRecord.source == source, SyncRecord.source_id == source_id)
-    )
-    record = existing.scalar_one_or_none()
+    with tracing.span("lookup"):
+        record = await _get_record(db, source, source_id)
 
     if record:
-        logger.info("Updating existing sync: %s/%s", source, source_id)
-        google_calendar.update_event(
-            google_access_token, calendar_id, record.google_event_id, event_body
-        )
+        action, fields = _plan_update(record, event_body)
+        if action == "unchanged":
+            logger.info("Unchanged, skipping: %s/%s", source, source_id)
+            return record, action
+        logger.info("Updating existing sync (%s): %s/%s", action, source, source_id)
+        try:
+            if action == "patched":
+                await google_calendar.patch_event(
+                    google_access_token, calendar_id, record.google_event_id, fields
+                )
+            else:
+                await google_calendar.update_event(
+                    google_access_token, calendar_id, record.google_event_id, event_body
+                )
+        except httpx.HTTPStatusError as exc:
+            if not google_calendar.is_gone(exc):
+                raise
+            # Event (or the whole calendar) was removed on Google's side — recreate it
+            logger.warning("Event for %s/%s is gone — recreating", source, source_id)
+            calendar_id = await google_calendar.get_calendar_id(
+                db, google_access_token, stale=calendar_id
+            )
+            event = await google_calendar.create_event(google_access_token, calendar_id, event_body)
+            record.google_event_id = event["id"]
         record.activity_start = start
         record.activity_end = end
         record.synced_at = datetime.utcnow()
-    else:
-        logger.info("Creating new sync: %s/%s", source, source_id)
-        event = google_calendar.create_event(google_access_token, calendar_id, event_body)
-        record = SyncRecord(
-            source=source,
-            source_id=source_id,
-            activity_type=activity_type,
-            google_event_id=event["id"],
-            activity_start=start,
-            activity_end=end,
-        )
-        db.add(record)
+        _set_hashes(record, event_body)
+        await _finish(db, commit)
+        return record, action
 
-    await db.commit()
-    return record
+    logger.info("Creating new sync: %s/%s", source, source_id)
+    event = await _create_event(db, google_access_token, calendar_id, event_body)
+    record_id = await _insert_record(
+        db, source, source_id, activity_type, event["id"], start, end, event_body
+    )
+    if record_id is None:
+        # Lost a race with another writer: drop our event and update theirs instead
+        await _discard_duplicate(db, google_access_token, source, source_id, event["id"])
+        return await _sync_activity(
+            db, source, source_id, activity_type, event_body, google_access_token, calendar_id,
+            False, commit,
+        )
+    await _finish(db, commit)
+    return await db.get(SyncRecord, record_id), "created"
 
 
 async def delete_activity(
@@ -94,14 +316,236 @@ async def delete_activity(
     source_id: str,
     google_access_token: str,
     calendar_id: str,
+    commit: bool = True,
 ):
-    """Delete a synced activity from Google Calendar."""
-    existing = await db.execute(
-        select(SyncRecord).where(SyncRecord.source == source, SyncRecord.source_id == source_id)
-    )
-    record = existing.scalar_one_or_none()
-    if record:
-        google_calendar.delete_event(google_access_token, calendar_id, record.google_event_id)
-        await db.delete(record)
+    """Delete a synced activity from Google Calendar (commit as in sync_activity)."""
+    started = time.perf_counter()
+    with tracing.span("delete_activity", source=source, source_id=source_id) as span:
+        record = await _get_record(db, source, source_id)
+        if not record:
+            span.set(outcome="missing")
+            return
+        outcome = "failed"
+        try:
+            try:
+                await google_calendar.delete_event(
+                    google_access_token, calendar_id, record.google_event_id
+                )
+            except httpx.HTTPStatusError as exc:
+                if not google_calendar.is_gone(exc):
+                    raise
+                logger.info("Event for %s/%s was already gone", source, source_id)
+            await db.delete(record)
+            await _finish(db, commit)
+            outcome = "deleted"
+            logger.info("Deleted sync: %s/%s", source, source_id)
+        finally:
+            span.set(outcome=outcome)
+            _observe(source, outcome, started)
+
+
+async def _mark_synced(
+    db: AsyncSession,
+    item: SyncItem,
+    record: SyncRecord | None,
+    start: datetime | None,
+    end: datetime | None,
+    event_id: str,
+) -> bool:
+    """Record a successful write. False if a new record lost an insert race."""
+    if record is None:
+        record_id = await _insert_record(
+            db, item.source, item.source_id, item.activity_type, event_id, start, end,
+            item.event_body,
+        )
+        return record_id is not None
+    record.google_event_id = event_id
+    record.activity_start = start
+    record.activity_end = end
+    record.synced_at = datetime.utcnow()
+    _set_hashes(record, item.event_body)
+    return True
+
+
+def _count(stats: Counter, item: SyncItem, outcome: str, outcomes: dict | None = None):
+    stats[outcome] += 1
+    metrics.SYNCED.inc(item.source, outcome)
+    if outcomes is not None:
+        outcomes[(item.source, item.source_id)] = outcome
+
+
+async def _sync_chunk(
+    db: AsyncSession,
+    chunk: list[SyncItem],
+    google_access_token: str,
+    calendar_id: str,
+    stats: Counter,
+    strava_index: IntervalIndex | None,
+    outcomes: dict,
+) -> str:
+    """Sync one Calendar batch worth of items. Returns the (possibly re-resolved) calendar ID.
+
+    Each item's outcome is recorded in `outcomes` once it is counted; outcomes that
+    write to the database are only counted after the commit.
+    """
+    calls = []
+    plans = []
+    written = []  # (item, outcome) awaiting the commit
+    existing = await _get_records(db, chunk)
+    for item in chunk:
+        record = existing.get((item.source, item.source_id))
+        if item.event_body is None:
+            if record:
+                calls.append(google_calendar.delete_call(calendar_id, record.google_event_id))
+                plans.append((item, record, None, None, "deleted"))
+            continue
+
+        start, end = _parse_event_time(item.event_body)
+        if item.skip_if_strava_overlap and start and end and strava_index is not None:
+            overlap = strava_index.overlapping(start, end)
+            if overlap:
+                logger.info("Skipping Whoop workout — overlaps with Strava activity %s", overlap)
+                _count(stats, item, "skipped", outcomes)
+                continue
+        if record is None:
+            outcome = "created"
+            calls.append(google_calendar.insert_call(calendar_id, item.event_body))
+        else:
+            outcome, fields = _plan_update(record, item.event_body)
+            if outcome == "unchanged":
+                _count(stats, item, "unchanged", outcomes)
+                continue
+            if outcome == "patched":
+                call = google_calendar.patch_call(calendar_id, record.google_event_id, fields)
+            else:
+                call = google_calendar.update_call(
+                    calendar_id, record.google_event_id, item.event_body
+                )
+            calls.append(call)
+        plans.append((item, record, start, end, outcome))
+
+    results = await google_calendar.batch(google_access_token, calls)
+
+    gone = []
+    conflicts = []  # (item, duplicate event ID) for inserts that lost a race
+    for (item, record, start, end, outcome), (status, body) in zip(plans, results):
+        ok = 200 <= status < 300
+        if item.event_body is None:
+            if ok or status in (404, 410):
+                await db.delete(record)
+                written.append((item, "deleted"))
+            else:
+                logger.error(
+                    "Delete failed for %s/%s: HTTP %s", item.source, item.source_id, status
+                )
+                _count(stats, item, "failed", outcomes)
+        elif ok:
+            if await _mark_synced(db, item, record, start, end, body["id"]):
+                written.append((item, outcome))
+            else:
+                conflicts.append((item, body["id"]))
+        elif status in (404, 410):
+            gone.append((item, record, start, end))
+        else:
+            logger.error("Sync failed for %s/%s: HTTP %s", item.source, item.source_id, status)
+            _count(stats, item, "failed", outcomes)
+
+    if gone:
+        # Events (or the calendar) were removed on Google's side — recreate them
+        calendar_id = await google_calendar.get_calendar_id(
+            db, google_access_token, stale=calendar_id
+        )
+        calls = [google_calendar.insert_call(calendar_id, item.event_body) for item, *_ in gone]
+        results = await google_calendar.batch(google_access_token, calls)
+        for (item, record, start, end), (status, body) in zip(gone, results):
+            if 200 <= status < 300:
+                if await _mark_synced(db, item, record, start, end, body["id"]):
+                    written.append((item, "updated" if record else "created"))
+                else:
+                    conflicts.append((item, body["id"]))
+            else:
+                logger.error("Sync failed for %s/%s: HTTP %s", item.source, item.source_id, status)
+                _count(stats, item, "failed", outcomes)
+
+    await db.commit()
+    for item, outcome in written:
+        _count(stats, item, outcome, outcomes)
+
+    # Rare: a webhook synced the same new activity meanwhile — keep its event, update it
+    for item, event_id in conflicts:
+        await _discard_duplicate(db, google_access_token, item.source, item.source_id, event_id)
+        await _sync_activity(
+            db, item.source, item.source_id, item.activity_type, item.event_body,
+            google_access_token, calendar_id, False, False,
+        )
+    if conflicts:
         await db.commit()
-        logger.info("Deleted sync: %s/%s", source, source_id)
+    for item, _ in conflicts:
+        _count(stats, item, "conflicted", outcomes)
+    return calendar_id
+
+
+async def sync_activities_batch(
+    db: AsyncSession,
+    items: list[SyncItem],
+    google_access_token: str,
+    calendar_id: str,
+    outcomes: dict | None = None,
+) -> Counter:
+    """Sync many activities through Calendar batch requests, committing once per batch.
+
+    Existing events are only written if their body changed, and then only the changed
+    fields are sent where possible. Returns counts of created/updated/patched/
+    unchanged/deleted/skipped (Strava overlap)/failed items; `outcomes`, if given, is
+    filled with each item's outcome by (source, source_id).
+    """
+    with tracing.span("sync_batch", items=len(items)) as span:
+        stats = await _sync_batch(
+            db, items, google_access_token, calendar_id, {} if outcomes is None else outcomes
+        )
+        span.set(**+stats)
+    return stats
+
+
+async def _sync_batch(
+    db: AsyncSession,
+    items: list[SyncItem],
+    google_access_token: str,
+    calendar_id: str,
+    outcomes: dict,
+) -> Counter:
+    stats: Counter = Counter()
+    # A later item for the same activity supersedes an earlier one
+    pending = list({(item.source, item.source_id): item for item in items}.values())
+
+    # Load the Strava activities these items could collide with once, not per item
+    windows = [
+        _parse_event_time(item.event_body)
+        for item in pending
+        if item.skip_if_strava_overlap and item.event_body
+    ]
+    windows = [(start, end) for start, end in windows if start and end]
+    strava_index = None
+    if windows:
+        with tracing.span("strava_overlap"):
+            strava_index = await load_strava_intervals(
+                db, min(start for start, _ in windows), max(end for _, end in windows)
+            )
+
+    size = google_calendar.MAX_BATCH_SIZE
+    for offset in range(0, len(pending), size):
+        chunk = pending[offset : offset + size]
+        with tracing.span("sync_chunk", items=len(chunk)) as span:
+            try:
+                calendar_id = await _sync_chunk(
+                    db, chunk, google_access_token, calendar_id, stats, strava_index, outcomes
+                )
+            except Exception as exc:
+                span.set(error=repr(exc))
+                logger.exception("Calendar batch of %d items failed", len(chunk))
+                await db.rollback()
+                # Items already counted were skipped, failed or committed before the error
+                for item in chunk:
+                    if (item.source, item.source_id) not in outcomes:
+                        _count(stats, item, "failed", outcomes)
+    return stats
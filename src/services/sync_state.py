@@ -0,0 +1,40 @@
+"""Persisted sync progress — watermarks, backfill checkpoints and other small JSON values."""
+
+import json
+from datetime import datetime
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import SyncState
+
+
+async def get_state(db: AsyncSession, key: str) -> dict | None:
+    row = await db.get(SyncState, key)
+    return json.loads(row.value) if row else None
+
+
+async def set_state(db: AsyncSession, key: str, value: dict):
+    """Store value under key and commit."""
+    await db.merge(SyncState(key=key, value=json.dumps(value)))
+    await db.commit()
+
+
+async def clear_state(db: AsyncSession, key: str):
+    await db.execute(delete(SyncState).where(SyncState.key == key))
+    await db.commit()
+
+
+# Per-source high-water mark: the newest activity time up to which everything is synced
+
+
+async def get_watermark(db: AsyncSession, source: str) -> datetime | None:
+    state = await get_state(db, f"watermark:{source}")
+    return datetime.fromisoformat(state["synced_through"]) if state else None
+
+
+async def advance_watermark(db: AsyncSession, source: str, synced_through: datetime):
+    """Move a source's watermark forward to synced_through (naive UTC); never moves back."""
+    current = await get_watermark(db, source)
+    if current is None or synced_through > current:
+        await set_state(db, f"watermark:{source}", {"synced_through": synced_through.isoformat()})
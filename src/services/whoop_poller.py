@@ -1,70 +1,216 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta
 
+from src import tracing
 from src.config import settings
 from src.database import async_session
-from src.auth.oauth_manager import get_valid_token
-from src.services.whoop_service import get_workouts, get_sleep
-from src.services.google_calendar import find_or_create_calendar
-from src.services.sync_engine import sync_activity
+from src.auth.oauth_manager import get_service_token
+from src.services import sync_state
+from src.services.whoop_service import get_workouts, get_sleep, get_recoveries, get_sleep_by_id
+from src.services.google_calendar import get_calendar_id
+from src.services.sync_engine import SyncItem, sync_activities_batch
 from src.formatters.whoop_formatter import format_workout, format_sleep
 
 logger = logging.getLogger(__name__)
 
-WHOOP_TOKEN_URL = "https://api.prod.whoop.com/oauth/oauth2/token"
-GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
+# A recovery belongs to the cycle that started before its sleep, so read a little further back
+_RECOVERY_LOOKBACK = timedelta(days=1)
 
-async def poll_whoop():
-    """Fetch new Whoop data and sync to Google Calendar."""
-    async with async_session() as db:
-        whoop_token = await get_valid_token(
-            db, "whoop", WHOOP_TOKEN_URL,
-            settings.whoop_client_id, settings.whoop_client_secret,
-        )
-        google_token = await get_valid_token(
-            db, "google", GOOGLE_TOKEN_URL,
-            settings.google_client_id, settings.google_client_secret,
-        )
-        if not whoop_token or not google_token:
-            logger.warning("Skipping Whoop poll — missing tokens (whoop=%s google=%s)",
-                           bool(whoop_token), bool(google_token))
-            return
 
-        calendar_id = find_or_create_calendar(google_token)
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat() + "Z"
+
+
+def _cursor_key(resource: str) -> str:
+    return f"whoop_cursor:{resource}"
+
+
+async def _window(db, resource: str) -> tuple[dict | None, datetime, datetime | None]:
+    """A resource's cursor, the `start` to fetch from, and the newest `updated_at` seen.
+
+    Whoop filters on a record's `start`, so each poll re-reads `whoop_recheck_hours`
+    before the cursor; comparing `updated_at` then picks out records scored (or
+    re-scored) since the last poll.
+    """
+    cursor = await sync_state.get_state(db, _cursor_key(resource))
+    if not cursor:
+        since = datetime.utcnow() - timedelta(hours=settings.whoop_initial_lookback_hours)
+        return None, since, None
+    since = _parse_time(cursor["start"]) - timedelta(hours=settings.whoop_recheck_hours)
+    return cursor, since, _parse_time(cursor["updated_at"])
+
+
+def _changed(records: list[dict], seen: datetime | None) -> list[dict]:
+    """Records that are new or updated since the last poll."""
+    if seen is None:
+        return records
+    return [r for r in records if "updated_at" not in r or _parse_time(r["updated_at"]) > seen]
+
+
+def _next_cursor(
+    records: list[dict], cursor: dict | None, since: datetime, failed: list[dict] = ()
+) -> dict | None:
+    """Cursor to store once `records` are synced, held at the oldest record pending a score
+    or whose write failed.
+
+    UNSCORABLE records never get a score, so they don't hold it. A failed record also holds
+    `updated_at` just below its own, so the next poll sees it as changed.
+    """
+    if not records:
+        return None
+    starts = [_parse_time(r["start"]) for r in records if "start" in r]
+    updated = [_parse_time(r["updated_at"]) for r in records if "updated_at" in r]
+    newest = max(starts) if starts else since
+    if cursor:
+        newest = max(newest, _parse_time(cursor["start"]))
+        updated.append(_parse_time(cursor["updated_at"]))
+    held = [
+        _parse_time(r["start"]) for r in records
+        if "start" in r and r.get("score_state") == "PENDING_SCORE"
+    ]
+    held += [_parse_time(r["start"]) for r in failed if "start" in r]
+    seen = max(updated) if updated else since
+    failed_updates = [_parse_time(r["updated_at"]) for r in failed if "updated_at" in r]
+    if failed_updates:
+        seen = min(seen, min(failed_updates) - timedelta(microseconds=1))
+    return {
+        "start": (min(held) if held else newest).isoformat(),
+        "updated_at": seen.isoformat(),
+    }
+
 
-        # Always look back 24 hours — polls are infrequent (twice daily)
-        # and the sync engine deduplicates, so overlap is harmless
-        start_filter = (datetime.utcnow() - timedelta(hours=24)).isoformat() + "Z"
+async def _sleep_items(
+    whoop_token: str, sleeps: list[dict], recoveries: list[dict], windows: dict
+) -> list[SyncItem]:
+    """Sleep events joined with their recovery, for sleeps or recoveries that changed."""
+    # Scored recoveries by the sleep they follow, for an O(1) join per sleep
+    recovery_by_sleep = {
+        str(r["sleep_id"]): r for r in recoveries
+        if r.get("score_state") == "SCORED" and r.get("sleep_id")
+    }
+    sleep_by_id = {str(s["id"]): s for s in sleeps}
+    to_render = {str(s["id"]): s for s in _changed(sleeps, windows["sleep"][2])}
 
-        # Fetch workouts
+    # A recovery that scored late only re-renders the sleep it belongs to
+    for r in _changed(recoveries, windows["recovery"][2]):
+        sleep_id = str(r.get("sleep_id"))
+        if sleep_id not in recovery_by_sleep or sleep_id in to_render:
+            continue
+        sleep = sleep_by_id.get(sleep_id)
+        if sleep is None:
+            try:
+                sleep = await get_sleep_by_id(whoop_token, sleep_id)
+            except Exception:
+                logger.exception("Error fetching Whoop sleep %s", sleep_id)
+                continue
+        to_render[sleep_id] = sleep
+
+    items = []
+    for sleep_id, s in to_render.items():
+        if s.get("score_state") != "SCORED":
+            continue
         try:
-            workouts = await get_workouts(whoop_token, start=start_filter)
-            for w in workouts:
-                if w.get("score_state") != "SCORED":
-                    continue
-                event_body = format_workout(w)
-                await sync_activity(
-                    db, source="whoop", source_id=str(w["id"]),
-                    activity_type="workout", event_body=event_body,
-                    google_access_token=google_token, calendar_id=calendar_id,
-                    skip_if_strava_overlap=True,
-                )
-            logger.info("Synced %d Whoop workouts", len(workouts))
+            event_body = format_sleep(s, recovery_by_sleep.get(sleep_id))
         except Exception:
-            logger.exception("Error fetching Whoop workouts")
+            logger.exception("Error formatting Whoop sleep %s", sleep_id)
+            continue
+        items.append(SyncItem(
+            source="whoop", source_id=f"sleep-{sleep_id}",
+            activity_type="sleep", event_body=event_body,
+        ))
+    return items
 
-        # Fetch sleep
+
+def _workout_items(workouts: list[dict]) -> list[SyncItem]:
+    """Events for scored workouts; one the formatter rejects is logged and skipped."""
+    items = []
+    for w in workouts:
+        if w.get("score_state") != "SCORED":
+            continue
         try:
-            sleep_records = await get_sleep(whoop_token, start=start_filter)
-            for s in sleep_records:
-                if s.get("score_state") != "SCORED":
-                    continue
-                event_body = format_sleep(s)
-                await sync_activity(
-                    db, source="whoop", source_id=f"sleep-{s['id']}",
-                    activity_type="sleep", event_body=event_body,
-                    google_access_token=google_token, calendar_id=calendar_id,
-                )
-            logger.info("Synced %d Whoop sleep records", len(sleep_records))
+            event_body = format_workout(w)
         except Exception:
-            logger.exception("Error fetching Whoop sleep")
+            logger.exception("Error formatting Whoop workout %s", w.get("id"))
+            continue
+        items.append(SyncItem(
+            source="whoop", source_id=str(w["id"]),
+            activity_type="workout", event_body=event_body,
+            skip_if_strava_overlap=True,
+        ))
+    return items
+
+
+@tracing.traced("whoop.poll")
+async def poll_whoop():
+    """Fetch new and changed Whoop data and sync to Google Calendar."""
+    with tracing.span("tokens"):
+        whoop_token, google_token = await asyncio.gather(
+            get_service_token("whoop"), get_service_token("google")
+        )
+    if not whoop_token or not google_token:
+        logger.warning("Skipping Whoop poll — missing tokens (whoop=%s google=%s)",
+                       bool(whoop_token), bool(google_token))
+        return
+
+    async with async_session() as db:
+        with tracing.span("calendar_id"):
+            calendar_id = await get_calendar_id(db, google_token)
+
+        windows = {r: await _window(db, r) for r in ("workout", "sleep", "recovery")}
+        # Recoveries have no start of their own; read them for the sleeps being read
+        sleep_since = windows["sleep"][1]
+        requests = {
+            "workout": get_workouts(whoop_token, start=_iso(windows["workout"][1])),
+            "sleep": get_sleep(whoop_token, start=_iso(sleep_since)),
+            "recovery": get_recoveries(whoop_token, start=_iso(sleep_since - _RECOVERY_LOOKBACK)),
+        }
+        with tracing.span("whoop.fetch"):
+            results = await asyncio.gather(*requests.values(), return_exceptions=True)
+
+        fetched: dict[str, list[dict]] = {}
+        for resource, result in zip(requests, results):
+            if isinstance(result, Exception):
+                logger.error("Error fetching Whoop %s: %r", resource, result)
+            else:
+                fetched[resource] = result
+                logger.info("Fetched %d Whoop %s records", len(result), resource)
+        if "sleep" not in fetched or "recovery" not in fetched:
+            # Sleep events are rendered with their recovery — sync both or neither
+            fetched.pop("sleep", None)
+            fetched.pop("recovery", None)
+
+        with tracing.span("format") as span:
+            items = _workout_items(
+                _changed(fetched.get("workout", []), windows["workout"][2])
+            )
+            if "sleep" in fetched:
+                items += await _sleep_items(
+                    whoop_token, fetched["sleep"], fetched["recovery"], windows
+                )
+            span.set(items=len(items))
+
+        outcomes: dict = {}
+        stats = await sync_activities_batch(db, items, google_token, calendar_id, outcomes)
+        logger.info("Whoop poll complete: %s", dict(stats))
+
+        failed_ids = {source_id for (_, source_id), o in outcomes.items() if o == "failed"}
+        failed = {
+            "workout": [w for w in fetched.get("workout", []) if str(w["id"]) in failed_ids],
+            "sleep": [s for s in fetched.get("sleep", []) if f"sleep-{s['id']}" in failed_ids],
+            "recovery": [
+                r for r in fetched.get("recovery", [])
+                if f"sleep-{r.get('sleep_id')}" in failed_ids
+            ],
+        }
+        # A resource whose fetch failed keeps its old cursor; one whose writes failed is held
+        # at those records
+        for resource, records in fetched.items():
+            cursor, since, _ = windows[resource]
+            new_cursor = _next_cursor(records, cursor, since, failed[resource])
+            if new_cursor:
+                await sync_state.set_state(db, _cursor_key(resource), new_cursor)
@@ -1,52 +1,59 @@
 import logging
 
-import httpx
+from src.services import payload_archive
+from src.services.http_clients import get_client
 
 logger = logging.getLogger(__name__)
 
 WHOOP_API_BASE = "https://api.prod.whoop.com/developer/v2"
+MAX_PAGE_SIZE = 25  # the largest `limit` Whoop accepts
 
 
-async def get_workouts(access_token: str, start: str | None = None) -> list[dict]:
-    """Fetch workouts from Whoop. `start` is an ISO datetime string."""
-    params = {}
+async def _get_all(
+    path: str, kind: str, access_token: str, start: str | None = None, key: str = "id"
+) -> list[dict]:
+    """Fetch every page of a Whoop collection, following next_token, and archive it."""
+    params: dict = {"limit": MAX_PAGE_SIZE}
     if start:
         params["start"] = start
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{WHOOP_API_BASE}/activity/workout",
+    records: list[dict] = []
+    while True:
+        resp = await get_client("whoop").get(
+            f"{WHOOP_API_BASE}{path}",
             headers={"Authorization": f"Bearer {access_token}"},
             params=params,
         )
         resp.raise_for_status()
-        return resp.json().get("records", [])
+        data = resp.json()
+        records.extend(data.get("records", []))
+        if not data.get("next_token"):
+            await payload_archive.store("whoop", kind, records, key)
+            return records
+        params["nextToken"] = data["next_token"]
+
+
+async def get_workouts(access_token: str, start: str | None = None) -> list[dict]:
+    """Fetch workouts from Whoop. `start` is an ISO datetime string."""
+    return await _get_all("/activity/workout", "workout", access_token, start)
 
 
 async def get_sleep(access_token: str, start: str | None = None) -> list[dict]:
     """Fetch sleep records from Whoop."""
-    params = {}
-    if start:
-        params["start"] = start
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{WHOOP_API_BASE}/activity/sleep",
-            headers={"Authorization": f"Bearer {access_token}"},
-            params=params,
-        )
-        resp.raise_for_status()
-        return resp.json().get("records", [])
+    return await _get_all("/activity/sleep", "sleep", access_token, start)
 
 
-async def get_cycles(access_token: str, start: str | None = None) -> list[dict]:
-    """Fetch cycles (which contain recovery data) from Whoop."""
-    params = {}
-    if start:
-        params["start"] = start
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{WHOOP_API_BASE}/cycle",
-            headers={"Authorization": f"Bearer {access_token}"},
-            params=params,
-        )
-        resp.raise_for_status()
-        return resp.json().get("records", [])
+async def get_recoveries(access_token: str, start: str | None = None) -> list[dict]:
+    """Fetch recovery scores from Whoop; each references its `sleep_id` and `cycle_id`."""
+    return await _get_all("/recovery", "recovery", access_token, start, key="cycle_id")
+
+
+async def get_sleep_by_id(access_token: str, sleep_id: str) -> dict:
+    """Fetch a single sleep record."""
+    resp = await get_client("whoop").get(
+        f"{WHOOP_API_BASE}/activity/sleep/{sleep_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    resp.raise_for_status()
+    sleep = resp.json()
+    await payload_archive.store("whoop", "sleep", [sleep])
+    return sleep
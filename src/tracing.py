@@ -0,0 +1,200 @@
+"""Lightweight tracing: nested timing spans, handed to an exporter as they finish.
+
+`span()` opens a child of the current span — kept in a contextvar, so it follows
+asyncio tasks and gather() — and a span with no parent starts a new trace. Until
+an exporter is set (TRACE_EXPORT_PATH), spans cost one None check.
+"""
+
+import functools
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = (
+        "_started", "attributes", "duration", "error", "name", "parent_id", "span_id",
+        "start", "trace_id",
+    )
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict):
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.start = time.time()
+        self.duration: float | None = None
+        self.attributes = attributes
+        self.error: str | None = None
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, error: BaseException | None = None):
+        self.duration = time.perf_counter() - self._started
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if _exporter is not None:
+            try:
+                _exporter.export(self)
+            except Exception:
+                logger.exception("Trace export failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+    def end(self, error: BaseException | None = None):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Exporter(Protocol):
+    def export(self, span: Span) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per finished span; flushed when a trace's root ends."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")  # noqa: SIM115 — open until close()
+
+    def export(self, span: Span):
+        self._file.write(json.dumps(span.to_dict(), default=str) + "\n")
+        if span.parent_id is None:
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+_exporter: Exporter | None = None
+_current: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def set_exporter(exporter: Exporter | None):
+    """Install the exporter spans go to (None disables tracing), closing the previous one."""
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    if previous is not None:
+        previous.close()
+
+
+def start_span(name: str, **attributes) -> Span | _NoopSpan:
+    """A child of the current span that is not made current; the caller must end() it.
+
+    For spans that open and close in different callbacks, such as HTTP event hooks.
+    """
+    if _exporter is None:
+        return _NOOP
+    return Span(name, _current.get(), attributes)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the enclosed block as a child of the current span."""
+    if _exporter is None:
+        yield _NOOP
+        return
+    current = Span(name, _current.get(), attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+def traced(name: str):
+    """Decorator: run an async function inside span(name)."""
+
+    def decorate(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def load_traces(path: str) -> dict[str, list[dict]]:
+    """Spans from a JSON-lines export, grouped by trace ID."""
+    traces: dict[str, list[dict]] = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                traces[record["trace_id"]].append(record)
+    return dict(traces)
+
+
+def root(spans: list[dict]) -> dict:
+    """The span a trace started from (its earliest span if the root was not exported)."""
+    roots = [s for s in spans if s["parent_id"] is None]
+    return min(roots or spans, key=lambda s: s["start"])
+
+
+def waterfall(spans: list[dict], width: int = 40) -> list[str]:
+    """One line per span, children under their parent in start order, with a timeline bar."""
+    top = root(spans)
+    origin = min(s["start"] for s in spans)
+    total = max(s["start"] + (s["duration"] or 0) for s in spans) - origin or 1e-9
+    children = defaultdict(list)
+    for s in spans:
+        children[s["parent_id"]].append(s)
+
+    lines = []
+
+    def visit(node: dict, depth: int):
+        offset = node["start"] - origin
+        duration = node["duration"] or 0
+        lead = round(offset / total * width)
+        bar = (" " * lead + "#" * max(1, round(duration / total * width)))[:width]
+        attrs = " ".join(f"{k}={v}" for k, v in node["attributes"].items())
+        if node["error"]:
+            attrs = f"{attrs} error={node['error']}".strip()
+        name = "  " * depth + node["name"]
+        lines.append(
+            f"{offset * 1000:9.1f}ms {duration * 1000:9.1f}ms  |{bar:<{width}}|  {name}"
+            + (f"  {attrs}" if attrs else "")
+        )
+        for child in sorted(children[node["span_id"]], key=lambda s: s["start"]):
+            visit(child, depth + 1)
+
+    visit(top, 0)
+    # Spans whose parent was never exported (e.g. cut off by a crash)
+    known = {s["span_id"] for s in spans}
+    for s in spans:
+        if s is not top and s["parent_id"] not in known:
+            visit(s, 1)
+    return lines
@@ -1,4 +1,54 @@
+import asyncio
+from collections import defaultdict
+
 import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.auth import oauth_manager
+from src.config import settings
+from src.database import tune_sqlite
+from src.models import Base
+from src.services import google_calendar, http_clients, job_queue
+from tests.fakes import FakeGoogleCalendar
+
+
+@pytest.fixture(autouse=True)
+def _reset_caches(monkeypatch):
+    """Module-level caches must not leak between tests."""
+    monkeypatch.setattr(oauth_manager, "_token_cache", {})
+    monkeypatch.setattr(oauth_manager, "_refresh_locks", defaultdict(asyncio.Lock))
+    monkeypatch.setattr(google_calendar, "_calendar_id", None)
+    monkeypatch.setattr(google_calendar, "_calendar_lock", asyncio.Lock())
+    monkeypatch.setattr(job_queue, "_commit_lock", asyncio.Lock())
+    monkeypatch.setattr(job_queue, "_uncommitted", [])
+    monkeypatch.setattr(google_calendar, "_sessions", {})
+    # Tests that archive payloads point this at tmp_path
+    monkeypatch.setattr(settings, "payload_archive_dir", "")
+
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    tune_sqlite(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db(session_factory):
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+async def fake_google(monkeypatch):
+    fake = FakeGoogleCalendar()
+    client = fake.client()
+    monkeypatch.setitem(http_clients._clients, "google", client)
+    yield fake
+    await client.aclose()
 
 
 @pytest.fixture
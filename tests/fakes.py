@@ -0,0 +1,361 @@
+"""In-process stand-ins for the upstream APIs, for tests and benchmarks.
+
+Each fake wraps a small FastAPI app; point an ``httpx.AsyncClient`` at it with
+``httpx.ASGITransport(app=fake.app)`` and no network traffic leaves the process.
+All of them take a fixed ``latency`` per request and an ``error_rate``: the share
+of requests answered with a transient 503, drawn from a ``seed``ed generator.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from typing import ClassVar
+from urllib.parse import unquote
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+_EVENTS_PATH = re.compile(r"^/calendar/v3/calendars/([^/]+)/events(?:/([^/]+))?$")
+
+
+def _with_errors(app, fake):
+    """Wrap an ASGI app so `fake.error_rate` of its requests fail with a 503."""
+    if not fake.error_rate:
+        return app
+
+    async def asgi(scope, receive, send):
+        if scope["type"] == "http" and fake._random.random() < fake.error_rate:
+            fake.calls["errors"] += 1
+            response = JSONResponse(status_code=503, content={"error": "backendError"})
+            await response(scope, receive, send)
+            return
+        await app(scope, receive, send)
+
+    return asgi
+
+
+class FakeGoogleCalendar:
+    """Minimal Google Calendar v3: calendar list/insert, event CRUD and batch requests."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.calendars: dict[str, dict] = {}
+        self.events: dict[str, dict[str, dict]] = {}
+        self.calls: Counter = Counter()
+        self._ids = itertools.count(1)
+        self.app = _with_errors(self._build_app(), self)
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app))
+
+    async def _delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    # Event operations shared by the REST routes and the batch endpoint
+
+    def _insert(self, calendar_id: str, body: dict) -> tuple[int, dict | None]:
+        self.calls["events.insert"] += 1
+        if calendar_id not in self.events:
+            return 404, {"error": "notFound"}
+        event = {"id": f"evt{next(self._ids)}", **body}
+        self.events[calendar_id][event["id"]] = event
+        return 200, event
+
+    def _update(self, calendar_id: str, event_id: str, body: dict) -> tuple[int, dict | None]:
+        self.calls["events.update"] += 1
+        if event_id not in self.events.get(calendar_id, {}):
+            return 404, {"error": "notFound"}
+        event = {"id": event_id, **body}
+        self.events[calendar_id][event_id] = event
+        return 200, event
+
+    def _patch(self, calendar_id: str, event_id: str, fields: dict) -> tuple[int, dict | None]:
+        self.calls["events.patch"] += 1
+        event = self.events.get(calendar_id, {}).get(event_id)
+        if event is None:
+            return 404, {"error": "notFound"}
+        event.update(fields)
+        return 200, event
+
+    def _delete(self, calendar_id: str, event_id: str) -> tuple[int, dict | None]:
+        self.calls["events.delete"] += 1
+        if self.events.get(calendar_id, {}).pop(event_id, None) is None:
+            return 410, {"error": "deleted"}
+        return 204, None
+
+    def _dispatch(self, method: str, path: str, body: dict | None) -> tuple[int, dict | None]:
+        # Batch parts fail on their own too
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.calls["errors"] += 1
+            return 503, {"error": "backendError"}
+        match = _EVENTS_PATH.match(path)
+        if not match:
+            return 404, {"error": "notFound"}
+        calendar_id = unquote(match.group(1))
+        event_id = unquote(match.group(2)) if match.group(2) else None
+        if method == "POST" and not event_id:
+            return self._insert(calendar_id, body or {})
+        if method == "PUT" and event_id:
+            return self._update(calendar_id, event_id, body or {})
+        if method == "PATCH" and event_id:
+            return self._patch(calendar_id, event_id, body or {})
+        if method == "DELETE" and event_id:
+            return self._delete(calendar_id, event_id)
+        return 405, {"error": "methodNotAllowed"}
+
+    @staticmethod
+    def _respond(status: int, body: dict | None) -> Response:
+        if body is None:
+            return Response(status_code=status)
+        return JSONResponse(status_code=status, content=body)
+
+    async def _batch(self, request: Request) -> Response:
+        self.calls["batch"] += 1
+        boundary = re.search(r"boundary=(\S+)", request.headers["content-type"]).group(1)
+        content = (await request.body()).decode().replace("\r\n", "\n")
+        out = []
+        for part in content.split(f"--{boundary}")[1:]:
+            if part.startswith("--"):
+                break
+            part_headers, _, http = part.strip().partition("\n\n")
+            content_id = re.search(r"Content-ID: <item(\d+)>", part_headers).group(1)
+            request_line, _, rest = http.partition("\n")
+            method, path, _ = request_line.split(" ")
+            _, _, body = ("\n" + rest).partition("\n\n")
+            status, result = self._dispatch(method, path, json.loads(body) if body else None)
+            out.append(
+                f"--batch_response\nContent-Type: application/http\n"
+                f"Content-ID: <response-item{content_id}>\n\n"
+                f"HTTP/1.1 {status} X\nContent-Type: application/json\n\n"
+                f"{json.dumps(result) if result is not None else ''}\n"
+            )
+        out.append("--batch_response--\n")
+        return Response(
+            content="".join(out).replace("\n", "\r\n"),
+            media_type="multipart/mixed; boundary=batch_response",
+        )
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/calendar/v3/users/me/calendarList")
+        async def calendar_list():
+            self.calls["calendarList.list"] += 1
+            await self._delay()
+            return {"items": list(self.calendars.values())}
+
+        @app.post("/calendar/v3/calendars")
+        async def calendar_insert(request: Request):
+            self.calls["calendars.insert"] += 1
+            await self._delay()
+            body = await request.json()
+            cal = {"id": f"cal{next(self._ids)}@group.calendar.google.com", **body}
+            self.calendars[cal["id"]] = cal
+            self.events[cal["id"]] = {}
+            return cal
+
+        @app.post("/calendar/v3/calendars/{calendar_id}/events")
+        async def event_insert(calendar_id: str, request: Request):
+            await self._delay()
+            return self._respond(*self._insert(calendar_id, await request.json()))
+
+        @app.put("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+        async def event_update(calendar_id: str, event_id: str, request: Request):
+            await self._delay()
+            return self._respond(*self._update(calendar_id, event_id, await request.json()))
+
+        @app.patch("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+        async def event_patch(calendar_id: str, event_id: str, request: Request):
+            await self._delay()
+            return self._respond(*self._patch(calendar_id, event_id, await request.json()))
+
+        @app.delete("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+        async def event_delete(calendar_id: str, event_id: str):
+            await self._delay()
+            return self._respond(*self._delete(calendar_id, event_id))
+
+        @app.post("/batch/calendar/v3")
+        async def batch(request: Request):
+            await self._delay()
+            return await self._batch(request)
+
+        return app
+
+
+class FakeStrava:
+    """Strava activity endpoints that enforce the 15-minute and daily rate limits.
+
+    Windows are aligned to multiples of their length like Strava's, and can be
+    shortened so tests can cross a window boundary quickly.
+    """
+
+    def __init__(
+        self,
+        short_limit: int = 100,
+        daily_limit: int = 1000,
+        short_window: float = 15 * 60,
+        daily_window: float = 24 * 60 * 60,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.short_limit = short_limit
+        self.daily_limit = daily_limit
+        self.short_window = short_window
+        self.daily_window = daily_window
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.activities: dict[int, dict] = {}
+        self.calls: Counter = Counter()
+        self._usage: Counter = Counter()  # (window, index) -> requests
+        self._listing: tuple[int | None, list[dict]] | None = None  # sorted once per listing
+        self.app = _with_errors(self._build_app(), self)
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app))
+
+    def _count(self) -> tuple[int, int, bool]:
+        now = time.time()
+        short_key = ("short", int(now // self.short_window))
+        daily_key = ("daily", int(now // self.daily_window))
+        self._usage[short_key] += 1
+        self._usage[daily_key] += 1
+        short_used, daily_used = self._usage[short_key], self._usage[daily_key]
+        over = short_used > self.short_limit or daily_used > self.daily_limit
+        return short_used, daily_used, over
+
+    async def _limited(self, name: str, handler) -> Response:
+        short_used, daily_used, over = self._count()
+        headers = {
+            "X-RateLimit-Limit": f"{self.short_limit},{self.daily_limit}",
+            "X-RateLimit-Usage": f"{short_used},{daily_used}",
+        }
+        if over:
+            self.calls["rejected"] += 1
+            return JSONResponse(
+                status_code=429, content={"message": "Rate Limit Exceeded"}, headers=headers
+            )
+        self.calls[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        status, body = handler()
+        return JSONResponse(status_code=status, content=body, headers=headers)
+
+    def _list(self, after: int | None, page: int, per_page: int) -> tuple[int, list[dict]]:
+        def started(a: dict) -> float:
+            return datetime.fromisoformat(a["start_date"]).timestamp()
+
+        # Page 1 takes a fresh snapshot; later pages of the same listing reuse it
+        if page == 1 or self._listing is None or self._listing[0] != after:
+            rows = sorted(self.activities.values(), key=started)
+            if after is not None:
+                rows = [a for a in rows if started(a) > after]
+            else:
+                rows.reverse()
+            self._listing = (after, rows)
+        rows = self._listing[1]
+        return 200, rows[(page - 1) * per_page : page * per_page]
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/api/v3/activities/{activity_id}")
+        async def get_activity(activity_id: int):
+            def handler():
+                activity = self.activities.get(activity_id)
+                return (200, activity) if activity else (404, {"message": "Record Not Found"})
+
+            return await self._limited("activities.get", handler)
+
+        @app.get("/api/v3/athlete/activities")
+        async def list_activities(after: int | None = None, page: int = 1, per_page: int = 30):
+            return await self._limited(
+                "athlete.activities", lambda: self._list(after, page, per_page)
+            )
+
+        return app
+
+
+class FakeWhoop:
+    """Whoop v2 collections with `start` filtering and nextToken paging, plus sleep by ID."""
+
+    PATHS: ClassVar[dict[str, str]] = {
+        "workout": "/developer/v2/activity/workout",
+        "sleep": "/developer/v2/activity/sleep",
+        "recovery": "/developer/v2/recovery",
+    }
+
+    def __init__(
+        self, latency: float = 0.0, max_limit: int = 25, error_rate: float = 0.0, seed: int = 0
+    ):
+        self.latency = latency
+        self.max_limit = max_limit
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.records: dict[str, list[dict]] = {resource: [] for resource in self.PATHS}
+        self.calls: Counter = Counter()
+        self._listings: dict[tuple[str, str | None], list[dict]] = {}
+        self.app = _with_errors(self._build_app(), self)
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app))
+
+    def _page(self, resource: str, start: str | None, limit: int, next_token: str | None):
+        # The first page takes a fresh snapshot; next_token pages reuse it
+        key = (resource, start)
+        if next_token is None or key not in self._listings:
+            rows = self.records[resource]
+            # Recoveries have no start of their own (the real API filters on their cycle)
+            if start:
+                since = datetime.fromisoformat(start)
+                rows = [
+                    r for r in rows
+                    if "start" not in r or datetime.fromisoformat(r["start"]) >= since
+                ]
+            # Newest first, like the real API
+            self._listings[key] = sorted(
+                rows, key=lambda r: r.get("start") or r["created_at"], reverse=True
+            )
+        rows = self._listings[key]
+        offset = int(next_token or 0)
+        page = rows[offset : offset + limit]
+        more = offset + limit < len(rows)
+        return {"records": page, "next_token": str(offset + limit) if more else None}
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        def route(resource: str):
+            async def handler(
+                start: str | None = None, limit: int = 10, nextToken: str | None = None
+            ):
+                self.calls[resource] += 1
+                if limit > self.max_limit:
+                    return JSONResponse(status_code=400, content={"error": "limit too large"})
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                return self._page(resource, start, limit, nextToken)
+
+            return handler
+
+        @app.get("/developer/v2/activity/sleep/{sleep_id}")
+        async def sleep_by_id(sleep_id: str):
+            self.calls["sleep.get"] += 1
+            for record in self.records["sleep"]:
+                if str(record["id"]) == sleep_id:
+                    return record
+            return JSONResponse(status_code=404, content={"error": "not found"})
+
+        for resource, path in self.PATHS.items():
+            app.get(path)(route(resource))
+        return app
@@ -1,5 +1,15 @@
-from src.formatters.strava_formatter import format_activity
-from src.formatters.whoop_formatter import format_sleep, format_workout
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.formatters.strava_formatter import format_activities, format_activity
+from src.formatters.timestamps import event_time
+from src.formatters.whoop_formatter import (
+    format_sleep,
+    format_sleeps,
+    format_workout,
+    format_workouts,
+)
 
 
 def test_strava_run_format(sample_strava_activity):
@@ -40,3 +50,34 @@ def test_whoop_sleep_no_recovery(sample_whoop_sleep):
     event = format_sleep(sample_whoop_sleep)
     assert "recovery" not in event["summary"]
     assert "Recovery:" not in event["description"]
+
+
+def test_batch_formatters_match_single(
+    sample_strava_activity, sample_whoop_workout, sample_whoop_sleep, sample_whoop_recovery
+):
+    moved = {**sample_strava_activity, "id": 2, "start_date": "2024-01-16T07:30:00.250Z"}
+    assert list(format_activities([sample_strava_activity, moved])) == [
+        format_activity(sample_strava_activity), format_activity(moved)
+    ]
+    assert list(format_workouts([sample_whoop_workout])) == [format_workout(sample_whoop_workout)]
+    other = {**sample_whoop_sleep, "id": "other"}
+    recoveries = {sample_whoop_sleep["id"]: sample_whoop_recovery}
+    assert list(format_sleeps([sample_whoop_sleep, other], recoveries)) == [
+        format_sleep(sample_whoop_sleep, sample_whoop_recovery), format_sleep(other)
+    ]
+
+
+@pytest.mark.parametrize("ts", [
+    "2024-01-15T07:30:00Z", "2024-01-15T07:30:00.000Z", "2024-01-15T07:30:00.250Z",
+    "2024-01-15T07:30:00.123456Z", "2024-01-15T07:30:00+02:00", "2024-01-15T07:30:00",
+    "2024-01-15T07:30Z",
+])
+@pytest.mark.parametrize("seconds", [0, 2500, 0.5])
+def test_event_time_matches_fromisoformat(ts, seconds):
+    expected = datetime.fromisoformat(ts) + timedelta(seconds=seconds)
+    assert event_time(ts, seconds) == expected.isoformat()
+
+
+def test_event_time_rejects_invalid_fields():
+    with pytest.raises(ValueError):
+        event_time("2024-13-15T07:30:00Z")
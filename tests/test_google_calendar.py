@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+from src.auth.oauth_manager import store_tokens
+from src.services import google_calendar
+
+
+async def test_find_or_create_calendar_creates_once(fake_google):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+    assert await google_calendar.find_or_create_calendar("token") == cal_id
+    assert fake_google.calls["calendars.insert"] == 1
+
+
+async def test_event_lifecycle(fake_google):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+    event = await google_calendar.create_event("token", cal_id, {"summary": "Run"})
+    await google_calendar.update_event("token", cal_id, event["id"], {"summary": "Long Run"})
+    assert fake_google.events[cal_id][event["id"]]["summary"] == "Long Run"
+
+    await google_calendar.delete_event("token", cal_id, event["id"])
+    assert fake_google.events[cal_id] == {}
+
+
+async def test_writes_run_concurrently(fake_google):
+    fake_google.latency = 0.05
+    cal_id = await google_calendar.find_or_create_calendar("token")
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(google_calendar.create_event("token", cal_id, {"summary": str(i)}) for i in range(20))
+    )
+    # 20 sequential round trips would take a full second
+    assert time.perf_counter() - started < 0.5
+    assert len(fake_google.events[cal_id]) == 20
+
+
+async def test_calendar_id_is_persisted_and_cached(db, fake_google):
+    await store_tokens(db, "google", "token", None, None)
+    cal_id = await google_calendar.get_calendar_id(db, "token")
+    assert await google_calendar.get_calendar_id(db, "token") == cal_id
+    assert fake_google.calls["calendarList.list"] == 1
+
+    # A fresh process picks the ID up from the database without asking Google
+    google_calendar._calendar_id = None
+    assert await google_calendar.get_calendar_id(db, "token") == cal_id
+    assert fake_google.calls["calendarList.list"] == 1
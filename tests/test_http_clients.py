@@ -0,0 +1,68 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from src import metrics
+from src.services import http_clients
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+async def test_requests_reuse_pooled_connection(local_server):
+    before = http_clients.connection_stats()["strava"]
+    client = http_clients.get_client("strava")
+    for _ in range(5):
+        (await client.get(f"{local_server}/ping")).raise_for_status()
+
+    after = http_clients.connection_stats()["strava"]
+    assert after["requests"] - before["requests"] == 5
+    assert after["connections_opened"] - before["connections_opened"] == 1
+    await http_clients.close_clients()
+
+
+async def test_requests_record_upstream_latency(local_server):
+    before = metrics.UPSTREAM_LATENCY.count("whoop", "200")
+    client = http_clients.get_client("whoop")
+    (await client.get(f"{local_server}/ping")).raise_for_status()
+
+    assert metrics.UPSTREAM_LATENCY.count("whoop", "200") == before + 1
+    await http_clients.close_clients()
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def test_connection_errors_record_upstream_latency():
+    before = metrics.UPSTREAM_LATENCY.count("google", "error")
+    client = http_clients.get_client("google")
+    with pytest.raises(httpx.ConnectError):
+        await client.get(f"http://127.0.0.1:{_closed_port()}/ping")
+
+    assert metrics.UPSTREAM_LATENCY.count("google", "error") == before + 1
+    await http_clients.close_clients()
@@ -0,0 +1,42 @@
+"""Cold-start budget: what `import src.main` loads, and how long it takes."""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Generous for a slow CI box; override with IMPORT_TIME_BUDGET_MS
+BUDGET_MS = int(os.environ.get("IMPORT_TIME_BUDGET_MS", "2000"))
+
+# Loaded after startup (see main._load_deferred), never on the way to serving
+DEFERRED = ("apscheduler", "httpx", "src.services.sync_engine", "src.formatters")
+
+_SCRIPT = "import sys, src.main; print('\\n'.join(sorted(sys.modules)))"
+
+
+def _import_main() -> tuple[set[str], list[tuple[int, int, str]]]:
+    """Modules loaded by `import src.main`, and its -X importtime report."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SCRIPT],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    report = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        report.append((int(self_us), int(cumulative_us), name.strip()))
+    return set(result.stdout.split()), report
+
+
+def test_startup_import_time_within_budget():
+    modules, report = _import_main()
+
+    assert not [m for m in modules if m.startswith(DEFERRED)]
+    total_ms = next(cumulative for _, cumulative, name in report if name == "src.main") / 1000
+    slowest = sorted(report, reverse=True)[:15]
+    assert total_ms <= BUDGET_MS, (
+        f"import src.main took {total_ms:.0f}ms (budget {BUDGET_MS}ms); slowest modules:\n"
+        + "\n".join(f"{self_us / 1000:8.1f}ms  {name}" for self_us, _, name in slowest)
+    )
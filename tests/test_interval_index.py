@@ -0,0 +1,36 @@
+import random
+from datetime import UTC, datetime, timedelta, timezone
+
+from src.services.interval_index import IntervalIndex
+
+T0 = datetime(2024, 1, 1)
+
+
+def _at(minutes: int) -> datetime:
+    return T0 + timedelta(minutes=minutes)
+
+
+def test_matches_brute_force():
+    rng = random.Random(7)
+    intervals = []
+    for i in range(500):
+        start = rng.randrange(0, 50_000)
+        intervals.append((_at(start), _at(start + rng.randrange(1, 600)), str(i)))
+    index = IntervalIndex(intervals)
+
+    for _ in range(2000):
+        start = rng.randrange(0, 50_000)
+        q_start, q_end = _at(start), _at(start + rng.randrange(1, 120))
+        expected = {key for s, e, key in intervals if s < q_end and e > q_start}
+        found = index.overlapping(q_start, q_end)
+        assert (found in expected) if expected else found is None
+
+
+def test_touching_intervals_do_not_overlap_and_timezones_are_normalized():
+    index = IntervalIndex([(_at(0), _at(60), "a")])
+    assert index.overlapping(_at(60), _at(90)) is None
+    assert index.overlapping(_at(-30), _at(0)) is None
+
+    aware = _at(30).replace(tzinfo=UTC).astimezone(timezone(timedelta(hours=-5)))
+    assert index.overlapping(aware, aware + timedelta(minutes=5)) == "a"
+    assert IntervalIndex([]).overlapping(_at(0), _at(1)) is None
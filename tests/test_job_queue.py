@@ -0,0 +1,154 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+from src.config import settings
+from src.database import get_db
+from src.main import app
+from src.models import SyncJob
+from src.services import job_queue
+
+
+@pytest.fixture
+def handled(monkeypatch):
+    calls = []
+
+    async def handler(db, aspect_type, object_id):
+        calls.append((aspect_type, object_id))
+        if object_id == "broken":
+            raise RuntimeError("upstream down")
+
+    monkeypatch.setitem(job_queue._HANDLERS, "strava", handler)
+    monkeypatch.setattr(settings, "queue_retry_backoff_seconds", 0)
+    return calls
+
+
+async def test_jobs_for_one_activity_run_in_order(db, handled, monkeypatch):
+    monkeypatch.setattr(settings, "strava_update_coalesce_seconds", 0)
+    await job_queue.enqueue(db, "strava", "1", "create")
+    running = await job_queue.claim(db)
+    await job_queue.enqueue(db, "strava", "1", "update")
+    await job_queue.enqueue(db, "strava", "2", "create")
+
+    # The update for activity 1 waits behind its running create
+    assert (await job_queue.claim(db)).object_id == "2"
+    assert await job_queue.claim(db) is None
+
+    await db.delete(running)
+    await db.commit()
+    while await job_queue.process_next(db):
+        pass
+    assert handled == [("update", "1")]
+    assert await job_queue.depth(db) == {"running": 1}
+
+
+async def test_update_burst_coalesces_into_one_job(db, handled, monkeypatch):
+    monkeypatch.setattr(settings, "strava_update_coalesce_seconds", 0)
+    saved = job_queue.stats["upstream_calls_saved"]
+    for _ in range(4):
+        await job_queue.enqueue(db, "strava", "1", "update")
+
+    # The first update claimed absorbs the other three
+    while await job_queue.process_next(db):
+        pass
+    assert handled == [("update", "1")]
+    assert job_queue.stats["upstream_calls_saved"] - saved == 6
+    assert await job_queue.depth(db) == {}
+
+
+async def test_concurrent_enqueues_share_commits(db, session_factory, handled, monkeypatch):
+    monkeypatch.setattr(settings, "strava_update_coalesce_seconds", 0)
+    commits = []
+
+    def count(conn):
+        commits.append(conn)
+
+    engine = db.bind.sync_engine
+    event.listen(engine, "commit", count)
+
+    async def webhook(object_id: str):
+        async with session_factory() as session:
+            await job_queue.enqueue(session, "strava", object_id, "update")
+
+    try:
+        await asyncio.gather(*(webhook(str(i % 5)) for i in range(50)))
+    finally:
+        event.remove(engine, "commit", count)
+    assert len(commits) < 10
+    assert sum((await job_queue.depth(db)).values()) == 50
+
+    # Coalesced on the worker side: one run per activity
+    while await job_queue.process_next(db):
+        pass
+    assert sorted(handled) == [("update", str(i)) for i in range(5)]
+
+
+async def test_updates_wait_out_the_coalesce_window(db, handled):
+    await job_queue.enqueue(db, "strava", "1", "update")
+    assert not await job_queue.process_next(db)
+
+
+async def test_delete_cancels_pending_sync(db, handled):
+    await job_queue.enqueue(db, "strava", "1", "create")
+    await job_queue.enqueue(db, "strava", "1", "update")
+    await job_queue.enqueue(db, "strava", "1", "delete")
+
+    while await job_queue.process_next(db):
+        pass
+    assert handled == [("delete", "1")]
+
+
+async def test_failing_job_retries_then_gives_up(db, handled, monkeypatch):
+    monkeypatch.setattr(settings, "queue_max_attempts", 3)
+    job = await job_queue.enqueue(db, "strava", "broken", "create")
+
+    while await job_queue.process_next(db):
+        pass
+    await db.refresh(job)
+    assert len(handled) == 3
+    assert job.status == "failed"
+    assert "upstream down" in job.last_error
+
+
+async def test_expired_lease_is_reclaimed(db, handled):
+    job = await job_queue.enqueue(db, "strava", "1", "create")
+    assert (await job_queue.claim(db)).id == job.id
+    assert await job_queue.claim(db) is None  # leased
+
+    job.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    await db.commit()
+    assert await job_queue.process_next(db)
+    assert handled == [("create", "1")]
+
+
+async def test_restart_requeues_running_jobs(db, session_factory, handled, monkeypatch):
+    monkeypatch.setattr(job_queue, "async_session", session_factory)
+    await job_queue.enqueue(db, "strava", "1", "create")
+    await job_queue.claim(db)
+
+    assert await job_queue.recover_interrupted() == 1
+    assert await job_queue.process_next(db)
+
+
+async def test_webhook_acks_by_queueing(db, handled):
+    async def override_db():
+        yield db
+
+    app.dependency_overrides[get_db] = override_db
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            resp = await client.post(
+                "/webhook/strava",
+                json={"object_type": "activity", "aspect_type": "create", "object_id": 42},
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert resp.json() == {"status": "queued"}
+    assert handled == []
+    assert (await db.get(SyncJob, 1)).object_id == "42"
@@ -0,0 +1,82 @@
+import httpx
+
+from src import metrics
+from src.database import get_db
+from src.main import app
+from src.services import google_calendar, job_queue
+from src.services.sync_engine import SyncItem, sync_activities_batch, sync_activity
+
+
+def _event(summary: str) -> dict:
+    return {
+        "summary": summary,
+        "start": {"dateTime": "2024-01-15T07:30:00+00:00", "timeZone": "UTC"},
+        "end": {"dateTime": "2024-01-15T08:30:00+00:00", "timeZone": "UTC"},
+    }
+
+
+async def _scrape(db) -> str:
+    async def override_db():
+        yield db
+
+    app.dependency_overrides[get_db] = override_db
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            resp = await client.get("/metrics")
+    finally:
+        app.dependency_overrides.clear()
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    return resp.text
+
+
+async def test_sync_outcomes_are_counted_by_source(db, fake_google):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+    created = metrics.SYNC_DURATION.count("strava", "created")
+    unchanged = metrics.SYNCED.value("strava", "unchanged")
+    batched = metrics.SYNCED.value("whoop", "created")
+
+    for _ in range(2):
+        await sync_activity(
+            db, source="strava", source_id="1", activity_type="Run",
+            event_body=_event("Run"), google_access_token="token", calendar_id=cal_id,
+        )
+    await sync_activities_batch(
+        db, [SyncItem("whoop", "w1", "sleep", _event("Sleep"))], "token", cal_id
+    )
+
+    assert metrics.SYNC_DURATION.count("strava", "created") == created + 1
+    assert metrics.SYNCED.value("strava", "unchanged") == unchanged + 1
+    assert metrics.SYNCED.value("whoop", "created") == batched + 1
+
+
+async def test_metrics_endpoint_exposes_histograms_and_queue_depth(db):
+    metrics.UPSTREAM_LATENCY.observe(0.02, "google", "200")
+    metrics.UPSTREAM_LATENCY.observe(3.0, "google", "200")
+    await job_queue.enqueue(db, "strava", "1", "create")
+
+    lines = (await _scrape(db)).splitlines()
+
+    assert "# TYPE upstream_request_duration_seconds histogram" in lines
+    buckets = {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in lines
+        if line.startswith('upstream_request_duration_seconds_bucket{upstream="google"')
+    }
+    prefix = 'upstream_request_duration_seconds_bucket{upstream="google",status="200"'
+    assert buckets[prefix + ',le="0.025"}'] < buckets[prefix + ',le="5"}']
+    assert buckets[prefix + ',le="+Inf"}'] == buckets[prefix + ',le="5"}']
+    assert 'sync_queue_jobs{status="pending"} 1' in lines
+    assert 'sync_queue_jobs{status="failed"} 0' in lines
+    assert any(line.startswith("# TYPE oauth_token_refreshes_total counter") for line in lines)
+
+
+def test_sample_values_keep_their_precision():
+    lines = metrics.samples("jobs_total", "Jobs.", "counter", ("kind",), {
+        ("big",): 1234567.0, ("small",): 0.1 + 0.2,
+    })
+    assert lines[2:] == [
+        'jobs_total{kind="big"} 1234567',
+        'jobs_total{kind="small"} 0.30000000000000004',
+    ]
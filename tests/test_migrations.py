@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src import migrations
+
+LATEST = {m.version for m in migrations.MIGRATIONS}
+
+# sync_records and oauth_tokens as the first release created them
+_LEGACY_SCHEMA = [
+    (
+        "CREATE TABLE oauth_tokens (id INTEGER PRIMARY KEY, service VARCHAR(50) UNIQUE, "
+        "access_token TEXT, refresh_token TEXT, expires_at DATETIME, "
+        "created_at DATETIME, updated_at DATETIME)"
+    ),
+    (
+        "CREATE TABLE sync_records (id INTEGER PRIMARY KEY, source VARCHAR(50), "
+        "source_id VARCHAR(255), activity_type VARCHAR(100), google_event_id VARCHAR(255), "
+        "synced_at DATETIME)"
+    ),
+]
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'migrate.db'}")
+    yield engine
+    await engine.dispose()
+
+
+async def _names(engine, type_: str) -> set[str]:
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = :type"), {"type": type_}
+        )
+        return {row[0] for row in result.fetchall()}
+
+
+async def _versions(engine) -> set[int]:
+    async with engine.connect() as conn:
+        return await migrations._applied(conn)
+
+
+async def test_new_database_is_created_current_and_boot_is_one_query(engine):
+    assert await migrations.migrate(engine) is False
+    assert await _versions(engine) == LATEST
+    assert "ix_sync_records_source_start_end" in await _names(engine, "index")
+
+    statements = []
+    event.listen(
+        engine.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    assert await migrations.migrate(engine) is False
+    assert [s for s in statements if "sqlite_master" not in s] == [
+        "SELECT version FROM schema_version"
+    ]
+
+
+async def test_unversioned_database_is_upgraded(engine):
+    async with engine.begin() as conn:
+        for statement in _LEGACY_SCHEMA:
+            await conn.execute(text(statement))
+        await conn.execute(text(
+            "INSERT INTO sync_records (source, source_id, activity_type, google_event_id) "
+            "VALUES ('strava', '1', 'run', 'old'), ('strava', '1', 'run', 'new'), "
+            "('whoop', '1', 'sleep', 'sleep')"
+        ))
+
+    assert await migrations.migrate(engine) is True
+    assert {"sync_jobs", "sync_state"} <= await _names(engine, "table")
+    indexes = await _names(engine, "index")
+    assert "uq_sync_records_source_source_id" in indexes
+    assert "ix_sync_records_source_start_end" not in indexes  # left for after startup
+    async with engine.connect() as conn:
+        assert {"activity_start", "content_hash"} <= await migrations._columns(
+            conn, "sync_records"
+        )
+        assert "calendar_id" in await migrations._columns(conn, "oauth_tokens")
+        result = await conn.execute(text("SELECT google_event_id FROM sync_records"))
+        assert sorted(row[0] for row in result) == ["new", "sleep"]
+
+    await migrations.migrate_online(engine)
+    assert "ix_sync_records_source_start_end" in await _names(engine, "index")
+    assert await _versions(engine) == LATEST
+    assert await migrations.migrate(engine) is False
@@ -0,0 +1,54 @@
+import asyncio
+
+import httpx
+
+from src.auth import oauth_manager
+from src.auth.oauth_manager import get_valid_token, store_tokens
+from src.services import google_calendar, http_clients
+
+
+def _token_endpoint(calls: list):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(
+            200, json={"access_token": f"fresh-{len(calls)}", "expires_in": 21600}
+        )
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def _get(session_factory):
+    async with session_factory() as db:
+        return await get_valid_token(db, "strava", "https://token", "id", "secret")
+
+
+async def test_rotating_google_token_drops_cached_session(db):
+    await store_tokens(db, "google", "old-token", "refresh", 3600)
+    google_calendar._headers("old-token")
+    assert "old-token" in google_calendar._sessions
+
+    await store_tokens(db, "google", "new-token", None, 3600)
+    assert "old-token" not in google_calendar._sessions
+
+
+async def test_concurrent_callers_share_one_refresh(db, session_factory, monkeypatch):
+    calls = []
+    monkeypatch.setitem(http_clients._clients, "oauth", _token_endpoint(calls))
+    await store_tokens(db, "strava", "stale", "refresh", -60)
+    oauth_manager._token_cache.clear()
+
+    tokens = await asyncio.gather(*(_get(session_factory) for _ in range(10)))
+    assert tokens == ["fresh-1"] * 10
+    assert len(calls) == 1
+
+
+async def test_refreshes_ahead_of_expiry(db, session_factory, monkeypatch):
+    calls = []
+    monkeypatch.setitem(http_clients._clients, "oauth", _token_endpoint(calls))
+    # Still valid for a minute, but inside the refresh margin
+    await store_tokens(db, "strava", "expiring", "refresh", 60)
+
+    assert await _get(session_factory) == "fresh-1"
+    assert await _get(session_factory) == "fresh-1"
+    assert len(calls) == 1
@@ -0,0 +1,84 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from src.config import settings
+from src.services import http_clients, payload_archive, strava_rate_limit, strava_service
+from src.services.strava_rate_limit import StravaRateLimiter
+from tests.fakes import FakeStrava
+
+
+@pytest.fixture
+async def archive(tmp_path, monkeypatch, session_factory):
+    monkeypatch.setattr(settings, "payload_archive_dir", str(tmp_path / "archive"))
+    monkeypatch.setattr(payload_archive, "async_session", session_factory)
+    yield tmp_path / "archive"
+    await payload_archive.close()
+
+
+async def _stream(**filters) -> list[tuple]:
+    return [
+        (p.kind, p.source_id, p.version, p.data)
+        async for p in payload_archive.iter_payloads(**filters)
+    ]
+
+
+async def test_changed_payloads_get_new_versions_and_stream_back(archive, monkeypatch):
+    monkeypatch.setattr(settings, "payload_archive_segment_bytes", 1)  # a segment per write
+    await payload_archive.store("whoop", "workout", [{"id": "a", "strain": 1}, {"id": "b"}])
+    await payload_archive.store("whoop", "workout", [{"id": "a", "strain": 1}])  # unchanged
+    await payload_archive.store("whoop", "workout", [{"id": "a", "strain": 2}])
+    await payload_archive.store("whoop", "recovery", [{"cycle_id": 7}], key="cycle_id")
+    await payload_archive.flush()
+
+    assert await _stream(source="whoop", kind="workout") == [
+        ("workout", "b", 1, {"id": "b"}),
+        ("workout", "a", 2, {"id": "a", "strain": 2}),
+    ]
+    assert [(kind, id_, v) for kind, id_, v, _ in await _stream(latest_only=False)] == [
+        ("workout", "a", 1), ("workout", "b", 1), ("workout", "a", 2), ("recovery", "7", 1),
+    ]
+    first = await payload_archive.get_payload("whoop", "workout", "a", version=1)
+    assert first.data == {"id": "a", "strain": 1}
+
+    # Segments are ordinary multi-member .jsonl.gz files
+    segments = sorted(archive.glob("payloads-*.jsonl.gz"))
+    assert len(segments) == 3
+    with gzip.open(segments[0], "rt") as f:
+        assert [json.loads(line)["id"] for line in f] == ["a", "b"]
+
+
+async def test_strava_fetches_are_archived(archive, monkeypatch):
+    fake = FakeStrava()
+    fake.activities[5] = {"id": 5, "name": "Run", "start_date": "2024-01-15T07:30:00Z"}
+    client = fake.client()
+    monkeypatch.setitem(http_clients._clients, "strava", client)
+    monkeypatch.setattr(strava_rate_limit, "limiter", StravaRateLimiter(100, 1000, 0.3))
+    try:
+        await strava_service.list_activities("token")
+        activity = await strava_service.get_activity("token", 5)
+    finally:
+        await client.aclose()
+
+    await payload_archive.flush()
+    assert (await payload_archive.get_payload("strava", "activity", "5")).data == activity
+    assert await payload_archive.get_payload("strava", "summary", "5") is not None
+
+
+async def test_store_does_not_wait_for_the_write(archive, monkeypatch):
+    written = asyncio.Event()
+    real_write = payload_archive._write
+
+    async def slow_write(*args):
+        await written.wait()
+        await real_write(*args)
+
+    monkeypatch.setattr(payload_archive, "_write", slow_write)
+    await asyncio.wait_for(payload_archive.store("strava", "activity", [{"id": 1}]), 1)
+    assert await payload_archive.get_payload("strava", "activity", "1") is None
+
+    written.set()
+    await payload_archive.flush()
+    assert (await payload_archive.get_payload("strava", "activity", "1")).data == {"id": 1}
@@ -0,0 +1,108 @@
+import pytest
+
+from src.auth import oauth_manager
+from src.config import settings
+from src.formatters import strava_formatter, whoop_formatter
+from src.services import google_calendar, payload_archive, rerender
+from src.services.sync_engine import SyncItem, sync_activities_batch
+
+WRITES = ("events.insert", "events.update", "events.patch")
+
+
+def _activity(i: int) -> dict:
+    return {
+        "id": i, "name": f"Run {i}", "type": "Run", "distance": 5000.0, "moving_time": 1500,
+        "elapsed_time": 1600, "start_date": f"2024-01-{i:02d}T07:30:00Z",
+    }
+
+
+@pytest.fixture
+async def synced(tmp_path, monkeypatch, session_factory, db, fake_google):
+    """Three archived and synced Strava activities, plus one archived but never synced."""
+    monkeypatch.setattr(settings, "payload_archive_dir", str(tmp_path / "archive"))
+    for module in (payload_archive, rerender):
+        monkeypatch.setattr(module, "async_session", session_factory)
+    oauth_manager._token_cache["google"] = ("google-token", None)
+
+    activities = [_activity(i) for i in range(1, 5)]
+    await payload_archive.store("strava", "activity", activities)
+    calendar_id = await google_calendar.get_calendar_id(db, "google-token")
+    items = [
+        SyncItem("strava", str(a["id"]), "Run", strava_formatter.format_activity(a))
+        for a in activities[:3]
+    ]
+    await sync_activities_batch(db, items, "google-token", calendar_id)
+    await payload_archive.flush()
+    yield fake_google
+    await payload_archive.close()
+
+
+def _writes(fake_google) -> int:
+    return sum(fake_google.calls[name] for name in WRITES)
+
+
+async def test_only_changed_events_are_pushed(synced, monkeypatch):
+    fake_google = synced
+    stats = await rerender.rerender(["strava"], dry_run=True)
+    assert (stats["read"], stats["unchanged"], stats["untracked"], stats["changed"]) == (4, 3, 1, 0)
+
+    # A formatter change that only affects activity 2
+    def renamed(activities):
+        for body in strava_formatter.format_activities(activities):
+            if "Run 2" in body["summary"]:
+                body["summary"] = body["summary"].replace("Run 2", "Tempo Run 2")
+            yield body
+
+    monkeypatch.setattr(rerender, "format_activities", renamed)
+    before = _writes(fake_google)
+    stats = await rerender.rerender(["strava"], dry_run=True)
+    assert stats["changed"] == 1
+    assert _writes(fake_google) == before
+
+    progress = []
+    stats = await rerender.rerender(
+        ["strava"], concurrency=2, batch_size=1, progress=progress.append
+    )
+    assert (stats["changed"], stats["patched"]) == (1, 1)
+    assert fake_google.calls["events.patch"] == 1
+    assert _writes(fake_google) == before + 1
+    assert progress
+
+    # Pushed hashes are stored, so a second run finds nothing to do
+    stats = await rerender.rerender(["strava"], dry_run=True)
+    assert stats["changed"] == 0
+    summaries = {e["summary"] for events in fake_google.events.values() for e in events.values()}
+    assert any("Tempo Run 2" in s for s in summaries)
+
+
+async def test_whoop_sleeps_are_rendered_with_their_latest_recovery(synced, db):
+    workout = {
+        "id": "w1", "sport_name": "Running", "score_state": "SCORED",
+        "start": "2024-02-01T08:00:00.000Z", "end": "2024-02-01T09:00:00.000Z",
+        "score": {"strain": 9.5},
+    }
+    sleep = {
+        "id": "s1", "score_state": "SCORED",
+        "start": "2024-02-01T22:00:00.000Z", "end": "2024-02-02T06:00:00.000Z", "score": {},
+    }
+    recovery = {"cycle_id": 1, "sleep_id": "s1", "score_state": "SCORED",
+                "score": {"recovery_score": 50}}
+    await payload_archive.store("whoop", "workout", [workout])
+    await payload_archive.store("whoop", "sleep", [sleep])
+    await payload_archive.store("whoop", "recovery", [recovery], key="cycle_id")
+    await payload_archive.flush()
+    items = [
+        SyncItem("whoop", "w1", "workout", whoop_formatter.format_workout(workout)),
+        SyncItem("whoop", "sleep-s1", "sleep", whoop_formatter.format_sleep(sleep, recovery)),
+    ]
+    calendar_id = await google_calendar.get_calendar_id(db, "google-token")
+    await sync_activities_batch(db, items, "google-token", calendar_id)
+
+    stats = await rerender.rerender(["whoop"], dry_run=True)
+    assert (stats["read"], stats["unchanged"]) == (2, 2)
+
+    rescored = {**recovery, "score": {"recovery_score": 80}}
+    await payload_archive.store("whoop", "recovery", [rescored], key="cycle_id")
+    await payload_archive.flush()
+    stats = await rerender.rerender(["whoop"], dry_run=True)
+    assert (stats["unchanged"], stats["changed"]) == (1, 1)
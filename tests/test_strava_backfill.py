@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.auth import oauth_manager
+from src.config import settings
+from src.services import http_clients, strava_backfill, strava_rate_limit, sync_state
+from src.services.strava_rate_limit import StravaRateLimiter
+from tests.fakes import FakeStrava
+
+
+@pytest.fixture
+async def fake_strava(monkeypatch, session_factory, fake_google):
+    fake = FakeStrava(short_limit=10_000, daily_limit=100_000)
+    start = datetime.utcnow() - timedelta(days=5)
+    for i in range(1, 251):
+        fake.activities[i] = {
+            "id": i,
+            "name": f"Run {i}",
+            "type": "Run",
+            "distance": 5000.0,
+            "moving_time": 1500,
+            "elapsed_time": 1600,
+            "start_date": (start + timedelta(minutes=2 * i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+    client = fake.client()
+    monkeypatch.setitem(http_clients._clients, "strava", client)
+    monkeypatch.setattr(
+        strava_rate_limit, "limiter", StravaRateLimiter(10_000, 100_000, backfill_reserve=0.3)
+    )
+    monkeypatch.setattr(strava_backfill, "async_session", session_factory)
+    monkeypatch.setattr(settings, "strava_backfill_page_size", 100)
+    for service in ("strava", "google"):
+        oauth_manager._token_cache[service] = (f"{service}-token", None)
+    yield fake
+    await client.aclose()
+
+
+def _written(fake_google) -> int:
+    return sum(len(events) for events in fake_google.events.values())
+
+
+async def test_backfill_follows_every_page(fake_strava, fake_google, db):
+    await strava_backfill.backfill_strava(days=30)
+
+    assert fake_strava.calls["athlete.activities"] == 3
+    assert fake_strava.calls["activities.get"] == 250
+    assert _written(fake_google) == 250
+    assert await sync_state.get_state(db, strava_backfill.CHECKPOINT_KEY) is None
+
+
+async def test_unformattable_activity_is_skipped(fake_strava, fake_google, db):
+    fake_strava.activities[7]["distance"] = None
+
+    await strava_backfill.backfill_strava(days=30)
+
+    assert _written(fake_google) == 249
+    assert await sync_state.get_state(db, strava_backfill.CHECKPOINT_KEY) is None
+
+
+async def test_interrupted_backfill_resumes_from_checkpoint(
+    fake_strava, fake_google, db, monkeypatch
+):
+    real_batch = strava_backfill.sync_activities_batch
+    calls = 0
+
+    async def crash_on_second_page(*args):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise RuntimeError("killed")
+        return await real_batch(*args)
+
+    monkeypatch.setattr(strava_backfill, "sync_activities_batch", crash_on_second_page)
+    with pytest.raises(RuntimeError):
+        await strava_backfill.backfill_strava(days=30)
+
+    checkpoint = await sync_state.get_state(db, strava_backfill.CHECKPOINT_KEY)
+    assert checkpoint["page"] == 1
+    assert checkpoint["newest_start"] == fake_strava.activities[100]["start_date"]
+
+    monkeypatch.setattr(strava_backfill, "sync_activities_batch", real_batch)
+    await strava_backfill.backfill_strava(days=30)
+
+    assert _written(fake_google) == 250
+    # Page 1 is not fetched again, apart from the boundary activity
+    assert fake_strava.calls["activities.get"] == 100 + 100 + 151
+    assert await sync_state.get_state(db, strava_backfill.CHECKPOINT_KEY) is None
+
+
+async def test_failed_fetch_is_retried_without_holding_the_watermark(
+    fake_strava, fake_google, db, monkeypatch
+):
+    real_get, real_batch = strava_backfill.get_activity, strava_backfill.sync_activities_batch
+    broken = {50}
+
+    async def flaky_get(token, activity_id, **kwargs):
+        if activity_id in broken:
+            raise RuntimeError("timed out")
+        return await real_get(token, activity_id, **kwargs)
+
+    async def crash_on_second_page(*args):
+        if fake_strava.calls["athlete.activities"] == 2:
+            raise RuntimeError("killed")
+        return await real_batch(*args)
+
+    monkeypatch.setattr(strava_backfill, "get_activity", flaky_get)
+    monkeypatch.setattr(strava_backfill, "sync_activities_batch", crash_on_second_page)
+    with pytest.raises(RuntimeError):
+        await strava_backfill.backfill_strava()
+    monkeypatch.setattr(strava_backfill, "sync_activities_batch", real_batch)
+    await strava_backfill.backfill_strava()
+
+    # The watermark moves past activity 50, which is kept aside instead
+    assert _written(fake_google) == 249
+    watermark = await sync_state.get_watermark(db, "strava")
+    assert watermark.strftime("%Y-%m-%dT%H:%M:%SZ") == fake_strava.activities[250]["start_date"]
+    assert await sync_state.get_state(db, strava_backfill.RETRY_KEY) == {"ids": ["50"]}
+
+    # The next run retries it on its own rather than re-listing from behind it
+    broken.clear()
+    fake_strava.calls.clear()
+    await strava_backfill.backfill_strava()
+    assert _written(fake_google) == 250
+    assert fake_strava.calls["activities.get"] == 1
+    assert await sync_state.get_state(db, strava_backfill.RETRY_KEY) == {"ids": []}
+
+    # One deleted on Strava since is dropped
+    await sync_state.set_state(db, strava_backfill.RETRY_KEY, {"ids": ["999"]})
+    await strava_backfill.backfill_strava()
+    assert await sync_state.get_state(db, strava_backfill.RETRY_KEY) == {"ids": []}
+
+
+async def test_later_runs_start_from_the_watermark(fake_strava, fake_google, db):
+    await strava_backfill.backfill_strava()
+
+    newest = fake_strava.activities[250]["start_date"]
+    watermark = await sync_state.get_watermark(db, "strava")
+    assert watermark.strftime("%Y-%m-%dT%H:%M:%SZ") == newest
+
+    fake_strava.activities[251] = {
+        **fake_strava.activities[250],
+        "id": 251,
+        "start_date": (watermark + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    await strava_backfill.backfill_strava()
+
+    assert fake_strava.calls["activities.get"] == 251
+    assert _written(fake_google) == 251
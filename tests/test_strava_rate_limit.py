@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from src.services import http_clients, strava_rate_limit
+from src.services.strava_rate_limit import (
+    PRIORITY_BACKFILL,
+    PRIORITY_WEBHOOK,
+    StravaRateLimiter,
+)
+from src.services.strava_service import get_activity
+from tests.fakes import FakeStrava
+
+
+def _strava(monkeypatch, short_limit, short_window, known_limit=None):
+    fake = FakeStrava(short_limit=short_limit, short_window=short_window)
+    for i in range(1, 51):
+        fake.activities[i] = {"id": i, "type": "Run", "start_date": "2024-01-15T07:30:00Z"}
+    monkeypatch.setitem(http_clients._clients, "strava", fake.client())
+    limiter = StravaRateLimiter(
+        short_limit=known_limit or short_limit,
+        daily_limit=1000,
+        backfill_reserve=0.3,
+        short_window=short_window,
+    )
+    monkeypatch.setattr(strava_rate_limit, "limiter", limiter)
+    return fake, limiter
+
+
+async def test_backfill_waits_for_next_window_instead_of_hitting_429(monkeypatch):
+    fake, limiter = _strava(monkeypatch, short_limit=10, short_window=0.3)
+
+    results = await asyncio.gather(
+        *(get_activity("tok", i, priority=PRIORITY_BACKFILL) for i in range(1, 21))
+    )
+
+    assert [r["id"] for r in results] == list(range(1, 21))
+    assert fake.calls["rejected"] == 0
+    assert limiter.stats["throttled"] > 0
+
+
+async def test_webhook_fetches_can_use_the_reserve_backfill_cannot(monkeypatch):
+    fake, limiter = _strava(monkeypatch, short_limit=10, short_window=3600)
+
+    for i in range(1, 8):
+        await get_activity("tok", i, priority=PRIORITY_BACKFILL)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(limiter.acquire(PRIORITY_BACKFILL), timeout=0.2)
+
+    for i in range(8, 11):
+        await get_activity("tok", i, priority=PRIORITY_WEBHOOK)
+    assert fake.calls["activities.get"] == 10
+    assert fake.calls["rejected"] == 0
+
+
+async def test_limiter_follows_strava_headers(monkeypatch):
+    fake, limiter = _strava(monkeypatch, short_limit=40, short_window=3600, known_limit=100)
+    other_app = fake.client()
+    for i in range(5):
+        await other_app.get(f"https://www.strava.com/api/v3/activities/{i + 1}")
+
+    await get_activity("tok", 1)
+
+    assert limiter.short_limit == 40
+    assert limiter.short_used == 6
+    await other_app.aclose()
+
+
+async def test_429_waits_for_the_window_and_retries(monkeypatch):
+    fake, limiter = _strava(monkeypatch, short_limit=3, short_window=1.0, known_limit=100)
+    other_app = fake.client()
+    for i in range(3):
+        await other_app.get(f"https://www.strava.com/api/v3/activities/{i + 1}")
+
+    activity = await get_activity("tok", 7)
+
+    assert activity["id"] == 7
+    assert limiter.stats["rejected"] >= 1
+    await other_app.aclose()
@@ -1 +1,185 @@
-# TODO: Add tests for sync_engine with mocked Google Calendar API
+import asyncio
+
+from sqlalchemy import event
+
+from src.services import google_calendar
+from src.services.sync_engine import (
+    SyncItem,
+    delete_activity,
+    sync_activities_batch,
+    sync_activity,
+)
+
+
+def _event(summary: str) -> dict:
+    return {
+        "summary": summary,
+        "start": {"dateTime": "2024-01-15T07:30:00+00:00", "timeZone": "UTC"},
+        "end": {"dateTime": "2024-01-15T08:30:00+00:00", "timeZone": "UTC"},
+    }
+
+
+async def _sync(db, calendar_id: str, summary: str):
+    return await sync_activity(
+        db, source="strava", source_id="1", activity_type="Run",
+        event_body=_event(summary), google_access_token="token", calendar_id=calendar_id,
+    )
+
+
+async def test_create_then_update(db, fake_google):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+    record = await _sync(db, cal_id, "Run")
+    await _sync(db, cal_id, "Long Run")
+
+    assert fake_google.calls["events.insert"] == 1
+    assert fake_google.events[cal_id][record.google_event_id]["summary"] == "Long Run"
+
+
+async def test_update_recreates_event_deleted_in_google(db, fake_google):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+    record = await _sync(db, cal_id, "Run")
+    fake_google.events[cal_id].clear()
+
+    record = await _sync(db, cal_id, "Long Run")
+    assert list(fake_google.events[cal_id]) == [record.google_event_id]
+
+
+async def test_delete_tolerates_missing_event(db, fake_google):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+    await _sync(db, cal_id, "Run")
+    fake_google.events[cal_id].clear()
+
+    await delete_activity(db, "strava", "1", "token", cal_id)
+    assert await _sync(db, cal_id, "Run") is not None
+    assert fake_google.calls["events.insert"] == 2
+
+
+def _items(n: int, summary: str = "Run") -> list[SyncItem]:
+    return [
+        SyncItem(source="strava", source_id=str(i), activity_type="Run", event_body=_event(summary))
+        for i in range(n)
+    ]
+
+
+async def test_batch_groups_writes(db, fake_google):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+
+    stats = await sync_activities_batch(db, _items(120), "token", cal_id)
+    assert stats["created"] == 120
+    assert fake_google.calls["batch"] == 3
+    assert len(fake_google.events[cal_id]) == 120
+
+    deletes = [SyncItem(source="strava", source_id=str(i)) for i in (100, 101)]
+    items = _items(60, "Long Run") + deletes
+    stats = await sync_activities_batch(db, items, "token", cal_id)
+    assert stats == {"patched": 60, "deleted": 2}
+    assert fake_google.calls["batch"] == 5
+    assert len(fake_google.events[cal_id]) == 118
+
+
+async def test_batch_recreates_gone_events(db, fake_google):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+    await sync_activities_batch(db, _items(3), "token", cal_id)
+    fake_google.events[cal_id].clear()
+
+    stats = await sync_activities_batch(db, _items(3, "Long Run"), "token", cal_id)
+    assert stats == {"updated": 3}
+    assert [e["summary"] for e in fake_google.events[cal_id].values()] == ["Long Run"] * 3
+
+
+async def test_unchanged_events_are_not_rewritten(db, fake_google):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+    await sync_activities_batch(db, _items(10), "token", cal_id)
+
+    stats = await sync_activities_batch(db, _items(10), "token", cal_id)
+    assert stats == {"unchanged": 10}
+    assert fake_google.calls["batch"] == 1
+
+    await _sync(db, cal_id, "Run")
+    assert fake_google.calls["events.update"] + fake_google.calls["events.patch"] == 0
+
+
+async def test_changed_fields_are_patched(db, fake_google, monkeypatch):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+    record = await _sync(db, cal_id, "Run")
+    sent = []
+    real_patch = google_calendar.patch_event
+
+    async def spy(token, calendar_id, event_id, fields):
+        sent.append(fields)
+        return await real_patch(token, calendar_id, event_id, fields)
+
+    monkeypatch.setattr(google_calendar, "patch_event", spy)
+    await _sync(db, cal_id, "Long Run")
+
+    assert sent == [{"summary": "Long Run"}]
+    assert fake_google.events[cal_id][record.google_event_id]["summary"] == "Long Run"
+    assert fake_google.calls["events.update"] == 0
+
+
+async def test_failed_chunk_counts_only_unsettled_items(db, fake_google, monkeypatch):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+    await sync_activities_batch(db, _items(2), "token", cal_id)
+
+    async def broken_commit():
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(db, "commit", broken_commit)
+    stats = await sync_activities_batch(db, _items(4), "token", cal_id)
+    assert stats == {"unchanged": 2, "failed": 2}
+
+
+async def test_batch_skips_whoop_workouts_overlapping_strava(db, fake_google):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+    await sync_activities_batch(db, _items(1), "token", cal_id)
+
+    whoop = [
+        SyncItem("whoop", "w1", "workout", _event("Overlaps"), skip_if_strava_overlap=True),
+        SyncItem(
+            "whoop", "w2", "workout",
+            {
+                "summary": "Later",
+                "start": {"dateTime": "2024-01-15T09:00:00+00:00", "timeZone": "UTC"},
+                "end": {"dateTime": "2024-01-15T10:00:00+00:00", "timeZone": "UTC"},
+            },
+            skip_if_strava_overlap=True,
+        ),
+    ]
+    stats = await sync_activities_batch(db, whoop, "token", cal_id)
+    assert stats == {"skipped": 1, "created": 1}
+
+
+async def test_concurrent_creates_leave_one_event(session_factory, fake_google):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+    fake_google.latency = 0.05
+
+    async def sync_in_own_session():
+        async with session_factory() as session:
+            return await _sync(session, cal_id, "Run")
+
+    first, second = await asyncio.gather(sync_in_own_session(), sync_in_own_session())
+
+    assert first.id == second.id
+    assert list(fake_google.events[cal_id]) == [first.google_event_id]
+    assert fake_google.calls["events.insert"] == 2
+    assert fake_google.calls["events.delete"] == 1
+
+
+async def test_batch_prefetches_records_in_one_query(db, fake_google):
+    cal_id = await google_calendar.find_or_create_calendar("token")
+    await sync_activities_batch(db, _items(50), "token", cal_id)
+
+    selects = []
+
+    def count(conn, cursor, statement, *args):
+        if statement.lstrip().startswith("SELECT") and "sync_records" in statement:
+            selects.append(statement)
+
+    engine = db.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        stats = await sync_activities_batch(db, _items(50, "Long Run"), "token", cal_id)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert stats == {"patched": 50}
+    assert len(selects) == 1
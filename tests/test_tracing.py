@@ -0,0 +1,113 @@
+import asyncio
+import socket
+
+import httpx
+import pytest
+from typer.testing import CliRunner
+
+from src import tracing
+from src.auth import oauth_manager
+from src.cli import app as cli
+from src.services import http_clients, job_queue, strava_rate_limit
+from src.services.strava_rate_limit import StravaRateLimiter
+from tests.fakes import FakeStrava
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span.to_dict())
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def exporter():
+    exporter = ListExporter()
+    tracing.set_exporter(exporter)
+    yield exporter
+    tracing.set_exporter(None)
+
+
+async def test_spans_nest_across_tasks(exporter):
+    async def stage(name: str):
+        with tracing.span(name):
+            await asyncio.sleep(0)
+
+    with tracing.span("root"):
+        await asyncio.gather(stage("a"), stage("b"))
+    with pytest.raises(ValueError), tracing.span("failing"):
+        raise ValueError("boom")
+
+    by_name = {s["name"]: s for s in exporter.spans}
+    root = by_name["root"]
+    assert root["parent_id"] is None
+    assert {by_name["a"]["parent_id"], by_name["b"]["parent_id"]} == {root["span_id"]}
+    assert by_name["a"]["trace_id"] == root["trace_id"]
+    assert by_name["failing"]["trace_id"] != root["trace_id"]
+    assert by_name["failing"]["error"] == "ValueError: boom"
+
+
+async def test_upstream_span_ends_on_connection_error(exporter):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    client = http_clients.get_client("whoop")
+    with pytest.raises(httpx.ConnectError):
+        await client.get(f"http://127.0.0.1:{port}/ping")
+    await http_clients.close_clients()
+
+    (span,) = [s for s in exporter.spans if s["name"] == "whoop GET"]
+    assert span["error"].startswith("ConnectError")
+    assert span["duration"] is not None
+
+
+def test_spans_are_no_ops_without_exporter():
+    with tracing.span("ignored") as span:
+        span.set(status=200)
+    assert isinstance(span, tracing._NoopSpan)
+
+
+async def test_webhook_job_trace_covers_each_stage(tmp_path, db, fake_google, monkeypatch):
+    fake = FakeStrava()
+    fake.activities[7] = {
+        "id": 7, "name": "Lunch Run", "type": "Run", "distance": 5000.0,
+        "moving_time": 1500, "elapsed_time": 1600, "start_date": "2024-01-15T12:00:00Z",
+    }
+    # Routed to the fake, with the pooled clients' hooks (latency, upstream spans)
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake.app),
+        event_hooks=http_clients._event_hooks("strava"),
+    )
+    monkeypatch.setitem(http_clients._clients, "strava", client)
+    monkeypatch.setattr(strava_rate_limit, "limiter", StravaRateLimiter(100, 1000, 0.3))
+    for service in ("strava", "google"):
+        oauth_manager._token_cache[service] = (f"{service}-token", None)
+    path = tmp_path / "traces.jsonl"
+    tracing.set_exporter(tracing.JsonLinesExporter(str(path)))
+    try:
+        await job_queue.enqueue(db, "strava", "7", "create")
+        assert await job_queue.process_next(db)
+    finally:
+        tracing.set_exporter(None)
+        await client.aclose()
+
+    (spans,) = tracing.load_traces(str(path)).values()
+    root = tracing.root(spans)
+    assert root["name"] == "strava.create"
+    children = {s["name"] for s in spans if s["parent_id"] == root["span_id"]}
+    assert children == {"tokens", "calendar_id", "strava.get_activity", "format", "sync_activity"}
+    (upstream,) = [s for s in spans if s["name"] == "strava GET"]
+    assert upstream["attributes"]["status"] == 200
+    (sync,) = [s for s in spans if s["name"] == "sync_activity"]
+    assert sync["attributes"] == {"source": "strava", "source_id": "7", "outcome": "created"}
+
+    result = CliRunner().invoke(cli, ["waterfall", str(path)])
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert lines[0].startswith(f"trace {root['trace_id']}  strava.create")
+    assert any(line.endswith("strava GET  upstream=strava path=/api/v3/activities/7 status=200")
+               for line in lines)
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.auth import oauth_manager
+from src.services import http_clients, sync_state, whoop_poller
+from src.services.whoop_service import get_workouts
+from tests.fakes import FakeWhoop
+
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _workout(record_id: str, hours_ago: float, scored: bool = True, updated: float = 0) -> dict:
+    start = NOW - timedelta(hours=hours_ago)
+    return {
+        "id": record_id,
+        "sport_name": "Running",
+        "start": _iso(start),
+        "end": _iso(start + timedelta(minutes=45)),
+        "updated_at": _iso(start + timedelta(hours=1, minutes=updated)),
+        "score_state": "SCORED" if scored else "PENDING_SCORE",
+        "score": {"strain": 10.0} if scored else None,
+    }
+
+
+@pytest.fixture
+async def fake_whoop(monkeypatch, session_factory, fake_google):
+    fake = FakeWhoop()
+    client = fake.client()
+    monkeypatch.setitem(http_clients._clients, "whoop", client)
+    monkeypatch.setattr(whoop_poller, "async_session", session_factory)
+    for service in ("whoop", "google"):
+        oauth_manager._token_cache[service] = (f"{service}-token", None)
+    yield fake
+    await client.aclose()
+
+
+def _written(fake_google) -> int:
+    return sum(len(events) for events in fake_google.events.values())
+
+
+async def test_service_follows_next_token(fake_whoop):
+    fake_whoop.records["workout"] = [_workout(f"w{i}", i / 10) for i in range(60)]
+
+    workouts = await get_workouts("whoop-token")
+
+    assert len(workouts) == 60
+    assert fake_whoop.calls["workout"] == 3  # pages of 25
+
+
+async def test_only_new_or_changed_records_are_synced(fake_whoop, fake_google, db):
+    fake_whoop.records["workout"] = [_workout("w1", 6), _workout("w2", 4, scored=False)]
+    await whoop_poller.poll_whoop()
+    assert _written(fake_google) == 1
+
+    cursor = await sync_state.get_state(db, "whoop_cursor:workout")
+    assert cursor["start"] == (NOW - timedelta(hours=4)).isoformat()
+
+    # w2 gets its score later; w1 is untouched
+    fake_whoop.records["workout"][1] = _workout("w2", 4, updated=30)
+    fake_google.calls.clear()
+    await whoop_poller.poll_whoop()
+
+    assert _written(fake_google) == 2
+    assert fake_google.calls["batch"] == 1
+    cursor = await sync_state.get_state(db, "whoop_cursor:workout")
+    assert cursor["start"] == (NOW - timedelta(hours=4)).isoformat()
+
+    fake_google.calls.clear()
+    await whoop_poller.poll_whoop()
+    assert fake_google.calls["batch"] == 0
+
+
+async def test_unscorable_records_do_not_hold_the_cursor(fake_whoop, fake_google, db):
+    unscorable = {**_workout("w2", 4, scored=False), "score_state": "UNSCORABLE"}
+    fake_whoop.records["workout"] = [_workout("w1", 6), unscorable, _workout("w3", 2)]
+    await whoop_poller.poll_whoop()
+
+    assert _written(fake_google) == 2
+    cursor = await sync_state.get_state(db, "whoop_cursor:workout")
+    assert cursor["start"] == (NOW - timedelta(hours=2)).isoformat()
+
+
+def _sleep(record_id: str, hours_ago: float) -> dict:
+    start = NOW - timedelta(hours=hours_ago)
+    return {
+        "id": record_id,
+        "start": _iso(start),
+        "end": _iso(start + timedelta(hours=8)),
+        "updated_at": _iso(start + timedelta(hours=9)),
+        "score_state": "SCORED",
+        "score": {"stage_summary": {"total_light_sleep_time_milli": 14_400_000}},
+    }
+
+
+def _recovery(sleep_id: str, hours_ago: float, scored: bool = True) -> dict:
+    at = _iso(NOW - timedelta(hours=hours_ago))
+    return {
+        "sleep_id": sleep_id,
+        "cycle_id": 1,
+        "created_at": at,
+        "updated_at": at,
+        "score_state": "SCORED" if scored else "PENDING_SCORE",
+        "score": {"recovery_score": 64, "hrv_rmssd_milli": 50.0, "resting_heart_rate": 55}
+        if scored else None,
+    }
+
+
+async def test_late_recovery_patches_only_its_sleep(fake_whoop, fake_google, monkeypatch):
+    fake_whoop.records["sleep"] = [_sleep("s1", 20), _sleep("s2", 16)]
+    fake_whoop.records["recovery"] = [_recovery("s1", 11), _recovery("s2", 7, scored=False)]
+    await whoop_poller.poll_whoop()
+
+    summaries = sorted(e["summary"] for e in next(iter(fake_google.events.values())).values())
+    assert summaries == [
+        "\U0001f634 Sleep — 4h 00m",
+        "\U0001f634 Sleep — 4h 00m (64% recovery)",
+    ]
+
+    fake_whoop.records["recovery"][1] = _recovery("s2", 1)
+    fake_google.calls.clear()
+    await whoop_poller.poll_whoop()
+
+    assert fake_google.calls["events.patch"] == 1
+    assert fake_google.calls["events.insert"] + fake_google.calls["events.update"] == 0
+    assert fake_whoop.calls["sleep.get"] == 0
+    summaries = [e["summary"] for e in next(iter(fake_google.events.values())).values()]
+    assert all(s.endswith("(64% recovery)") for s in summaries)
+
+
+async def test_unformattable_workout_is_skipped(fake_whoop, fake_google):
+    broken = {**_workout("w2", 4), "score": {"strain": None}}
+    fake_whoop.records["workout"] = [_workout("w1", 6), broken]
+    fake_whoop.records["sleep"] = [_sleep("s1", 20)]
+    await whoop_poller.poll_whoop()
+
+    assert _written(fake_google) == 2
+
+
+async def test_failed_write_holds_only_its_own_cursor(fake_whoop, fake_google, db, monkeypatch):
+    insert = fake_google._insert
+
+    def failing_insert(calendar_id, body):
+        if "Cycling" in body["summary"]:
+            return 400, {"error": "invalid"}
+        return insert(calendar_id, body)
+
+    monkeypatch.setattr(fake_google, "_insert", failing_insert)
+    cycling = {**_workout("w1", 6), "sport_name": "Cycling"}
+    fake_whoop.records["workout"] = [cycling, _workout("w2", 4)]
+    fake_whoop.records["sleep"] = [_sleep("s1", 20)]
+    await whoop_poller.poll_whoop()
+
+    assert _written(fake_google) == 2
+    cursor = await sync_state.get_state(db, "whoop_cursor:workout")
+    assert cursor["start"] == (NOW - timedelta(hours=6)).isoformat()
+    cursor = await sync_state.get_state(db, "whoop_cursor:sleep")
+    assert cursor["start"] == (NOW - timedelta(hours=20)).isoformat()
+
+    monkeypatch.setattr(fake_google, "_insert", insert)
+    await whoop_poller.poll_whoop()
+
+    assert _written(fake_google) == 3
+    cursor = await sync_state.get_state(db, "whoop_cursor:workout")
+    assert cursor["start"] == (NOW - timedelta(hours=4)).isoformat()